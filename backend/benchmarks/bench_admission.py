@@ -0,0 +1,98 @@
+"""
+Cost of a rejection, and legitimate logins, during a credential-stuffing attack.
+
+    cd backend && python -m benchmarks.bench_admission --attackers 200 --duration 10
+
+Two measurements, always with the ADMISSION_RULES limits on (whatever RATE_LIMIT_ENABLED says):
+- reject: calls the middleware directly with an already empty bucket and measures what
+  answering 429 costs, without going through FastAPI;
+- attack: --attackers clients from one IP try passwords for random emails in a loop while a
+  real user logs in from another IP every --login-interval seconds. The attacker's answers,
+  how many got past the middleware and the legitimate login's latency are reported.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+from benchmarks.common import create_bench_user, drop_bench_db, latency_summary, report, server
+from rate_limit import AdmissionControl, AdmissionRule, TokenBuckets
+
+
+async def reject_cost(calls):
+    async def app(scope, receive, send):
+        raise AssertionError("admitted")
+
+    async def send(message):
+        pass
+
+    bucket = TokenBuckets(1, 60.0, 10)
+    bucket.take("10.0.0.1")
+    middleware = AdmissionControl(app, [AdmissionRule("POST", "/api/auth/login", per_ip=bucket)])
+    scope = {"type": "http", "method": "POST", "path": "/api/auth/login", "headers": [], "client": ("10.0.0.1", 1)}
+    start = time.perf_counter()
+    for _ in range(calls):
+        await middleware(scope, None, send)
+    return round((time.perf_counter() - start) / calls * 1e6, 2)
+
+
+def client_from(app, ip):
+    transport = httpx.ASGITransport(app=app, client=(ip, 40000))
+    return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0)
+
+
+async def attacker(http, deadline, statuses, rejected):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await http.post("/api/auth/login", json={"email": f"{uuid.uuid4().hex}@x.mx", "password": "123456"})
+        if response.status_code == 429:
+            rejected.append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        # In process a 429 never suspends the coroutine; over the network, reading the socket would yield.
+        await asyncio.sleep(0)
+
+
+async def legit_user(http, email, interval, deadline, latencies, statuses):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await http.post("/api/auth/login", json={"email": email, "password": "bench-password"})
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        await asyncio.sleep(interval)
+
+
+async def main(args):
+    await drop_bench_db()
+    try:
+        await server.ensure_indexes()
+        user, _ = await create_bench_user()
+        app = AdmissionControl(server.app, server.ADMISSION_RULES, enabled=True)
+        attack_statuses, rejected, legit, legit_statuses = {}, [], [], {}
+        deadline = time.perf_counter() + args.duration
+        async with client_from(app, "203.0.113.7") as bad, client_from(app, "198.51.100.20") as good:
+            await asyncio.gather(
+                legit_user(good, user.email, args.login_interval, deadline, legit, legit_statuses),
+                *[attacker(bad, deadline, attack_statuses, rejected) for _ in range(args.attackers)],
+            )
+        report("admission", {
+            "reject_us": await reject_cost(args.reject_calls),
+            "attack": {
+                "statuses": attack_statuses,
+                "admitted": sum(count for code, count in attack_statuses.items() if code != 429),
+                "rejected_latency": latency_summary(rejected),
+            },
+            "legit_login": {"statuses": legit_statuses, "latency": latency_summary(legit)},
+        })
+    finally:
+        await drop_bench_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attackers", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--login-interval", type=float, default=0.5, help="seconds between the real user's logins")
+    parser.add_argument("--reject-calls", type=int, default=20000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,110 @@
+"""
+Bid throughput on a single, heavily contested lot.
+
+    cd backend && python -m benchmarks.bench_bids --clients 500 --duration 10
+
+Each client bids the minimum acceptable amount over the last price it knows, in a loop; rejected
+bids (409) carry the standing price in X-Current-Bid, so a client never re-reads the lot. With
+--base-url the server must be started with DB_NAME=auction_bench (or the BENCH_DB_NAME in use).
+At the end bid_count and current_bid are checked against the accepted bids.
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import (
+    create_bench_user,
+    drop_bench_db,
+    latency_summary,
+    make_client,
+    report,
+    server,
+)
+
+
+async def seed_hot_lot():
+    auction = server.Auction(
+        title="Subasta Benchmark",
+        description="Subasta para medir pujas concurrentes",
+        reason="cierre_empresa",
+        company_name="Benchmark S.A.",
+        start_date=server.datetime.utcnow(),
+        end_date=server.datetime.utcnow() + server.timedelta(hours=1),
+        status="activa",
+        location="Local",
+        state="Jalisco",
+        total_items=1,
+    )
+    await server.db.auctions.insert_one(auction.dict(by_alias=True, exclude={"id"}))
+    item = server.AuctionItem(
+        name="Lote Benchmark",
+        description="Lote único",
+        category="maquinaria",
+        subcategory="varios",
+        brand="Varias",
+        starting_price=1000.0,
+        current_bid=1000.0,
+        estimated_value={"min": 1000, "max": 5000},
+        images=[],
+        condition="bueno",
+        specifications={},
+        location="Jalisco",
+        auction_id=auction.auction_id,
+        auction_status="activa",
+    )
+    await server.db.auction_items.insert_one(item.dict(by_alias=True, exclude={"id"}))
+    return item
+
+
+async def bidder(http, item_id, headers, deadline, accepted, rejected):
+    known_price = 0.0
+    while time.perf_counter() < deadline:
+        amount = server.min_next_bid(known_price)
+        start = time.perf_counter()
+        response = await http.post(f"/api/items/{item_id}/bids", json={"amount": amount}, headers=headers)
+        elapsed = time.perf_counter() - start
+        if response.status_code == 201:
+            accepted.append(elapsed)
+            known_price = amount
+        elif response.status_code == 409:
+            rejected.append(elapsed)
+            known_price = float(response.headers["X-Current-Bid"])
+        else:
+            response.raise_for_status()
+
+
+async def main(args):
+    await drop_bench_db()
+    try:
+        item = await seed_hot_lot()
+        _, headers = await create_bench_user()
+        accepted, rejected = [], []
+        async with make_client(args.base_url) as http:
+            started = time.perf_counter()
+            deadline = started + args.duration
+            await asyncio.gather(*[
+                bidder(http, item.item_id, headers, deadline, accepted, rejected)
+                for _ in range(args.clients)
+            ])
+            wall = time.perf_counter() - started
+        final = await server.db.auction_items.find_one({"item_id": item.item_id})
+        report("bids", {
+            "clients": args.clients,
+            "duration_s": round(wall, 3),
+            "accepted_bids_per_s": round(len(accepted) / wall, 1),
+            "requests_per_s": round((len(accepted) + len(rejected)) / wall, 1),
+            "accepted": latency_summary(accepted),
+            "rejected": latency_summary(rejected),
+            "consistent": final["bid_count"] == len(accepted),
+            "final_bid": final["current_bid"],
+        })
+    finally:
+        await drop_bench_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--base-url", help="running server; the app in this process by default")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,95 @@
+"""
+Requests per second of catalog reads with and without the response cache.
+
+    cd backend && python -m benchmarks.bench_catalog --clients 50 --duration 10
+
+Seeds the sample data and spreads --clients looping clients over the read URLs (auction list,
+auction detail, each auction's lots and each lot's detail). Runs three phases: uncached, cached
+and cached with revalidation (If-None-Match with the ETag already seen, answered 304 without a
+body). With --base-url the cache cannot be turned off from here: every phase measures the server
+as configured (start it with RESPONSE_CACHE_SIZE=0 to measure without the cache) and the hit
+counters stay at zero.
+"""
+import argparse
+import asyncio
+import itertools
+import time
+
+from benchmarks.common import drop_bench_db, latency_summary, make_client, report, server
+
+
+async def catalog_urls(http):
+    urls = ["/api/auctions"]
+    auctions = (await http.get("/api/auctions")).json()
+    for auction in auctions:
+        urls.append(f"/api/auctions/{auction['auction_id']}")
+        urls.append(f"/api/auctions/{auction['auction_id']}/items")
+        items = (await http.get(f"/api/auctions/{auction['auction_id']}/items")).json()
+        urls += [f"/api/items/{item['item_id']}" for item in items]
+    return urls
+
+
+async def client_loop(http, urls, deadline, etags, latencies, statuses):
+    for url in itertools.cycle(urls):
+        if time.perf_counter() >= deadline:
+            return
+        headers = {"If-None-Match": etags[url]} if etags is not None and url in etags else {}
+        start = time.perf_counter()
+        response = await http.get(url, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if etags is not None and "etag" in response.headers:
+            etags[url] = response.headers["etag"]
+
+
+async def run_phase(http, urls, args, revalidate=False):
+    latencies, statuses = [], {}
+    etags = {} if revalidate else None
+    hits, misses = server.response_cache.hits, server.response_cache.misses
+    started = time.perf_counter()
+    deadline = started + args.duration
+    # Each client starts at a different URL so they do not move in lockstep.
+    await asyncio.gather(*[
+        client_loop(http, urls[n % len(urls):] + urls[:n % len(urls)], deadline, etags, latencies, statuses)
+        for n in range(args.clients)
+    ])
+    wall = time.perf_counter() - started
+    return {
+        "requests_per_s": round(len(latencies) / wall, 1),
+        "statuses": statuses,
+        "cache_hits": server.response_cache.hits - hits,
+        "cache_misses": server.response_cache.misses - misses,
+        "latency": latency_summary(latencies),
+    }
+
+
+async def main(args):
+    await drop_bench_db()
+    try:
+        await server.init_sample_data()
+        await server.seed_custom_auctions()
+        await server.sync_item_auction_status()
+        async with make_client(args.base_url) as http:
+            urls = await catalog_urls(http)
+            server.response_cache.enabled = False
+            uncached = await run_phase(http, urls, args)
+            server.response_cache.enabled = True
+            cached = await run_phase(http, urls, args)
+            revalidated = await run_phase(http, urls, args, revalidate=True)
+        report("catalog", {
+            "clients": args.clients,
+            "urls": len(urls),
+            "uncached": uncached,
+            "cached": cached,
+            "revalidated": revalidated,
+        })
+    finally:
+        await drop_bench_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per phase")
+    parser.add_argument("--base-url", help="running server; the app in this process by default")
+    asyncio.run(main(parser.parse_args()))
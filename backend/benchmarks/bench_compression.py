@@ -0,0 +1,144 @@
+"""
+Bandwidth and CPU of response compression (gzip and brotli) on lot listings.
+
+    cd backend && python -m benchmarks.bench_compression --items 500 --clients 20 --duration 5
+
+Seeds an auction with --items lots carrying specifications and a long description, and measures:
+- body: the JSON of /api/auctions/{id}/items?limit=--limit uncompressed and compressed with gzip
+  and brotli at several levels (bytes, ratio and CPU µs per compression);
+- http: --clients clients fetch that listing in a loop with Accept-Encoding identity, gzip and
+  br, with the response cache off (every response is compressed again) and on (the compressed
+  variant is kept with the entry). Bytes per response on the wire and compression CPU µs per
+  response, from the compressor's counters, are reported.
+Also runs with REPOSITORY_ENGINE=memory (no mongod). With --base-url the cache is not turned off
+from here and the CPU µs stay at zero: only the bytes and latencies come from the remote server.
+"""
+import argparse
+import asyncio
+import gzip
+import time
+
+import brotli
+
+from benchmarks.common import drop_bench_db, latency_summary, make_client, report, server
+
+GZIP_LEVELS = [1, 6, 9]
+BROTLI_QUALITIES = [1, 4, 5, 8, 11]
+
+
+async def seed(count):
+    auction = server.Auction(
+        title="Subasta Benchmark Compresión",
+        description="Subasta para medir la compresión de listados de lotes",
+        reason="cierre_empresa",
+        company_name="Benchmark S.A.",
+        start_date=server.datetime.utcnow(),
+        end_date=server.datetime.utcnow() + server.timedelta(days=7),
+        status="activa",
+        location="Monterrey, Nuevo León",
+        state="Nuevo León",
+        total_items=count,
+    )
+    await server.repos.auctions.insert(auction.dict(by_alias=True, exclude={"id"}))
+    for n in range(count):
+        item = server.AuctionItem(
+            name=f"Lote {n} Caterpillar 320D",
+            description="Excavadora hidráulica con documentación y mantenimiento al corriente. " * 3,
+            category="maquinaria",
+            subcategory="excavadoras",
+            brand="Caterpillar",
+            model="320D",
+            year=2015,
+            starting_price=850000.0 + n,
+            current_bid=900000.0 + n,
+            estimated_value={"min": 800000, "max": 1200000},
+            images=[f"{n:064x}", f"{n + count:064x}"],
+            condition="bueno",
+            specifications={"horas_uso": 5400 + n, "motor": "C6.4 ACERT", "numero_serie": f"CAT0320D{n:06d}"},
+            location="Monterrey, Nuevo León",
+            auction_id=auction.auction_id,
+            auction_status="activa",
+            lot_order=n,
+        )
+        await server.repos.items.insert(item.dict(by_alias=True, exclude={"id"}))
+    return auction.auction_id
+
+
+def cpu_per_call(func, body, repeats):
+    start = time.process_time()
+    for _ in range(repeats):
+        compressed = func(body)
+    return len(compressed), round((time.process_time() - start) / repeats * 1e6, 1)
+
+
+def body_sizes(body, repeats):
+    results = {"identity_bytes": len(body)}
+    for level in GZIP_LEVELS:
+        size, cpu_us = cpu_per_call(lambda data: gzip.compress(data, compresslevel=level, mtime=0), body, repeats)
+        results[f"gzip-{level}"] = {"bytes": size, "ratio": round(len(body) / size, 2), "cpu_us": cpu_us}
+    for quality in BROTLI_QUALITIES:
+        size, cpu_us = cpu_per_call(lambda data: brotli.compress(data, mode=brotli.MODE_TEXT, quality=quality), body, repeats)
+        results[f"br-{quality}"] = {"bytes": size, "ratio": round(len(body) / size, 2), "cpu_us": cpu_us}
+    return results
+
+
+async def client_loop(http, url, encoding, deadline, latencies, wire_bytes):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await http.get(url, headers={"Accept-Encoding": encoding})
+        latencies.append(time.perf_counter() - start)
+        wire_bytes.append(response.num_bytes_downloaded)
+
+
+async def run_phase(http, url, encoding, args):
+    latencies, wire_bytes = [], []
+    cpu = sum(server.compressor.cpu_seconds.values())
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*[
+        client_loop(http, url, encoding, deadline, latencies, wire_bytes) for _ in range(args.clients)
+    ])
+    wall = time.perf_counter() - started
+    compress_cpu = sum(server.compressor.cpu_seconds.values()) - cpu
+    return {
+        "requests_per_s": round(len(latencies) / wall, 1),
+        "bytes_per_response": round(sum(wire_bytes) / len(wire_bytes)),
+        "megabytes_per_s": round(sum(wire_bytes) / wall / 1e6, 2),
+        "compress_cpu_us_per_response": round(compress_cpu / len(latencies) * 1e6, 1),
+        "latency": latency_summary(latencies),
+    }
+
+
+async def main(args):
+    await drop_bench_db()
+    try:
+        auction_id = await seed(args.items)
+        url = f"/api/auctions/{auction_id}/items?limit={args.limit}"
+        async with make_client(args.base_url) as http:
+            body = (await http.get(url, headers={"Accept-Encoding": "identity"})).content
+            phases = {}
+            for cached in (False, True):
+                server.response_cache.enabled = cached
+                for encoding in ("identity", "gzip", "br"):
+                    phases[f"{'cached' if cached else 'uncached'}-{encoding}"] = await run_phase(http, url, encoding, args)
+        report("compression", {
+            "items": args.items,
+            "limit": args.limit,
+            "gzip_level": server.GZIP_LEVEL,
+            "brotli_quality": server.BROTLI_QUALITY,
+            "body": body_sizes(body, args.repeats),
+            "http": phases,
+        })
+    finally:
+        await drop_bench_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=server.DEFAULT_PAGE_SIZE, help="lots per response")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per phase")
+    parser.add_argument("--repeats", type=int, default=50, help="compressions per level when measuring the body")
+    parser.add_argument("--base-url", help="running server; the app in this process by default")
+    asyncio.run(main(parser.parse_args()))
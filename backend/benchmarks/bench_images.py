@@ -0,0 +1,133 @@
+"""
+Bulk photo ingest: images per second and event loop lag while variants are generated.
+
+    cd backend && python -m benchmarks.bench_images --images 5000 --concurrency 32
+
+Uploads synthetic JPEG photos to POST /api/images and waits for the pipeline to finish all their
+variants (sizes and WebP). Every photo is different (extra bytes after the EOI marker, which
+decoders ignore), so none is deduplicated. A timer measures how late the event loop runs against
+its period: with resizing off the loop it should stay within a few ms. Uploads rejected with 503
+(queue full) are retried after a pause and counted separately. With --base-url the measured lag
+is the client loop's, not the server's.
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import random
+import time
+
+from PIL import Image, ImageDraw
+
+from benchmarks.common import (
+    create_bench_user,
+    drop_bench_db,
+    latency_summary,
+    make_client,
+    report,
+    server,
+)
+from image_pipeline import FORMATS, SIZES
+
+LAG_TICK = 0.01  # seconds
+
+
+def synthetic_photos(count, width, height):
+    """Base photos with shapes and noise, so compressing them is not trivial."""
+    photos = []
+    rng = random.Random(42)
+    for _ in range(count):
+        image = Image.effect_noise((width, height), 40).convert("RGB")
+        draw = ImageDraw.Draw(image)
+        for _ in range(30):
+            x, y = rng.randrange(width), rng.randrange(height)
+            color = tuple(rng.randrange(256) for _ in range(3))
+            draw.ellipse((x, y, x + rng.randrange(40, 400), y + rng.randrange(40, 400)), fill=color)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=90)
+        photos.append(buffer.getvalue())
+    return photos
+
+
+async def measure_loop_lag(lags, stop):
+    while not stop.is_set():
+        expected = time.perf_counter() + LAG_TICK
+        await asyncio.sleep(LAG_TICK)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def uploader(http, headers, photos, counter, total, latencies, retries):
+    for n in counter:
+        if n >= total:
+            return
+        data = photos[n % len(photos)] + f"bench-{n}".encode()
+        while True:
+            start = time.perf_counter()
+            response = await http.post("/api/images", files={"file": (f"{n}.jpg", data, "image/jpeg")}, headers=headers)
+            if response.status_code != 503:
+                break
+            retries.append(n)
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def wait_for_variants(total, in_process):
+    if in_process:
+        await server.image_pipeline.join()
+        return
+    expected = total * len(SIZES) * len(FORMATS)
+    while await server.db.image_variants.count_documents({}) < expected:
+        await asyncio.sleep(0.5)
+
+
+async def main(args):
+    photos = synthetic_photos(args.variety, args.width, args.height)
+    await drop_bench_db()
+    in_process = not args.base_url
+    if in_process:
+        server.image_pipeline.start()
+    try:
+        _, headers = await create_bench_user()
+        latencies, retries, lags = [], [], []
+        stop = asyncio.Event()
+        ticker = asyncio.create_task(measure_loop_lag(lags, stop))
+        counter = itertools.count()
+        async with make_client(args.base_url, timeout=120.0) as http:
+            started = time.perf_counter()
+            await asyncio.gather(*[
+                uploader(http, headers, photos, counter, args.images, latencies, retries)
+                for _ in range(args.concurrency)
+            ])
+            uploaded = time.perf_counter() - started
+            await wait_for_variants(args.images, in_process)
+            wall = time.perf_counter() - started
+        stop.set()
+        await ticker
+        report("images", {
+            "images": args.images,
+            "concurrency": args.concurrency,
+            "workers": server.image_pipeline.workers,
+            "photo_kb": round(sum(map(len, photos)) / len(photos) / 1024, 1),
+            "upload_s": round(uploaded, 3),
+            "total_s": round(wall, 3),
+            "images_per_s": round(args.images / wall, 1),
+            "queue_full_retries": len(retries),
+            "upload": latency_summary(latencies),
+            "loop_lag": latency_summary(lags),
+        })
+    finally:
+        if in_process:
+            await server.image_pipeline.stop()
+        await drop_bench_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--variety", type=int, default=20, help="distinct base photos")
+    parser.add_argument("--width", type=int, default=2400)
+    parser.add_argument("--height", type=int, default=1800)
+    parser.add_argument("--base-url", help="running server; the app in this process by default")
+    asyncio.run(main(parser.parse_args()))
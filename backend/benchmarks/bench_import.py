@@ -0,0 +1,124 @@
+"""
+Rows per second of the bulk catalog importer.
+
+    cd backend && python -m benchmarks.bench_import --lots 50000 --format csv
+
+Writes a temporary file with --auctions auctions and another with --lots lots spread across them,
+imports them with CatalogImporter (the same code the CLI and POST /api/admin/import use) and
+repeats the import to also measure the update case, where no document changes. Target: 50,000
+lots in under 10 seconds.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import tempfile
+
+from benchmarks.common import drop_bench_db, report, server
+from catalog_import import CatalogImporter, import_files, open_text
+
+CATEGORIES = ["vehiculos", "camiones", "equipo_medico", "herramientas", "maquinaria"]
+CONDITIONS = ["excelente", "bueno", "regular", "para_reparacion"]
+STATES = ["Jalisco", "Nuevo León", "Baja California", "Ciudad de México", "Sonora"]
+
+
+def synthetic_auctions(count):
+    for n in range(count):
+        yield {
+            "auction_id": f"bench-import-{n}",
+            "title": f"Subasta de importación {n}",
+            "description": "Subasta generada para medir el importador",
+            "reason": "cierre_empresa",
+            "company_name": "Benchmark S.A.",
+            "start_date": "2026-01-10T10:00:00",
+            "end_date": "2026-01-12T18:00:00",
+            "status": "proxima",
+            "location": "Guadalajara",
+            "state": random.choice(STATES),
+        }
+
+
+def synthetic_lots(count, auctions):
+    for n in range(count):
+        price = float(random.randrange(5000, 2000000, 500))
+        yield {
+            "auction_id": f"bench-import-{n % auctions}",
+            "lot_order": n // auctions + 1,
+            "name": f"Lote {n} {random.choice(['Caterpillar', 'Nissan', 'Siemens', 'DeWalt'])}",
+            "description": "Lote sintético con descripción de longitud típica para el catálogo.",
+            "category": random.choice(CATEGORIES),
+            "subcategory": "varios",
+            "brand": "Varias",
+            "year": random.randrange(1995, 2025),
+            "starting_price": price,
+            "estimated_value": {"min": price, "max": price * 1.5},
+            "condition": random.choice(CONDITIONS),
+            "specifications": {"numero_lote": str(n), "color": random.choice(["Blanco", "Negro"])},
+            "location": "Guadalajara, Jalisco",
+        }
+
+
+def flatten(row):
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            flat.update({f"{key}.{child}": child_value for child, child_value in value.items()})
+        else:
+            flat[key] = value
+    return flat
+
+
+def write_file(directory, name, rows, fmt):
+    path = os.path.join(directory, f"{name}.{fmt}")
+    with open(path, "w", encoding="utf-8", newline="") as stream:
+        if fmt == "csv":
+            rows = [flatten(row) for row in rows]
+            writer = csv.DictWriter(stream, fieldnames=sorted({key for row in rows for key in row}))
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return path
+
+
+async def run_import(auctions_path, lots_path, batch_size):
+    importer = CatalogImporter(server.db, server.Auction, server.AuctionItem, batch_size)
+    with open_text(auctions_path) as auctions, open_text(lots_path) as lots:
+        return await import_files(importer, auctions, auctions_path, lots, lots_path)
+
+
+async def main(args):
+    random.seed(7)
+    await drop_bench_db()
+    try:
+        await server.ensure_indexes()
+        with tempfile.TemporaryDirectory() as directory:
+            auctions_path = write_file(directory, "subastas", list(synthetic_auctions(args.auctions)), args.format)
+            lots_path = write_file(directory, "lotes", list(synthetic_lots(args.lots, args.auctions)), args.format)
+            first = await run_import(auctions_path, lots_path, args.batch_size)
+            again = await run_import(auctions_path, lots_path, args.batch_size)
+        stored = await server.db.auction_items.count_documents({})
+        for result in (first, again):
+            result.pop("errors")
+        report("import", {
+            "format": args.format,
+            "auctions": args.auctions,
+            "lots": args.lots,
+            "stored_lots": stored,
+            "first_import": first,
+            "reimport": again,
+        })
+    finally:
+        await drop_bench_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lots", type=int, default=50000)
+    parser.add_argument("--auctions", type=int, default=50)
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
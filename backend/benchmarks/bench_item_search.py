@@ -0,0 +1,79 @@
+"""
+Latency of the in-memory lot search index (no MongoDB).
+
+    cd backend && python -m benchmarks.bench_item_search --lots 200000 --queries 2000
+
+Generates synthetic lots with the catalog's vocabulary, builds the index and measures search()
+over a mix of one- and multi-term queries, with and without facet filters.
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import Timer, latency_summary, report
+from search_index import ItemSearchIndex
+
+BRANDS = ["Nissan", "Freightliner", "Kenworth", "Siemens", "Lincoln Electric", "Ryobi", "BMW",
+          "Caterpillar", "John Deere", "Philips", "Toyota", "Volvo", "DeWalt", "Makita"]
+NOUNS = ["camión", "tractocamión", "soldadora", "sierra", "taladro", "resonancia", "montacargas",
+         "excavadora", "compresor", "generador", "automóvil", "camioneta", "motocicleta", "refacciones",
+         "herramientas", "rines", "caja seca", "retroexcavadora", "ultrasonido", "esmeriladora"]
+ADJECTIVES = ["eléctrica", "manual", "industrial", "diésel", "usado", "operativo", "completo",
+              "pesado", "compacto", "hidráulico", "nuevo", "reparación"]
+CATEGORIES = ["vehiculos", "camiones", "equipo_medico", "herramientas", "maquinaria", "equipos"]
+CONDITIONS = ["excelente", "bueno", "regular", "para_reparacion"]
+STATES = ["Jalisco", "Nuevo León", "Baja California", "Ciudad de México", "Sonora", "Puebla"]
+
+
+def synthetic_lot(rng, n):
+    noun, brand = rng.choice(NOUNS), rng.choice(BRANDS)
+    return {
+        "item_id": f"lot-{n}",
+        "name": f"{noun.capitalize()} {brand} {rng.choice(ADJECTIVES)}",
+        "description": " ".join(rng.choice(NOUNS + ADJECTIVES) for _ in range(12)),
+        "brand": brand,
+        "model": f"M{rng.randint(100, 999)}",
+        "year": rng.choice([None] + list(range(1995, 2025))),
+        "category": rng.choice(CATEGORIES),
+        "subcategory": noun.split()[0],
+        "condition": rng.choice(CONDITIONS),
+        "specifications": {"numero_lote": str(n), "color": rng.choice(["Blanco", "Negro", "Rojo"])},
+    }
+
+
+def main(args):
+    rng = random.Random(11)
+    index = ItemSearchIndex()
+    with Timer() as build:
+        for n in range(args.lots):
+            index.add(synthetic_lot(rng, n), rng.choice(STATES))
+        index.reweight()
+
+    queries = []
+    for _ in range(args.queries):
+        kind = rng.random()
+        if kind < 0.4:
+            queries.append((rng.choice(BRANDS), None))
+        elif kind < 0.8:
+            queries.append((f"{rng.choice(NOUNS)} {rng.choice(ADJECTIVES)}", None))
+        else:
+            queries.append((rng.choice(NOUNS), {"state": rng.choice(STATES), "condition": rng.choice(CONDITIONS)}))
+
+    samples = []
+    for q, filters in queries:
+        start = time.perf_counter()
+        index.search(q, filters, limit=20)
+        samples.append(time.perf_counter() - start)
+    report("item_search_index", {
+        "lots": args.lots,
+        "terms": len(index.postings),
+        "build_s": round(build.elapsed, 2),
+        "search": latency_summary(samples),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lots", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=2000)
+    main(parser.parse_args())
@@ -0,0 +1,126 @@
+"""
+Catalog latency while a burst of logins arrives.
+
+    cd backend && python -m benchmarks.bench_login --logins-per-s 200 --duration 10
+
+Measures GET /api/auctions with --readers looping clients, first without load and then with
+--logins-per-s logins per second (open load: each login goes out on time even if the earlier
+ones have not finished). With bcrypt on its thread pool the catalog's p99 should barely move;
+--inline runs bcrypt on the event loop, as before, for comparison. --inline and --rounds only
+apply to the app in this process; with --base-url, --rounds must match the server's
+BCRYPT_ROUNDS or every login rewrites the hash. In process the client and the server share the
+loop, so the representative figures are those of --base-url against uvicorn on a multi-core
+machine.
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import drop_bench_db, latency_summary, make_client, report, server
+
+PASSWORD = "bench-password"
+
+
+async def seed_users(count):
+    # They all share one hash: seeding should not cost count bcrypt runs.
+    password_hash = server.hash_password(PASSWORD)
+    users = [
+        server.User(
+            email=f"login{n}@subastas.mx",
+            full_name=f"Usuario {n}",
+            phone="+52 00 0000 0000",
+            password_hash=password_hash,
+        ).dict(by_alias=True, exclude={"id"})
+        for n in range(count)
+    ]
+    await server.db.users.insert_many(users)
+    return [user["email"] for user in users]
+
+
+async def reader(http, deadline, latencies):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await http.get("/api/auctions", params={"limit": 20})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def login(http, email, latencies):
+    start = time.perf_counter()
+    response = await http.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+    response.raise_for_status()
+    latencies.append(time.perf_counter() - start)
+
+
+async def login_load(http, emails, rate, deadline, latencies):
+    tasks = []
+    next_at = time.perf_counter()
+    n = 0
+    while emails and next_at < deadline:
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        tasks.append(asyncio.create_task(login(http, emails[n % len(emails)], latencies)))
+        n += 1
+        next_at += 1.0 / rate
+    await asyncio.gather(*tasks)
+    return n
+
+
+async def run_phase(http, args, emails=None):
+    reads, logins = [], []
+    started = time.perf_counter()
+    deadline = started + args.duration
+    sending = asyncio.create_task(login_load(http, emails or [], args.logins_per_s, deadline, logins))
+    await asyncio.gather(*[reader(http, deadline, reads) for _ in range(args.readers)])
+    read_wall = time.perf_counter() - started
+    sent = await sending
+    # Logins still queued at the deadline finish afterwards and count against their own rate.
+    wall = time.perf_counter() - started
+    return {
+        "duration_s": round(wall, 3),
+        "logins_sent": sent,
+        "logins_per_s": round(len(logins) / wall, 1),
+        "catalog_per_s": round(len(reads) / read_wall, 1),
+        "catalog": latency_summary(reads),
+        "login": latency_summary(logins),
+    }
+
+
+async def inline_hasher(func, *args):
+    return func(*args)
+
+
+async def main(args):
+    if args.rounds:
+        server.BCRYPT_ROUNDS = args.rounds
+    if args.inline:
+        server.run_password_hasher = inline_hasher
+    await drop_bench_db()
+    try:
+        await server.init_sample_data()
+        emails = await seed_users(args.users)
+        async with make_client(args.base_url) as http:
+            baseline = await run_phase(http, args)
+            loaded = await run_phase(http, args, emails)
+        report("login", {
+            "bcrypt_rounds": server.BCRYPT_ROUNDS,
+            "hash_workers": server.PASSWORD_HASH_WORKERS,
+            "inline": args.inline,
+            "readers": args.readers,
+            "target_logins_per_s": args.logins_per_s,
+            "baseline": baseline,
+            "under_logins": loaded,
+        })
+    finally:
+        await drop_bench_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins-per-s", type=float, default=200.0)
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per phase")
+    parser.add_argument("--rounds", type=int, help="bcrypt cost; BCRYPT_ROUNDS by default")
+    parser.add_argument("--inline", action="store_true", help="bcrypt on the event loop, for comparison")
+    parser.add_argument("--base-url", help="running server; the app in this process by default")
+    asyncio.run(main(parser.parse_args()))
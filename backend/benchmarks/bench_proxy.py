@@ -0,0 +1,97 @@
+"""
+Resolution time of maximum (proxy) bids with many bidders competing for one lot.
+
+    cd backend && python -m benchmarks.bench_proxy --proxies 1000 --bids 200
+
+Seeds a live lot and sets --proxies maximum bids from different bidders with ProxyBidEngine,
+resolving after each one as POST /api/items/{id}/proxy-bids does. The outcome is then checked
+(the highest ceiling wins, one increment over the second) and the number of writes is compared
+with what a war of one increment per bid up to the same price would have needed.
+
+Then a bidder without a proxy places up to --bids manual bids (the minimum acceptable, as
+place_bid does) and the resolution answering them with the stored maximum bids is measured; it
+stops early once a bid goes past the highest ceiling.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.bench_bids import seed_hot_lot
+from benchmarks.common import drop_bench_db, latency_summary, report, server
+from proxy_bidding import ProxyBidEngine
+
+
+def increment_steps(start, end):
+    steps, price = 0, start
+    while price < end:
+        price = server.min_next_bid(price)
+        steps += 1
+    return steps
+
+
+async def human_bid(item_id, user_id):
+    """The same conditional update as place_bid, at the minimum acceptable amount."""
+    item = await server.db.auction_items.find_one({"item_id": item_id}, {"current_bid": 1})
+    amount = server.min_next_bid(item["current_bid"])
+    await server.db.auction_items.update_one(
+        {"item_id": item_id, "current_bid": item["current_bid"]},
+        {"$set": {"current_bid": amount, "high_bidder_id": user_id}, "$inc": {"bid_count": 1}},
+    )
+
+
+async def timed_resolve(engine, item_id, samples):
+    start = time.perf_counter()
+    result = await engine.resolve(item_id)
+    samples.append(time.perf_counter() - start)
+    return result is not None
+
+
+async def main(args):
+    random.seed(7)
+    await drop_bench_db()
+    try:
+        await server.ensure_indexes()
+        item = await seed_hot_lot()
+        engine = ProxyBidEngine(server.db, server.bid_increment)
+        ceilings = {f"proxy-{n}": float(random.randrange(2000, 2000000, 100)) for n in range(args.proxies)}
+        # One bidder with far more room, so the manual bids have someone to answer them.
+        ceilings[f"proxy-{args.proxies // 2}"] = 5000000.0
+
+        arrivals, writes = [], 0
+        for user_id, ceiling in ceilings.items():
+            await engine.set_ceiling(item.item_id, user_id, ceiling)
+            writes += await timed_resolve(engine, item.item_id, arrivals)
+
+        lot = await server.db.auction_items.find_one({"item_id": item.item_id})
+        ranked = sorted(ceilings.items(), key=lambda entry: -entry[1])
+        (winner, top), (_, second) = ranked[0], ranked[1]
+        war = {
+            "proxy_writes": writes,
+            "incremental_writes": increment_steps(item.current_bid, lot["current_bid"]),
+            "price": lot["current_bid"],
+            "expected_winner": lot["high_bidder_id"] == winner,
+            "expected_price": lot["current_bid"] == min(top, server.min_next_bid(second)),
+            "resolve": latency_summary(arrivals),
+        }
+
+        answers, answered = [], 0
+        for _ in range(args.bids):
+            await human_bid(item.item_id, "bench-human")
+            if not await timed_resolve(engine, item.item_id, answers):
+                break  # the manual bid went past the highest ceiling
+            answered += 1
+        report("proxy", {
+            "proxies": args.proxies,
+            "proxy_war": war,
+            "manual_bids": {"answered": answered, "resolve": latency_summary(answers)},
+        })
+    finally:
+        await drop_bench_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proxies", type=int, default=1000)
+    parser.add_argument("--bids", type=int, default=200, help="manual bids answered by the proxies")
+    asyncio.run(main(parser.parse_args()))
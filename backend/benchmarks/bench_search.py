@@ -0,0 +1,132 @@
+"""
+search_auctions: a single-round-trip aggregation against the previous two-query path.
+
+    cd backend && python -m benchmarks.bench_search --items 100000 --auctions 500 --repeat 20
+
+The previous path fetched up to 1000 lots, deduplicated auction_id in Python and queried the
+auctions with $in; it also ignored min_price/max_price without a category. The latency of both
+and the number of auctions each returns (the previous one truncates at 1000 lots) are reported.
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.common import drop_bench_db, latency_summary, report, server
+
+CATEGORIES = ["vehiculos", "camiones", "equipo_medico", "herramientas", "maquinaria", "equipos"]
+STATES = ["Jalisco", "Nuevo León", "Baja California", "Ciudad de México", "Sonora"]
+STATUSES = ["proxima", "activa", "finalizada"]
+
+SCENARIOS = {
+    "category": {"category": "camiones"},
+    "category+price": {"category": "camiones", "min_price": 50000.0, "max_price": 500000.0},
+    "price": {"min_price": 900000.0},
+    "state": {"state": "Jalisco"},
+    "category+state+status": {"category": "maquinaria", "state": "Sonora", "status": "activa"},
+}
+
+
+async def seed(auction_count, item_count, batch_size=5000):
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    auctions = [{
+        "auction_id": str(uuid.uuid4()),
+        "title": f"Subasta {i}",
+        "description": "Subasta de benchmark",
+        "reason": "cierre_empresa",
+        "company_name": "Benchmark S.A.",
+        "start_date": now + timedelta(hours=i),
+        "end_date": now + timedelta(hours=i + 8),
+        "status": rng.choice(STATUSES),
+        "location": "Local",
+        "state": rng.choice(STATES),
+        "total_items": 0,
+        "registration_fee": 500.0,
+        "created_at": now,
+    } for i in range(auction_count)]
+    await server.db.auctions.insert_many(auctions)
+    for start in range(0, item_count, batch_size):
+        batch = []
+        for n in range(start, min(start + batch_size, item_count)):
+            price = round(rng.uniform(1000, 2000000), 2)
+            batch.append({
+                "item_id": str(uuid.uuid4()),
+                "name": f"Lote {n}",
+                "description": "Lote de benchmark",
+                "category": rng.choice(CATEGORIES),
+                "subcategory": "varios",
+                "brand": "Varias",
+                "starting_price": price,
+                "current_bid": price,
+                "estimated_value": {"min": price, "max": price * 1.5},
+                "images": [],
+                "condition": "bueno",
+                "specifications": {},
+                "location": "Local",
+                "auction_id": rng.choice(auctions)["auction_id"],
+                "lot_order": n,
+            })
+        await server.db.auction_items.insert_many(batch)
+
+
+async def legacy_search(category=None, state=None, status=None, min_price=None, max_price=None):
+    """The original search_auctions, one query after the other."""
+    query = {}
+    if category:
+        item_query = {"category": category}
+        if min_price or max_price:
+            price_filter = {}
+            if min_price:
+                price_filter["$gte"] = min_price
+            if max_price:
+                price_filter["$lte"] = max_price
+            item_query["starting_price"] = price_filter
+        items = await server.db.auction_items.find(item_query, {"auction_id": 1}).to_list(1000)
+        query["auction_id"] = {"$in": list(set(item["auction_id"] for item in items))}
+    if state:
+        query["state"] = state
+    if status:
+        query["status"] = status
+    return await server.db.auctions.find(query).to_list(100)
+
+
+async def pipeline_search(category=None, state=None, status=None, min_price=None, max_price=None):
+    auction_match = {key: value for key, value in (("state", state), ("status", status)) if value}
+    item_match = server.search_item_match(category, min_price, max_price)
+    return await server.repos.search.auctions(item_match, auction_match, None, 101, server.SEARCH_RESULT_PROJECTION)
+
+
+async def measure(search, params, repeat):
+    samples, count = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(await search(**params))
+        samples.append(time.perf_counter() - start)
+    return {"results": count, **latency_summary(samples)}
+
+
+async def main(args):
+    await drop_bench_db()
+    try:
+        await server.ensure_indexes()
+        await seed(args.auctions, args.items)
+        results = {}
+        for name, params in SCENARIOS.items():
+            results[name] = {
+                "two_queries": await measure(legacy_search, params, args.repeat),
+                "aggregation": await measure(pipeline_search, params, args.repeat),
+            }
+        report("search_auctions", {"items": args.items, "auctions": args.auctions, "scenarios": results})
+    finally:
+        await drop_bench_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--auctions", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
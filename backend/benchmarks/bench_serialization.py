@@ -0,0 +1,97 @@
+"""
+CPU time per response to serialize a page of lots (no MongoDB).
+
+    cd backend && python -m benchmarks.bench_serialization --items 1000 --requests 200
+
+Compares, over the same --items synthetic lot documents:
+- models: the previous path, _id to str, AuctionItem(**item) per lot and then FastAPI's
+  response_model validation and serialization down to the JSON body;
+- orjson: the documents as the ITEM_PROJECTION projection returns them, to bytes with orjson.
+Measures time.process_time(), so waiting is not counted, only the process's CPU.
+"""
+import argparse
+import asyncio
+import time
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from benchmarks.common import latency_summary, report, server
+
+
+def synthetic_items(count):
+    items = []
+    for n in range(count):
+        item = server.AuctionItem(
+            name=f"Lote {n} Caterpillar 320D",
+            description="Excavadora hidráulica con documentación y mantenimiento al corriente. " * 3,
+            category="maquinaria",
+            subcategory="excavadoras",
+            brand="Caterpillar",
+            model="320D",
+            year=2015,
+            starting_price=850000.0 + n,
+            current_bid=900000.0 + n,
+            estimated_value={"min": 800000, "max": 1200000},
+            images=["0" * 64, "1" * 64],
+            condition="bueno",
+            specifications={"horas_uso": 5400, "motor": "C6.4 ACERT", "numero_lote": str(n)},
+            location="Monterrey, Nuevo León",
+            auction_id="bench-auction",
+            auction_status="activa",
+            lot_order=n,
+        )
+        items.append(item.dict(by_alias=True, exclude={"id"}))
+    return items
+
+
+def items_route():
+    for route in server.app.routes:
+        if getattr(route, "path", None) == "/api/auctions/{auction_id}/items":
+            return route
+    raise LookupError("items route not found")
+
+
+async def model_path(docs, route):
+    items = []
+    for doc in docs:
+        if "_id" in doc:
+            doc["_id"] = str(doc["_id"])
+        items.append(server.AuctionItem(**doc))
+    content = await serialize_response(field=route.response_field, response_content=items)
+    return JSONResponse(content).body
+
+
+async def orjson_path(docs, route):
+    return orjson.dumps(docs, default=server.encode_model)
+
+
+async def measure(path, docs, route, requests):
+    samples = []
+    for _ in range(requests):
+        start = time.process_time()
+        body = await path(docs, route)
+        samples.append(time.process_time() - start)
+    return samples, len(body)
+
+
+async def main(args):
+    docs = synthetic_items(args.items)
+    route = items_route()
+    results = {"items": args.items, "requests": args.requests}
+    # What find() returned without a projection: the same documents with their ObjectId.
+    raw = [{**doc, "_id": ObjectId()} for doc in docs]
+    for name, path, source in (("models", model_path, raw), ("orjson", orjson_path, docs)):
+        samples, size = await measure(path, source, route, args.requests)
+        results[name] = {"body_bytes": size, "cpu": latency_summary(samples)}
+    results["speedup"] = round(results["models"]["cpu"]["mean_ms"] / results["orjson"]["cpu"]["mean_ms"], 1)
+    report("serialization", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,114 @@
+"""
+Settlement time of an ended auction.
+
+    cd backend && python -m benchmarks.bench_settlement --lots 5000
+
+Seeds an ended auction with --lots lots: some without bids, some with a numeric reserve price
+(met or not), some with a reserve whose amount is not published, and their bid history in bids.
+Compares two ways of settling it:
+- per_lot: what a naive job would do, one query to bids per lot for the highest bid and an
+  update_one with the result;
+- engine: SettlementEngine, a single aggregation over the lots and bulk_write writes.
+Target: 5,000 lots in a few seconds.
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+from pymongo import DESCENDING
+
+from benchmarks.common import Timer, drop_bench_db, report, server
+from settlement import SettlementEngine
+
+AUCTION_ID = "bench-settlement"
+
+
+async def seed(lots, bidders):
+    ended = datetime.utcnow() - timedelta(hours=1)
+    await server.db.auctions.insert_one({
+        "auction_id": AUCTION_ID,
+        "title": "Subasta de liquidación",
+        "status": "finalizada",
+        "start_date": ended - timedelta(days=2),
+        "end_date": ended,
+        "total_items": lots,
+    })
+    items, bids = [], []
+    for n in range(lots):
+        price = float(random.randrange(1000, 500000, 500))
+        bid_count = 0 if n % 4 == 0 else random.randrange(1, 20)
+        current_bid = price + bid_count * 500
+        reserve = random.choice([None, True, price * 1.5])
+        item = {
+            "item_id": f"bench-settlement-{n}",
+            "auction_id": AUCTION_ID,
+            "auction_status": "finalizada",
+            "lot_order": n,
+            "starting_price": price,
+            "current_bid": current_bid,
+            "bid_count": bid_count,
+            "specifications": {"numero_lote": str(n)} if reserve is None else {"numero_lote": str(n), "precio_reservado": reserve},
+        }
+        if bid_count:
+            item["high_bidder_id"] = f"bidder-{random.randrange(bidders)}"
+            bids += [
+                {"item_id": item["item_id"], "auction_id": AUCTION_ID, "user_id": item["high_bidder_id"],
+                 "amount": price + k * 500, "created_at": ended - timedelta(seconds=bid_count - k)}
+                for k in range(1, bid_count + 1)
+            ]
+        items.append(item)
+    await server.db.auction_items.insert_many(items)
+    await server.db.bids.insert_many(bids)
+    return len(bids)
+
+
+async def settle_per_lot():
+    """The path to avoid: two database round trips per lot."""
+    async for item in server.db.auction_items.find({"auction_id": AUCTION_ID}):
+        best = await server.db.bids.find_one({"item_id": item["item_id"]}, sort=[("created_at", DESCENDING)])
+        reserve = item["specifications"].get("precio_reservado")
+        if best is None:
+            result = "sin_pujas"
+        elif reserve is not True and reserve is not None and best["amount"] < reserve:
+            result = "reserva_no_alcanzada"
+        elif reserve is True:
+            result = "sujeto_a_aprobacion"
+        else:
+            result = "vendido"
+        await server.db.auction_items.update_one(
+            {"item_id": item["item_id"]},
+            {"$set": {"settlement": {"result": result, "high_bid": best and best["amount"]}}},
+        )
+
+
+async def main(args):
+    random.seed(7)
+    await drop_bench_db()
+    try:
+        await server.ensure_indexes()
+        bids = await seed(args.lots, args.bidders)
+        with Timer() as per_lot:
+            await settle_per_lot()
+        await server.db.auction_items.update_many({}, {"$unset": {"settlement": ""}})
+        engine = SettlementEngine(server.db, batch_size=args.batch_size)
+        with Timer() as batched:
+            summary = await engine.settle(AUCTION_ID)
+        report("settlement", {
+            "lots": args.lots,
+            "bids": bids,
+            "per_lot_s": round(per_lot.elapsed, 3),
+            "engine_s": round(batched.elapsed, 3),
+            "speedup": round(per_lot.elapsed / batched.elapsed, 1),
+            "summary": summary,
+        })
+    finally:
+        await drop_bench_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lots", type=int, default=5000)
+    parser.add_argument("--bidders", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
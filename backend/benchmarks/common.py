@@ -0,0 +1,88 @@
+"""
+Helpers shared by the benchmarks.
+
+The benchmarks run from the backend directory (python -m benchmarks.<name>) against the mongod
+at MONGO_URL. They use a database of their own (BENCH_DB_NAME) that is dropped at the end, so
+development data is left alone. Admission limits (RATE_LIMIT_ENABLED) are off unless asked for:
+every client of a benchmark comes from the same IP.
+
+With REPOSITORY_ENGINE=memory, the ones that only go through server.repos (such as
+bench_catalog and loadtest --in-process) run without mongod and measure only the application.
+"""
+import json
+import os
+import statistics
+import sys
+import time
+
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "auction_bench")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def latency_summary(samples):
+    """Summary in milliseconds of a list of latencies in seconds."""
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+def make_client(base_url=None, timeout=30.0):
+    """HTTP client for a running server (base_url) or for the app in this process."""
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits)
+    return httpx.AsyncClient(app=server.app, base_url="http://bench", timeout=timeout, limits=limits)
+
+
+async def create_bench_user(email="bench@subastas.mx"):
+    """Create a user straight in the database; returns (user, headers carrying its token)."""
+    user = server.User(
+        email=email,
+        full_name="Usuario Benchmark",
+        phone="+52 00 0000 0000",
+        password_hash=server.hash_password("bench-password"),
+    )
+    await server.repos.users.insert(user.dict(by_alias=True, exclude={"id"}))
+    token = server.create_access_token(data={"sub": user.user_id})
+    return user, {"Authorization": f"Bearer {token}"}
+
+
+async def drop_bench_db():
+    if server.REPOSITORY_ENGINE == "memory":
+        server.repos.clear()
+        server.proxy_bids.clear()
+        return
+    await server.client.drop_database(server.db.name)
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def report(name, results):
+    json.dump({"benchmark": name, **results}, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
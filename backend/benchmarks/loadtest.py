@@ -0,0 +1,466 @@
+"""
+Local, reproducible load test: starts the server, seeds a catalog and measures each endpoint.
+
+    cd backend && python -m benchmarks.loadtest --rps 200 --duration 60 --output load.json
+    cd backend && python -m benchmarks.loadtest --spawn-mongod --compare load-main.json
+    cd backend && REPOSITORY_ENGINE=memory python -m benchmarks.loadtest --in-process
+
+1. Database: the one at --mongo-url (MONGO_URL by default) or, with --spawn-mongod, a throwaway
+   mongod on a temporary directory, so nothing but the binary is needed. The BENCH_DB_NAME
+   database is used and dropped at the end. With REPOSITORY_ENGINE=memory and --in-process no
+   mongod is needed at all: the catalog is seeded into server.repos and measures only the
+   application's own cost (image, import and settlement endpoints are not part of the mix).
+2. Seeds --auctions auctions (a third ended, a third live and a third upcoming), --lots lots
+   through CatalogImporter (or the memory repositories) and --users users sharing one password.
+3. Starts uvicorn server:app with --workers processes on a free port and waits until it answers.
+   --base-url targets a server that is already running (not seeded: the users are registered
+   through the API) and --in-process runs the app in this process over the ASGI transport.
+4. Smoke check: a few requests of each scenario in the mix; any non-2xx answer aborts the run.
+5. Open-loop load: --rps requests per second split by --mix for --warmup plus --duration
+   seconds; only what follows the warmup counts. Latency is measured from the moment each
+   request was due, so a saturated server cannot hide it by delaying the sends. Past
+   --max-in-flight pending requests the next ones are dropped and counted as skipped.
+6. JSON report with the commit and the configuration and, per endpoint, requests, errors,
+   statuses, rps and p50/p95/p99 latencies. --compare checks it against an earlier report and
+   exits with status 1 if any endpoint's p95 or throughput is worse by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.bench_import import synthetic_auctions, synthetic_lots
+from benchmarks.common import drop_bench_db, latency_summary, make_client, server
+from catalog_import import CatalogImporter, item_id_for
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+PASSWORD = "loadtest-password"
+SEARCH_TERMS = ["Caterpillar", "Nissan", "Siemens", "DeWalt", "Lote"]
+READY_TIMEOUT = 120.0
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario: {name} (use {', '.join(SCENARIOS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# Database and server
+@asynccontextmanager
+async def mongod(spawn, mongo_url):
+    """The MongoDB URL to use; with spawn, that of a temporary mongod stopped on exit."""
+    if not spawn:
+        yield mongo_url
+        return
+    if shutil.which("mongod") is None:
+        raise SystemExit("--spawn-mongod needs the mongod binary on the PATH")
+    port = free_port()
+    with tempfile.TemporaryDirectory() as dbpath:
+        process = subprocess.Popen(
+            ["mongod", "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+            stdout=subprocess.DEVNULL,
+        )
+        url = f"mongodb://127.0.0.1:{port}"
+        try:
+            client = AsyncIOMotorClient(url, serverSelectionTimeoutMS=int(READY_TIMEOUT * 1000))
+            await client.admin.command("ping")
+            client.close()
+            yield url
+        finally:
+            process.terminate()
+            process.wait()
+
+
+@asynccontextmanager
+async def running_server(args, mongo_url):
+    """HTTP client for the server under test."""
+    if args.base_url:
+        async with make_client(args.base_url) as http:
+            yield http
+        return
+    if args.in_process:
+        await server.app.router.startup()
+        try:
+            async with make_client() as http:
+                yield http
+        finally:
+            await server.app.router.shutdown()
+        return
+    port = free_port()
+    env = {**os.environ, "MONGO_URL": mongo_url, "DB_NAME": server.db.name, "RATE_LIMIT_ENABLED": "false"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    try:
+        async with make_client(f"http://127.0.0.1:{port}") as http:
+            await wait_ready(http, process)
+            yield http
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def drop(db):
+    """Drop the benchmark database, or empty the memory repositories when db is None."""
+    if db is None:
+        await drop_bench_db()
+    else:
+        await db.client.drop_database(db.name)
+
+
+async def wait_ready(http, process):
+    deadline = time.perf_counter() + READY_TIMEOUT
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"the server exited on startup (status {process.returncode})")
+        try:
+            if (await http.get("/api/auctions", params={"limit": 1})).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit("the server did not answer in time")
+
+
+# Data
+async def seed(db, args):
+    """Seed the catalog and the users into db, or into the memory repositories when db is None."""
+    now = datetime.utcnow()
+    windows = [
+        (now - timedelta(days=3), now - timedelta(days=1), "finalizada"),
+        (now - timedelta(days=1), now + timedelta(days=1), "activa"),
+        (now + timedelta(days=1), now + timedelta(days=3), "proxima"),
+    ]
+    auctions = []
+    for n, auction in enumerate(synthetic_auctions(args.auctions)):
+        start, end, status = windows[n % len(windows)]
+        auctions.append({**auction, "start_date": start.isoformat(), "end_date": end.isoformat(), "status": status})
+    lots = synthetic_lots(args.lots, args.auctions)
+    if db is None:
+        await seed_repositories(auctions, lots)
+    else:
+        importer = CatalogImporter(db, server.Auction, server.AuctionItem)
+        await importer.import_auctions(auctions)
+        await importer.import_items(lots)
+        await importer.finish()
+
+    password_hash = server.hash_password(PASSWORD)
+    users = [
+        server.User(email=email, full_name=f"Postor {n}", phone="+52 00 0000 0000", password_hash=password_hash)
+        for n, email in enumerate(user_emails(args.users))
+    ]
+    documents = [user.dict(by_alias=True, exclude={"id"}) for user in users]
+    if db is None:
+        for document in documents:
+            await server.repos.users.insert(document)
+    else:
+        await db.users.insert_many(documents)
+
+
+async def seed_repositories(auctions, lots):
+    """Store what CatalogImporter would, through server.repos, for the memory engine."""
+    lots = list(lots)
+    totals = {}
+    for lot in lots:
+        totals[lot["auction_id"]] = totals.get(lot["auction_id"], 0) + 1
+    statuses = {}
+    for auction in auctions:
+        statuses[auction["auction_id"]] = auction["status"]
+        document = server.Auction(**auction, total_items=totals.get(auction["auction_id"], 0))
+        await server.repos.auctions.insert(document.dict(by_alias=True, exclude={"id"}))
+    for lot in lots:
+        item = server.AuctionItem(
+            **lot,
+            item_id=item_id_for(lot["auction_id"], lot["lot_order"]),
+            current_bid=lot["starting_price"],
+            images=[],
+            auction_status=statuses[lot["auction_id"]],
+        )
+        await server.repos.items.insert(item.dict(by_alias=True, exclude={"id"}))
+
+
+def user_emails(count):
+    return [f"loadtest-{n}@subastas.mx" for n in range(count)]
+
+
+async def register_users(http, emails):
+    for email in emails:
+        while True:
+            response = await http.post("/api/auth/register", json={
+                "email": email, "full_name": "Postor de carga", "phone": "+52 00 0000 0000", "password": PASSWORD,
+            })
+            if response.status_code != 429:
+                break
+            await asyncio.sleep(float(response.headers.get("retry-after", "1")))  # admission limits
+        if response.status_code not in (200, 400):  # 400: registered by an earlier run
+            raise SystemExit(f"could not register {email}: {response.status_code} {response.text[:200]}")
+
+
+async def discover_catalog(http, max_auctions=50):
+    """Real ids for the URLs, read through the API as a client would see them."""
+    auction_ids, cursor = [], None
+    while True:
+        response = await http.get("/api/auctions", params={"fields": "auction_id", "limit": 500, "cursor": cursor})
+        auction_ids += [auction["auction_id"] for auction in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    item_ids = []
+    for auction_id in auction_ids[:max_auctions]:
+        response = await http.get(f"/api/auctions/{auction_id}/items", params={"fields": "item_id", "limit": 100})
+        item_ids += [item["item_id"] for item in response.json()]
+    if not auction_ids or not item_ids:
+        raise SystemExit("the catalog is empty")
+    return auction_ids, item_ids
+
+
+# Scenarios: each picks a request and names it by its route template.
+def read_request(rng, catalog):
+    auction_ids, item_ids, _ = catalog
+    choice = rng.randrange(4)
+    if choice == 0:
+        return "GET /api/auctions", "GET", "/api/auctions", {"params": {"limit": 20}}
+    if choice == 1:
+        return "GET /api/auctions/{id}", "GET", f"/api/auctions/{rng.choice(auction_ids)}", {}
+    if choice == 2:
+        return "GET /api/auctions/{id}/items", "GET", f"/api/auctions/{rng.choice(auction_ids)}/items", {"params": {"limit": 50}}
+    return "GET /api/items/{id}", "GET", f"/api/items/{rng.choice(item_ids)}", {}
+
+
+def search_request(rng, catalog):
+    if rng.random() < 0.5:
+        params = {"category": rng.choice(["vehiculos", "maquinaria", "herramientas"]), "limit": 20}
+        return "GET /api/search/auctions", "GET", "/api/search/auctions", {"params": params}
+    return "GET /api/search/items", "GET", "/api/search/items", {"params": {"q": rng.choice(SEARCH_TERMS)}}
+
+
+def login_request(rng, catalog):
+    _, _, emails = catalog
+    body = {"email": rng.choice(emails), "password": PASSWORD}
+    return "POST /api/auth/login", "POST", "/api/auth/login", {"json": body}
+
+
+SCENARIOS = {"read": read_request, "search": search_request, "login": login_request}
+
+
+async def smoke_check(http, catalog, mix):
+    """A few requests of each scenario in the mix; lot search answers 503 until its index is built."""
+    requests = [SCENARIOS[name](random.Random(n), catalog) for name in mix for n in range(8)]
+    deadline = time.perf_counter() + READY_TIMEOUT
+    for name, method, url, kwargs in requests:
+        while True:
+            response = await http.request(method, url, **kwargs)
+            if response.status_code != 503 or time.perf_counter() > deadline:
+                break
+            await asyncio.sleep(0.5)
+        if not 200 <= response.status_code < 300:
+            raise SystemExit(f"{name} answered {response.status_code}: {response.text[:200]}")
+
+
+# Load
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+
+    def record(self, status, latency):
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors += 1
+
+
+async def send(http, request, scheduled_at, stats):
+    name, method, url, kwargs = request
+    try:
+        status = (await http.request(method, url, **kwargs)).status_code
+    except httpx.HTTPError as exc:
+        status = type(exc).__name__
+    if stats is not None:
+        stats.setdefault(name, EndpointStats()).record(status, time.perf_counter() - scheduled_at)
+
+
+async def drive(http, catalog, args):
+    rng = random.Random(args.seed)
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    stats, tasks, skipped = {}, set(), 0
+    interval = 1.0 / args.rps
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    stop_at = measure_from + args.duration
+    n = 0
+    while True:
+        scheduled_at = started + n * interval
+        if scheduled_at >= stop_at:
+            break
+        n += 1
+        await asyncio.sleep(max(0.0, scheduled_at - time.perf_counter()))
+        request = SCENARIOS[rng.choices(names, weights)[0]](rng, catalog)
+        recording = scheduled_at >= measure_from
+        if len(tasks) >= args.max_in_flight:
+            skipped += recording
+            continue
+        task = asyncio.create_task(send(http, request, scheduled_at, stats if recording else None))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.wait(tasks)
+    return stats, skipped
+
+
+def summarize(stats, duration):
+    endpoints = {}
+    for name, endpoint in sorted(stats.items()):
+        endpoints[name] = {
+            "requests": len(endpoint.latencies),
+            "errors": endpoint.errors,
+            "statuses": {str(status): count for status, count in endpoint.statuses.items()},
+            "rps": round(len(endpoint.latencies) / duration, 1),
+            "latency": latency_summary(endpoint.latencies),
+        }
+    return endpoints
+
+
+def compare(report, baseline, tolerance):
+    """Per-endpoint changes against an earlier report; regressions lists the endpoints that got worse."""
+    changes, regressions = {}, []
+    for name, current in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before or not before["latency"].get("count"):
+            continue
+        p95 = current["latency"]["p95_ms"] / before["latency"]["p95_ms"] - 1 if before["latency"]["p95_ms"] else 0.0
+        rps = current["rps"] / before["rps"] - 1 if before["rps"] else 0.0
+        changes[name] = {"p95_change": round(p95, 3), "rps_change": round(rps, 3)}
+        if p95 > tolerance or rps < -tolerance:
+            regressions.append(name)
+    # rps follows the offered load: it is only comparable between runs with the same configuration.
+    config_differs = sorted(key for key, value in report["config"].items() if baseline.get("config", {}).get(key) != value)
+    return {
+        "baseline_commit": baseline.get("commit"),
+        "tolerance": tolerance,
+        "config_differs": config_differs,
+        "changes": changes,
+        "regressions": regressions,
+    }
+
+
+async def main(args):
+    async with mongod(args.spawn_mongod, args.mongo_url) as mongo_url:
+        seeded = not args.base_url
+        memory = server.REPOSITORY_ENGINE == "memory"
+        client = None
+        db = None if memory else server.db
+        if seeded and not args.in_process:
+            client = AsyncIOMotorClient(mongo_url)
+            db = client[server.db.name]
+        try:
+            if seeded:
+                await drop(db)
+                await seed(db, args)
+            async with running_server(args, mongo_url) as http:
+                emails = user_emails(args.users)
+                if not seeded:
+                    await register_users(http, emails)
+                auction_ids, item_ids = await discover_catalog(http)
+                catalog = (auction_ids, item_ids, emails)
+                await smoke_check(http, catalog, args.mix)
+                stats, skipped = await drive(http, catalog, args)
+        finally:
+            if seeded:
+                await drop(db)
+            if client is not None:
+                client.close()
+
+    endpoints = summarize(stats, args.duration)
+    report = {
+        "benchmark": "loadtest",
+        "commit": git_commit(),
+        "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "config": {
+            "rps": args.rps, "duration": args.duration, "warmup": args.warmup, "mix": args.mix,
+            "workers": None if args.base_url or args.in_process else args.workers,
+            "target": args.base_url or ("in-process" if args.in_process else "uvicorn"),
+            "engine": None if args.base_url else server.REPOSITORY_ENGINE,
+            "auctions": args.auctions, "lots": args.lots, "users": args.users, "seed": args.seed,
+        },
+        "total": {
+            "requests": sum(endpoint["requests"] for endpoint in endpoints.values()),
+            "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+            "skipped": skipped,
+            "rps": round(sum(endpoint["rps"] for endpoint in endpoints.values()), 1),
+        },
+        "endpoints": endpoints,
+    }
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as stream:
+            report["comparison"] = compare(report, json.load(stream), args.tolerance)
+        exit_code = 1 if report["comparison"]["regressions"] else 0
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as stream:
+            stream.write(text + "\n")
+    print(text)
+    return exit_code
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=100.0, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of unmeasured load before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("read=70,search=20,login=10"))
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--auctions", type=int, default=150)
+    parser.add_argument("--lots", type=int, default=15000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7, help="seed of the request sequence")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--spawn-mongod", action="store_true", help="start a temporary mongod")
+    parser.add_argument("--base-url", help="server already running; not seeded")
+    parser.add_argument("--in-process", action="store_true", help="run the app in this process, without uvicorn")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression, 0.2 = 20%%")
+    args = parser.parse_args()
+    if args.in_process and (args.spawn_mongod or args.base_url):
+        parser.error("--in-process uses the MONGO_URL database; it does not combine with --spawn-mongod or --base-url")
+    if server.REPOSITORY_ENGINE == "memory" and not args.in_process:
+        parser.error("REPOSITORY_ENGINE=memory keeps the catalog in this process: run it with --in-process")
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,120 @@
+"""
+In-process fan-out of live auction updates.
+
+One AuctionBroadcaster exists per auction with at least one listener. A published message is
+serialized once and pushed into every subscriber's bounded queue without awaiting, so a stalled
+client can never slow down the publisher or the other subscribers: when its queue is full it is
+dropped and its connection is closed, and the client is expected to reconnect and refetch.
+"""
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Receives the auction id and a publish callback; runs until cancelled.
+Watcher = Callable[[str, Callable[[dict], None]], Awaitable[None]]
+
+
+class Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    async def get(self) -> Optional[str]:
+        """Next serialized message, or None once the subscriber has been dropped."""
+        return await self.queue.get()
+
+    def offer(self, text: str) -> bool:
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def drop(self):
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class AuctionBroadcaster:
+    def __init__(self, auction_id: str, queue_size: int):
+        self.auction_id = auction_id
+        self.queue_size = queue_size
+        self.subscribers: Set[Subscriber] = set()
+        self.dropped_count = 0
+        self.watch_task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, message: dict):
+        text = json.dumps(message, separators=(",", ":"), default=str)
+        for subscriber in list(self.subscribers):
+            if not subscriber.offer(text):
+                self.subscribers.discard(subscriber)
+                subscriber.drop()
+                self.dropped_count += 1
+                logger.warning("Dropped slow live subscriber on auction %s", self.auction_id)
+
+
+class BroadcastHub:
+    """
+    Registry of broadcasters keyed by auction id.
+
+    Messages come either from publish() (single worker: the bid handler publishes directly) or
+    from a watcher coroutine started with the first subscriber of an auction, e.g. a MongoDB
+    change stream when several workers serve the same auction. If a watcher fails, its auction's
+    subscribers are dropped rather than left waiting on a feed that went quiet; they reconnect,
+    which starts a new watcher.
+    """
+
+    def __init__(self, queue_size: int = 64, watcher: Optional[Watcher] = None):
+        self.queue_size = queue_size
+        self.watcher = watcher
+        self.broadcasters: Dict[str, AuctionBroadcaster] = {}
+
+    def subscribe(self, auction_id: str) -> Subscriber:
+        broadcaster = self.broadcasters.get(auction_id)
+        if broadcaster is None:
+            broadcaster = AuctionBroadcaster(auction_id, self.queue_size)
+            self.broadcasters[auction_id] = broadcaster
+            if self.watcher is not None:
+                broadcaster.watch_task = asyncio.create_task(self.watcher(auction_id, broadcaster.publish))
+                broadcaster.watch_task.add_done_callback(lambda task: self._watch_stopped(broadcaster, task))
+        return broadcaster.subscribe()
+
+    def unsubscribe(self, auction_id: str, subscriber: Subscriber):
+        broadcaster = self.broadcasters.get(auction_id)
+        if broadcaster is None:
+            return
+        broadcaster.unsubscribe(subscriber)
+        if not broadcaster.subscribers:
+            del self.broadcasters[auction_id]
+            if broadcaster.watch_task is not None:
+                broadcaster.watch_task.cancel()
+
+    def publish(self, auction_id: str, message: dict):
+        # Nobody listening means nothing to serialize.
+        broadcaster = self.broadcasters.get(auction_id)
+        if broadcaster is not None:
+            broadcaster.publish(message)
+
+    def _watch_stopped(self, broadcaster: AuctionBroadcaster, task: asyncio.Task):
+        if task.cancelled() or task.exception() is None:
+            return
+        logger.error("Live bid watcher for auction %s stopped; dropping its subscribers",
+                     broadcaster.auction_id, exc_info=task.exception())
+        if self.broadcasters.get(broadcaster.auction_id) is broadcaster:
+            del self.broadcasters[broadcaster.auction_id]
+        for subscriber in list(broadcaster.subscribers):
+            subscriber.drop()
+        broadcaster.subscribers.clear()
@@ -0,0 +1,286 @@
+"""
+Bulk import of auctions and lots from CSV or JSONL files.
+
+    cd backend && python catalog_import.py --auctions subastas.csv --items lotes.jsonl
+
+Files are read one row at a time and validated with the Auction/AuctionItem models, on a worker
+thread so the API keeps serving during an import. Valid rows are written in unordered bulk_write
+batches of upserts keyed on deterministic ids, and the next batch is parsed while the previous
+one is being written. Rows mongod refuses (a bulk write error) are reported like invalid rows. Auctions must carry their
+auction_id; lots use item_id when present, otherwise an id derived from (auction_id, lot_order),
+so importing the same file twice updates the same documents instead of duplicating them.
+
+Re-importing a lot never touches its bidding state (current_bid, bid_count, high bidder): those
+are only set when the lot is created. After the rows are written, total_items of every touched
+auction is recomputed with one aggregation and the lots' auction_status is synced.
+
+CSV columns map to top-level fields; nested fields use dotted columns (estimated_value.min,
+specifications.motor) and images is a "|"-separated list of image hashes already uploaded
+through POST /api/images. Empty cells are treated as missing.
+
+Imports through POST /api/admin/import also refresh the server's search index and response
+cache; after a CLI import, running workers see the changes once their caches expire, and lot
+search needs a restart to include new lots. Either way the status column is only a starting
+point: the server's lifecycle scheduler corrects it from start_date/end_date.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from image_store import is_image_ref
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+ITEM_ID_NAMESPACE = uuid.UUID("5b0f3c1e-6f1a-4d5e-9a47-3f8e2c9d7a10")
+
+# Set only when a lot is created, so re-imports during a live auction keep its bids.
+ITEM_BIDDING_FIELDS = ("current_bid", "bid_count")
+AUCTION_INSERT_ONLY_FIELDS = ("created_at", "total_items", "registered_count")
+
+
+def item_id_for(auction_id: str, lot_order: int) -> str:
+    return str(uuid.uuid5(ITEM_ID_NAMESPACE, f"{auction_id}:{lot_order}"))
+
+
+def read_rows(stream: TextIO, filename: str) -> Iterator:
+    """Rows of a .csv or .jsonl/.ndjson file as dicts, one at a time."""
+    if filename.endswith(".csv"):
+        return (unflatten(row) for row in csv.DictReader(stream))
+    if filename.endswith((".jsonl", ".ndjson")):
+        return json_lines(stream)
+    raise ValueError(f"Unsupported file type: {filename} (expected .csv or .jsonl)")
+
+
+def json_lines(stream: TextIO) -> Iterator:
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as exc:
+            # Yielded rather than raised, so one bad line is reported instead of ending the file.
+            yield exc
+
+
+def unflatten(row: dict) -> dict:
+    record: dict = {}
+    for column, value in row.items():
+        if column is None or value is None or value == "":
+            continue
+        if column == "images":
+            value = [image.strip() for image in value.split("|") if image.strip()]
+        parent, _, child = column.partition(".")
+        if child:
+            record.setdefault(parent, {})[child] = value
+        else:
+            record[column] = value
+    return record
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.written = 0
+        self.upserted = 0
+        self.modified = 0
+        self.errors: List[dict] = []
+        self.error_count = 0
+        self.seconds = 0.0
+        # Rows are validated on a thread while write errors come in on the event loop.
+        self.lock = threading.Lock()
+
+    def error(self, source: str, line: int, message: str):
+        with self.lock:
+            self.error_count += 1
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append({"file": source, "row": line, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "written": self.written,
+            "upserted": self.upserted,
+            "modified": self.modified,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 3),
+            "rows_per_s": round(self.rows / self.seconds, 1) if self.seconds else None,
+        }
+
+
+class CatalogImporter:
+    def __init__(self, db, auction_model, item_model, batch_size: int = BATCH_SIZE):
+        self.db = db
+        self.auction_model = auction_model
+        self.item_model = item_model
+        self.batch_size = batch_size
+        self.report = ImportReport()
+        self.touched_auctions: Set[str] = set()
+        self.item_ids: List[str] = []
+        self.auction_statuses: Dict[str, str] = {}
+
+    async def import_auctions(self, rows: Iterable[dict], source: str = "auctions"):
+        await self._write_batches(self.db.auctions, rows, source, self._auction_upsert)
+
+    async def import_items(self, rows: Iterable[dict], source: str = "items"):
+        self.auction_statuses = {
+            auction["auction_id"]: auction["status"]
+            async for auction in self.db.auctions.find({}, {"_id": 0, "auction_id": 1, "status": 1})
+        }
+        await self._write_batches(self.db.auction_items, rows, source, self._item_upsert)
+
+    async def finish(self) -> dict:
+        """Recompute total_items and auction_status for every auction touched by the import."""
+        auction_ids = sorted(self.touched_auctions)
+        if auction_ids:
+            await self.db.auction_items.aggregate([
+                {"$match": {"auction_id": {"$in": auction_ids}}},
+                {"$group": {"_id": "$auction_id", "total_items": {"$sum": 1}}},
+                {"$project": {"_id": 0, "auction_id": "$_id", "total_items": 1}},
+                {"$merge": {"into": "auctions", "on": "auction_id", "whenMatched": "merge", "whenNotMatched": "discard"}},
+            ]).to_list(None)
+            async for auction in self.db.auctions.find({"auction_id": {"$in": auction_ids}}, {"auction_id": 1, "status": 1}):
+                await self.db.auction_items.update_many(
+                    {"auction_id": auction["auction_id"], "auction_status": {"$ne": auction["status"]}},
+                    {"$set": {"auction_status": auction["status"]}},
+                )
+        return self.report.as_dict()
+
+    def _auction_upsert(self, record: dict) -> UpdateOne:
+        if not record.get("auction_id"):
+            raise ValueError("auction_id is required")
+        auction = self.auction_model(**record).dict(by_alias=True, exclude={"id"})
+        # total_items is recomputed from the lots in finish(); registered_count is kept by registrations.
+        on_insert = {field: auction.pop(field) for field in AUCTION_INSERT_ONLY_FIELDS}
+        self.touched_auctions.add(auction["auction_id"])
+        self.auction_statuses[auction["auction_id"]] = auction["status"]
+        return UpdateOne({"auction_id": auction["auction_id"]}, {"$set": auction, "$setOnInsert": on_insert}, upsert=True)
+
+    def _item_upsert(self, record: dict) -> UpdateOne:
+        status = self.auction_statuses.get(record.get("auction_id"))
+        if status is None:
+            raise ValueError(f"Unknown auction_id: {record.get('auction_id')}")
+        if not record.get("item_id"):
+            if "lot_order" not in record:
+                raise ValueError("item_id or lot_order is required")
+            record["item_id"] = item_id_for(record["auction_id"], int(record["lot_order"]))
+        record.setdefault("current_bid", record.get("starting_price"))
+        record.setdefault("images", [])
+        record["auction_status"] = status
+        item = self.item_model(**record).dict(by_alias=True, exclude={"id"})
+        bad_images = [image for image in item["images"] if not is_image_ref(image)]
+        if bad_images:
+            raise ValueError(f"images must be hashes of uploaded images: {bad_images[0][:20]}")
+        on_insert = {field: item.pop(field) for field in ITEM_BIDDING_FIELDS}
+        self.touched_auctions.add(item["auction_id"])
+        self.item_ids.append(item["item_id"])
+        return UpdateOne({"item_id": item["item_id"]}, {"$set": item, "$setOnInsert": on_insert}, upsert=True)
+
+    async def _write_batches(self, collection, rows: Iterable[dict], source: str, to_upsert):
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        numbered = enumerate(rows, start=1)
+        pending: Optional[asyncio.Task] = None
+        done = False
+        while not done:
+            # Reading and validating rows is CPU bound, so it runs on a thread; one write stays
+            # in flight meanwhile. Only one parse runs at a time, so the iterator is never shared.
+            batch, lines, done = await loop.run_in_executor(None, self._parse_batch, numbered, source, to_upsert)
+            if pending is not None:
+                await pending
+                pending = None
+            if batch:
+                pending = asyncio.create_task(self._write(collection, batch, lines, source))
+        if pending is not None:
+            await pending
+        self.report.seconds += time.perf_counter() - started
+
+    def _parse_batch(self, numbered: Iterator, source: str, to_upsert) -> Tuple[List[UpdateOne], List[int], bool]:
+        """Up to batch_size upserts from the rows, their line numbers, and whether the rows ran out."""
+        batch: List[UpdateOne] = []
+        lines: List[int] = []
+        for line, record in numbered:
+            self.report.rows += 1
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                if not isinstance(record, dict):
+                    raise ValueError("row must be an object")
+                batch.append(to_upsert(record))
+                lines.append(line)
+            except (ValidationError, ValueError, TypeError) as exc:
+                self.report.error(source, line, str(exc))
+                continue
+            if len(batch) >= self.batch_size:
+                return batch, lines, False
+        return batch, lines, True
+
+    async def _write(self, collection, batch: List[UpdateOne], lines: List[int], source: str):
+        try:
+            result = await collection.bulk_write(batch, ordered=False)
+        except BulkWriteError as exc:
+            # Unordered: every other upsert of the batch was still applied.
+            details = exc.details
+            for error in details.get("writeErrors", []):
+                self.report.error(source, lines[error["index"]], error.get("errmsg", "write error"))
+            for error in details.get("writeConcernErrors", []):
+                self.report.error(source, 0, error.get("errmsg", "write concern error"))
+            self.report.written += len(batch) - len(details.get("writeErrors", []))
+            self.report.upserted += details.get("nUpserted", 0)
+            self.report.modified += details.get("nModified", 0)
+            return
+        self.report.written += len(batch)
+        self.report.upserted += result.upserted_count
+        self.report.modified += result.modified_count
+
+
+async def import_files(importer: CatalogImporter, auctions: Optional[TextIO], auctions_name: str,
+                       items: Optional[TextIO], items_name: str) -> dict:
+    """Auctions first, so lots in the same import can reference them."""
+    # Both file types are checked before anything is written.
+    auction_rows = read_rows(auctions, auctions_name) if auctions is not None else None
+    item_rows = read_rows(items, items_name) if items is not None else None
+    if auction_rows is not None:
+        await importer.import_auctions(auction_rows, auctions_name)
+    if item_rows is not None:
+        await importer.import_items(item_rows, items_name)
+    return await importer.finish()
+
+
+def open_text(path: Optional[str]) -> Optional[TextIO]:
+    # utf-8-sig drops the BOM spreadsheet programs put at the start of CSV exports.
+    return io.open(path, encoding="utf-8-sig", newline="") if path else None
+
+
+async def main(args):
+    import server  # the CLI shares the app's database settings and index definitions
+
+    await server.ensure_indexes()
+    importer = CatalogImporter(server.db, server.Auction, server.AuctionItem, args.batch_size)
+    auctions, items = open_text(args.auctions), open_text(args.items)
+    try:
+        report = await import_files(importer, auctions, args.auctions or "", items, args.items or "")
+    finally:
+        for stream in (auctions, items):
+            if stream is not None:
+                stream.close()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--auctions", help="subastas en .csv o .jsonl")
+    parser.add_argument("--items", help="lotes en .csv o .jsonl")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    asyncio.run(main(parser.parse_args()))
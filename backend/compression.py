@@ -0,0 +1,146 @@
+"""
+gzip and brotli response compression, negotiated from Accept-Encoding.
+
+Compressor picks the encoding for a request and compresses bodies. Bodies of at least
+offload_size bytes are compressed on its thread pool (zlib and brotli release the GIL), so a
+large item list never stalls the event loop; smaller ones are cheaper to compress inline than
+to hand to a thread. It also counts the bytes and CPU seconds spent per encoding, which
+/metrics exports.
+
+CompressionMiddleware compresses whole JSON and text bodies of at least minimum_size bytes.
+Streamed bodies (images, which are compressed already anyway) and responses that already have
+a Content-Encoding pass through: cached_json sends the compressed variant it keeps for each cache
+entry, so a cached catalog response is compressed once per encoding instead of per request.
+
+A compressed representation gets its own ETag (the plain one with "-<encoding>" appended) and
+every compressible response carries Vary: Accept-Encoding, so shared caches keep them apart.
+"""
+import asyncio
+import gzip
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Dict, Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+
+# Server preference when the client accepts both with the same quality.
+ENCODINGS = ("br", "gzip")
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Preferred encoding the client accepts, None for identity."""
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        name, _, value = params.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class Compressor:
+    def __init__(self, minimum_size: int, offload_size: int, executor: Optional[Executor],
+                 gzip_level: int = 6, brotli_quality: int = 4):
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.executor = executor
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.bytes_in: Dict[str, int] = dict.fromkeys(ENCODINGS, 0)
+        self.bytes_out: Dict[str, int] = dict.fromkeys(ENCODINGS, 0)
+        self.cpu_seconds: Dict[str, float] = dict.fromkeys(ENCODINGS, 0.0)
+        self.lock = threading.Lock()
+
+    def choose(self, accept_encoding: str, size: int) -> Optional[str]:
+        """Encoding for a body of `size` bytes, None when it should be sent as is."""
+        if size < self.minimum_size:
+            return None
+        return negotiate(accept_encoding)
+
+    def compress_sync(self, body: bytes, encoding: str) -> bytes:
+        start = time.thread_time()
+        if encoding == "br":
+            compressed = brotli.compress(body, mode=brotli.MODE_TEXT, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        elapsed = time.thread_time() - start
+        with self.lock:
+            self.bytes_in[encoding] += len(body)
+            self.bytes_out[encoding] += len(compressed)
+            self.cpu_seconds[encoding] += elapsed
+        return compressed
+
+    async def compress(self, body: bytes, encoding: str) -> bytes:
+        if len(body) >= self.offload_size:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self.compress_sync, body, encoding)
+        return self.compress_sync(body, encoding)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, compressor: Compressor, enabled: bool = True):
+        self.app = app
+        self.compressor = compressor
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        if negotiate(accept_encoding) is None:
+            return await self.app(scope, receive, send)
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Held back until the body shows whether it can be compressed.
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                return await send(message)
+            response_start, start = start, None
+            headers = MutableHeaders(raw=list(response_start.get("headers", [])))
+            body = message.get("body", b"")
+            encoding = None
+            if not message.get("more_body") and "content-encoding" not in headers and is_compressible(headers.get("content-type", "")):
+                headers.add_vary_header("Accept-Encoding")
+                encoding = self.compressor.choose(accept_encoding, len(body))
+            if encoding is not None:
+                compressed = await self.compressor.compress(body, encoding)
+                if len(compressed) < len(body):
+                    body = compressed
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    if "etag" in headers:
+                        headers["ETag"] = encoded_etag(headers["etag"], encoding)
+                    message = {**message, "body": body}
+            await send({**response_start, "headers": headers.raw})
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
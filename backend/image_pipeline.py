@@ -0,0 +1,148 @@
+"""
+Thumbnail and WebP derivatives of stored images.
+
+Decoding and resizing photos is CPU bound, so it never runs on the event loop: each image is
+rendered in a ProcessPoolExecutor, producing every (size, format) variant in one pass. Uploads
+feed a bounded queue drained by a fixed number of tasks, so a bulk upload waits for room
+instead of piling up unbounded work. Variants missing when requested (old images, or uploads
+that arrived while the queue was full) are rendered on first request; concurrent requests for
+the same image share one render. An image that cannot be decoded, trips Pillow's
+decompression bomb limit or kills its worker process fails with RenderError; a pool broken by
+a dead worker is replaced, so later renders are not refused along with it.
+
+Variants are stored in the image store like any other image and mapped from
+(source hash, size, format) in the image_variants collection.
+"""
+import asyncio
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels; images are never upscaled.
+SIZES = {"thumb": 160, "card": 480, "full": 1280}
+FORMATS = {"jpeg": ("JPEG", {"quality": 82, "optimize": True}), "webp": ("WEBP", {"quality": 80, "method": 4})}
+
+
+def variant_id(digest: str, size: str, fmt: str) -> str:
+    return f"{digest}:{size}:{fmt}"
+
+
+def render_variants(data: bytes) -> Dict[Tuple[str, str], bytes]:
+    """Every (size, format) variant of an image. Runs in a worker process."""
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+    variants = {}
+    for size, edge in SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((edge, edge), Image.LANCZOS)
+        for fmt, (pil_format, options) in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, **options)
+            variants[(size, fmt)] = buffer.getvalue()
+    return variants
+
+
+class QueueFull(Exception):
+    pass
+
+
+class RenderError(Exception):
+    """The stored bytes could not be decoded as an image, or decoding them killed the worker."""
+
+
+class ImagePipeline:
+    def __init__(self, store, variants, workers: Optional[int] = None, queue_size: int = 100):
+        self.store = store
+        self.variants = variants
+        self.workers = workers or os.cpu_count() or 1
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.tasks = []
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.rendered = 0
+
+    def start(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        # One consumer per process keeps every worker busy without queueing inside the pool.
+        self.tasks = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def enqueue(self, digest: str, timeout: float):
+        """Queue derivative rendering for a new image, waiting up to timeout for room."""
+        try:
+            await asyncio.wait_for(self.queue.put(digest), timeout)
+        except asyncio.TimeoutError:
+            raise QueueFull()
+
+    async def join(self):
+        await self.queue.join()
+
+    async def variant(self, digest: str, size: str, fmt: str) -> Optional[str]:
+        """Hash of the requested variant, rendering it now if needed; None if the image is missing."""
+        found = await self.variants.find_one({"_id": variant_id(digest, size, fmt)})
+        if found:
+            return found["image"]
+        if not await self.store.exists(digest):
+            return None
+        await self.render(digest)
+        found = await self.variants.find_one({"_id": variant_id(digest, size, fmt)})
+        return found["image"] if found else None
+
+    async def render(self, digest: str):
+        future = self.in_flight.get(digest)
+        if future is None:
+            future = self.in_flight[digest] = asyncio.ensure_future(self._render(digest))
+            future.add_done_callback(lambda _: self.in_flight.pop(digest, None))
+        await asyncio.shield(future)
+
+    async def _render(self, digest: str):
+        grid_out = await self.store.open(digest)
+        data = await grid_out.read()
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            variants = await loop.run_in_executor(executor, render_variants, data)
+        except BrokenProcessPool as exc:
+            # A worker died mid-render (e.g. killed for memory); the pool accepts no more work.
+            self._replace_pool(executor)
+            raise RenderError(digest) from exc
+        except (OSError, ValueError, Image.DecompressionBombError) as exc:
+            raise RenderError(digest) from exc
+        for (size, fmt), variant in variants.items():
+            variant_digest = await self.store.put(variant, f"image/{fmt}")
+            await self.variants.update_one(
+                {"_id": variant_id(digest, size, fmt)},
+                {"$set": {"source": digest, "size": size, "format": fmt, "image": variant_digest}},
+                upsert=True,
+            )
+        self.rendered += 1
+
+    def _replace_pool(self, broken: ProcessPoolExecutor):
+        # Renders that failed together on the same pool replace it once.
+        if self.executor is not broken:
+            return
+        logger.error("Image worker pool broke; starting a new one")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    async def _consume(self):
+        while True:
+            digest = await self.queue.get()
+            try:
+                await self.render(digest)
+            except Exception:
+                logger.exception("Could not render variants of image %s", digest)
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,139 @@
+"""
+Content-addressed image storage on GridFS.
+
+Each image is stored once under the SHA-256 of its bytes, which is also its GridFS file id.
+Lots reference images by that hash, so identical photos uploaded for many lots share a
+single blob, and a hash never changes meaning: responses can be cached forever.
+"""
+import hashlib
+import re
+from typing import AsyncIterator, Optional, Tuple
+
+from gridfs.errors import NoFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo.errors import DuplicateKeyError
+
+IMAGE_REF_RE = re.compile(r"^[0-9a-f]{64}$")
+
+STREAM_CHUNK_SIZE = 255 * 1024  # GridFS default chunk size
+
+MAGIC_TYPES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def is_image_ref(value: str) -> bool:
+    return bool(IMAGE_REF_RE.match(value))
+
+
+def sniff_content_type(data: bytes) -> str:
+    for magic, content_type in MAGIC_TYPES:
+        if data.startswith(magic):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive (start, end) for a single "bytes=" range, or None to serve the whole file.
+
+    Raises ValueError when the range cannot be satisfied (416). Malformed ranges, such as
+    "bytes=5-3", are ignored like other unsupported ones, as RFC 9110 allows.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        # Other units and multipart ranges are not supported: send the full body.
+        return None
+    first, _, last = (part.strip() for part in spec.partition("-"))
+    if not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+        if last and start > end:
+            return None
+    else:
+        # Suffix range: the last N bytes.
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start >= size:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+class ImageStore:
+    def __init__(self, db, bucket_name: str = "images"):
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name)
+        self.files = db[f"{bucket_name}.files"]
+
+    async def put(self, data: bytes, content_type: Optional[str] = None) -> str:
+        """Store the bytes unless already present; returns their hash."""
+        digest = hashlib.sha256(data).hexdigest()
+        if await self.files.find_one({"_id": digest}, {"_id": 1}):
+            return digest
+        try:
+            await self.bucket.upload_from_stream_with_id(
+                digest,
+                digest,
+                data,
+                metadata={"content_type": content_type or sniff_content_type(data)},
+            )
+        except DuplicateKeyError:
+            pass  # a concurrent upload stored the same bytes first
+        return digest
+
+    async def exists(self, digest: str) -> bool:
+        return await self.files.find_one({"_id": digest}, {"_id": 1}) is not None
+
+    async def open(self, digest: str):
+        """GridOut for the image, or None if it is not stored."""
+        try:
+            return await self.bucket.open_download_stream(digest)
+        except NoFile:
+            return None
+
+    async def iter_range(self, grid_out, start: int, length: int) -> AsyncIterator[bytes]:
+        grid_out.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await grid_out.read(min(remaining, STREAM_CHUNK_SIZE))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class StoredImage:
+    """What MemoryImageStore.open returns: the parts of a GridOut that serve_image uses."""
+
+    def __init__(self, data: bytes, content_type: str):
+        self.data = data
+        self.length = len(data)
+        self.metadata = {"content_type": content_type}
+
+
+class MemoryImageStore:
+    """ImageStore kept in a dict, for the in-memory repository engine (see repositories.py)."""
+
+    def __init__(self):
+        self.images = {}
+
+    async def put(self, data: bytes, content_type: Optional[str] = None) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        self.images.setdefault(digest, StoredImage(data, content_type or sniff_content_type(data)))
+        return digest
+
+    async def exists(self, digest: str) -> bool:
+        return digest in self.images
+
+    async def open(self, digest: str) -> Optional[StoredImage]:
+        return self.images.get(digest)
+
+    async def iter_range(self, image: StoredImage, start: int, length: int) -> AsyncIterator[bytes]:
+        for offset in range(start, start + length, STREAM_CHUNK_SIZE):
+            yield image.data[offset:min(offset + STREAM_CHUNK_SIZE, start + length)]
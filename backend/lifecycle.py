@@ -0,0 +1,142 @@
+"""
+Time-driven auction status: proxima before start_date, activa until end_date, finalizada after.
+
+The scheduler keeps a min-heap of the upcoming start and end dates and sleeps on a single timer
+until the earliest one. When it fires, statuses are not flipped per heap entry: apply() asks the
+database which auctions' stored status disagrees with what their dates imply and fixes them,
+lots first with one update_many per target status (their auction_status is what bidding
+checks), then each auction with its own conditional update. That makes every run idempotent, so:
+
+- a restart simply runs apply() once and catches up on whatever was missed while down;
+- several API workers can run the scheduler at once: the updates are conditional on the old
+  status, so only one worker writes each change and on_change is told which ones it wrote
+  (e.g. to schedule settlement once); the others still report the auctions that were due on
+  their own heap, so every worker notifies its own live listeners;
+- dates edited after scheduling cannot cause a wrong flip, since the dates are re-read.
+
+The heap is rebuilt every resync_interval (and on notify()), so auctions created or edited by
+another process are picked up without polling on every tick.
+"""
+import asyncio
+import heapq
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = 5.0
+
+
+def status_queries(now: datetime) -> List[Tuple[str, dict]]:
+    """(status, filter of the auctions that should have it) at the given time."""
+    return [
+        ("finalizada", {"end_date": {"$lte": now}}),
+        ("activa", {"start_date": {"$lte": now}, "end_date": {"$gt": now}}),
+        ("proxima", {"start_date": {"$gt": now}}),
+    ]
+
+
+class AuctionLifecycle:
+    def __init__(self, db, on_change: Callable[[Dict[str, str], Set[str]], None], resync_interval: float = 300.0,
+                 clock: Callable[[], datetime] = datetime.utcnow):
+        self.db = db
+        self.on_change = on_change
+        self.resync_interval = resync_interval
+        self.clock = clock
+        self.heap: List[Tuple[datetime, str]] = []
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    async def apply(self, due: Iterable[str] = ()) -> Dict[str, str]:
+        """
+        Correct every auction whose status is out of date and return {auction_id: new status},
+        including the due auctions another worker already flipped. on_change receives the same
+        dict and the ids of the auctions this call wrote.
+        """
+        now = self.clock()
+        changed: Dict[str, str] = {}
+        written: Set[str] = set()
+        for status, query in status_queries(now):
+            auction_ids = await self.db.auctions.distinct("auction_id", {**query, "status": {"$ne": status}})
+            if not auction_ids:
+                continue
+            await self.db.auction_items.update_many(
+                {"auction_id": {"$in": auction_ids}, "auction_status": {"$ne": status}},
+                {"$set": {"auction_status": status}},
+            )
+            for auction_id in auction_ids:
+                result = await self.db.auctions.update_one(
+                    {"auction_id": auction_id, "status": {"$ne": status}}, {"$set": {"status": status}},
+                )
+                if result.modified_count:
+                    written.add(auction_id)
+            changed.update(dict.fromkeys(auction_ids, status))
+        flipped_elsewhere = sorted(set(due) - set(changed))
+        if flipped_elsewhere:
+            async for auction in self.db.auctions.find({"auction_id": {"$in": flipped_elsewhere}}, {"auction_id": 1, "status": 1}):
+                changed[auction["auction_id"]] = auction["status"]
+        if changed:
+            logger.info("Auction status changes: %s", changed)
+            self.on_change(changed, written)
+        return changed
+
+    async def load(self):
+        """Rebuild the heap from every start and end date still ahead."""
+        now = self.clock()
+        heap = []
+        query = {"$or": [{"start_date": {"$gt": now}}, {"end_date": {"$gt": now}}]}
+        async for auction in self.db.auctions.find(query, {"auction_id": 1, "start_date": 1, "end_date": 1}):
+            for when in (auction["start_date"], auction["end_date"]):
+                if when > now:
+                    heap.append((when, auction["auction_id"]))
+        heapq.heapify(heap)
+        self.heap = heap
+
+    def notify(self):
+        """Reload the schedule now, e.g. after auctions were imported or their dates changed."""
+        self.wakeup.set()
+
+    async def start(self):
+        # Catch up before serving, so no request sees a status that should already have changed.
+        await self.apply()
+        await self.load()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    async def run(self):
+        next_resync = self.clock().timestamp() + self.resync_interval
+        while True:
+            try:
+                now = self.clock()
+                until = next_resync - now.timestamp()
+                if self.heap:
+                    until = min(until, (self.heap[0][0] - now).total_seconds())
+                await self._sleep(max(until, 0.0))
+
+                now = self.clock()
+                due = set()
+                while self.heap and self.heap[0][0] <= now:
+                    due.add(heapq.heappop(self.heap)[1])
+                reload = self.wakeup.is_set() or now.timestamp() >= next_resync
+                if reload:
+                    self.wakeup.clear()
+                    next_resync = now.timestamp() + self.resync_interval
+                if due or reload:
+                    await self.apply(due)
+                if reload:
+                    await self.load()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Auction lifecycle run failed; retrying")
+                await asyncio.sleep(RETRY_DELAY)
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
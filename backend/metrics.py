@@ -0,0 +1,166 @@
+"""
+Prometheus metrics: request latency per route, MongoDB command timing, and the counters the
+in-process caches and limiters already keep.
+
+MetricsMiddleware is plain ASGI middleware. Requests are labelled with the route template FastAPI
+matched ("/api/items/{item_id}"), never the raw path, so label cardinality is bounded by the
+number of routes; anything no route matched is counted as "unmatched".
+
+MongoCommandListener is a pymongo CommandListener passed to AsyncIOMotorClient. Its callbacks run
+on Motor's executor threads, right around each command on the wire, so the durations are the
+driver's own (including network and server time, excluding the wait for an executor thread).
+Commands are labelled by name and collection.
+
+Everything is per worker. With several workers behind a load balancer, set
+PROMETHEUS_MULTIPROC_DIR to a directory shared by them (and emptied on deploy); /metrics then
+aggregates every worker's files. Counter collectors registered with register_counters() only
+see the worker that answers, so they are left out in that mode.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from pymongo import monitoring
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# Upper bounds in seconds; requests span cached reads (well under a millisecond) to bcrypt logins.
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests answered, by route template and status.",
+    ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the last byte.",
+    ["method", "route"], buckets=HTTP_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests being handled.", multiprocess_mode="livesum",
+)
+MONGO_LATENCY = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command round trips, as timed by the driver.",
+    ["command", "collection"], buckets=MONGO_BUCKETS,
+)
+MONGO_FAILURES = Counter(
+    "mongodb_command_failures_total", "MongoDB commands that returned an error.",
+    ["command", "collection"],
+)
+MONGO_IN_FLIGHT = Gauge(
+    "mongodb_commands_in_flight", "MongoDB commands sent and not yet answered.", multiprocess_mode="livesum",
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app, enabled: bool = True):
+        self.app = app
+        self.enabled = enabled
+        # labels() takes a lock and builds a key on every call; the children are looked up here.
+        self.children: Dict[Tuple[str, str, int], Tuple[object, object]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope it was given, which is this one.
+            key = (scope["method"], getattr(scope.get("route"), "path", UNMATCHED_ROUTE), status)
+            children = self.children.get(key)
+            if children is None:
+                method, path, _ = key
+                children = self.children[key] = (
+                    HTTP_REQUESTS.labels(method, path, str(status)), HTTP_LATENCY.labels(method, path),
+                )
+            requests, latency = children
+            requests.inc()
+            latency.observe(elapsed)
+
+
+def command_collection(command_name: str, command) -> str:
+    """Collection a command acts on: its first value for CRUD commands, a field for getMore."""
+    if command_name == "getMore":
+        return command.get("collection", "")
+    target = command.get(command_name)
+    return target if isinstance(target, str) else ""
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self):
+        # Only started events carry the command document; keep its labels until the reply.
+        self.pending: Dict[Tuple[object, int], Tuple[str, str]] = {}
+        self.latencies: Dict[Tuple[str, str], object] = {}
+        self.lock = threading.Lock()
+
+    def started(self, event):
+        labels = (event.command_name, command_collection(event.command_name, event.command))
+        with self.lock:
+            self.pending[(event.connection_id, event.request_id)] = labels
+        MONGO_IN_FLIGHT.inc()
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        MONGO_FAILURES.labels(*self._finish(event)).inc()
+
+    def _finish(self, event) -> Tuple[str, str]:
+        with self.lock:
+            labels = self.pending.pop((event.connection_id, event.request_id), None) or (event.command_name, "")
+            latency = self.latencies.get(labels)
+            if latency is None:
+                latency = self.latencies[labels] = MONGO_LATENCY.labels(*labels)
+        MONGO_IN_FLIGHT.dec()
+        latency.observe(event.duration_micros / 1e6)
+        return labels
+
+
+class CounterCollector:
+    """Exports a counter some object already keeps, read when scraped: samples() -> (labels, value)."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str],
+                 samples: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = list(labelnames)
+        self.samples = samples
+
+    def collect(self):
+        family = CounterMetricFamily(self.name, self.documentation, labels=self.labelnames)
+        for labels, value in self.samples():
+            family.add_metric(list(labels), value)
+        yield family
+
+
+def register_counters(*collectors: CounterCollector):
+    if not MULTIPROCESS:
+        for collector in collectors:
+            REGISTRY.register(collector)
+
+
+def render() -> Tuple[bytes, str]:
+    """Body and content type of a scrape."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,147 @@
+"""
+Proxy bidding: each bidder leaves a ceiling (max_amount) on a lot and the server bids for them.
+
+Proxies are not played out one increment at a time. Whatever the number of competing ceilings,
+only the two highest matter: the top one wins, at one increment over the runner-up's ceiling
+(capped at its own), and never below what it takes to beat the standing bid. resolve_proxies()
+computes that outcome and ProxyBidEngine.resolve() applies it with a single conditional update
+on the lot, so a bid or a new ceiling costs one indexed read of two proxy documents and at most
+one write, however many proxies are competing.
+
+Ties go to the ceiling set first. The update is conditional on the price and high bidder that
+were read, so a concurrent bid or resolution in another worker makes it miss; the resolution is
+then recomputed against the new state.
+
+Ceilings are private: only the resulting price and bidder are ever published.
+
+MemoryProxyBidEngine is the same engine for the memory repository engine: ceilings in a dict per
+lot, applied to the memory item repository's documents.
+"""
+import heapq
+import itertools
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+
+MAX_ATTEMPTS = 5
+
+PROXY_ORDER = [("max_amount", DESCENDING), ("created_at", ASCENDING)]
+
+
+def resolve_proxies(current_bid: float, high_bidder_id: Optional[str], proxies: List[dict],
+                    increment: Callable[[float], float], opening: bool = False) -> Optional[Tuple[float, str]]:
+    """
+    (price, bidder) after the two highest proxies compete against the standing bid, or None if
+    the standing bid holds. proxies are sorted by PROXY_ORDER. opening: the lot has no bids and
+    is still at its starting price, so the first bid may match current_bid.
+    """
+    if not proxies:
+        return None
+    leader = proxies[0]
+    leading = leader["user_id"] == high_bidder_id
+    price = current_bid if leading or opening else current_bid + increment(current_bid)
+    if leader["max_amount"] < price:
+        return None
+    if len(proxies) > 1:
+        runner_up = proxies[1]["max_amount"]
+        price = max(price, min(leader["max_amount"], runner_up + increment(runner_up)))
+    if leading and price == current_bid:
+        return None
+    return price, leader["user_id"]
+
+
+class ProxyBidEngine:
+    def __init__(self, db, increment: Callable[[float], float]):
+        self.db = db
+        self.increment = increment
+
+    async def set_ceiling(self, item_id: str, user_id: str, max_amount: float) -> float:
+        """Store the bidder's ceiling; a ceiling can only be raised. Returns the stored one."""
+        proxy = await self.db.proxy_bids.find_one_and_update(
+            {"item_id": item_id, "user_id": user_id},
+            {"$max": {"max_amount": max_amount}, "$setOnInsert": {"created_at": datetime.utcnow()}},
+            projection={"max_amount": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return proxy["max_amount"]
+
+    async def top_proxies(self, item_id: str) -> List[dict]:
+        return await self.db.proxy_bids.find(
+            {"item_id": item_id}, {"_id": 0, "user_id": 1, "max_amount": 1},
+        ).sort(PROXY_ORDER).limit(2).to_list(2)
+
+    async def resolve(self, item_id: str) -> Optional[dict]:
+        """Let the proxies answer the standing bid; returns the updated lot, or None if it holds."""
+        for _ in range(MAX_ATTEMPTS):
+            item = await self.db.auction_items.find_one(
+                {"item_id": item_id, "auction_status": "activa"},
+                {"current_bid": 1, "high_bidder_id": 1, "bid_count": 1, "starting_price": 1},
+            )
+            if item is None:
+                return None
+            opening = item.get("bid_count", 0) == 0 and item["current_bid"] == item.get("starting_price")
+            outcome = resolve_proxies(
+                item["current_bid"], item.get("high_bidder_id"), await self.top_proxies(item_id), self.increment, opening,
+            )
+            if outcome is None:
+                return None
+            price, bidder = outcome
+            updated = await self.db.auction_items.find_one_and_update(
+                {
+                    "item_id": item_id,
+                    "auction_status": "activa",
+                    "current_bid": item["current_bid"],
+                    "high_bidder_id": item.get("high_bidder_id"),
+                },
+                {"$set": {"current_bid": price, "high_bidder_id": bidder}, "$inc": {"bid_count": 1}},
+                projection={"auction_id": 1, "current_bid": 1, "high_bidder_id": 1, "bid_count": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+            if updated is not None:
+                return updated
+        return None
+
+
+class MemoryProxyBidEngine:
+    def __init__(self, items, increment: Callable[[float], float]):
+        self.items = items
+        self.increment = increment
+        self.ceilings: Dict[str, Dict[str, dict]] = {}
+        # Tells apart ceilings set within the same clock tick, so ties still go to the first one.
+        self.sequence = itertools.count()
+
+    def clear(self):
+        self.ceilings.clear()
+
+    async def set_ceiling(self, item_id: str, user_id: str, max_amount: float) -> float:
+        proxies = self.ceilings.setdefault(item_id, {})
+        proxy = proxies.get(user_id)
+        if proxy is None:
+            proxy = proxies[user_id] = {"user_id": user_id, "max_amount": max_amount, "order": next(self.sequence)}
+        else:
+            proxy["max_amount"] = max(proxy["max_amount"], max_amount)
+        return proxy["max_amount"]
+
+    async def top_proxies(self, item_id: str) -> List[dict]:
+        proxies = self.ceilings.get(item_id, {}).values()
+        return [
+            {"user_id": proxy["user_id"], "max_amount": proxy["max_amount"]}
+            for proxy in heapq.nsmallest(2, proxies, key=lambda proxy: (-proxy["max_amount"], proxy["order"]))
+        ]
+
+    async def resolve(self, item_id: str) -> Optional[dict]:
+        # Nothing here suspends between the read and the write, so no other bid can come in between.
+        item = self.items.items.documents.get(item_id)
+        if item is None or item.get("auction_status") != "activa":
+            return None
+        opening = item.get("bid_count", 0) == 0 and item["current_bid"] == item.get("starting_price")
+        outcome = resolve_proxies(
+            item["current_bid"], item.get("high_bidder_id"), await self.top_proxies(item_id), self.increment, opening,
+        )
+        if outcome is None:
+            return None
+        item["current_bid"], item["high_bidder_id"] = outcome
+        item["bid_count"] = item.get("bid_count", 0) + 1
+        return {key: item[key] for key in ("auction_id", "current_bid", "high_bidder_id", "bid_count")}
@@ -0,0 +1,246 @@
+"""
+Development profiler: which MongoDB commands each request issued, and why the slow ones were slow.
+
+QueryProfiler is a pymongo CommandListener. Motor runs driver calls on its executor with a copy of
+the caller's context, so the ContextVar set by QueryProfilerMiddleware for a request is visible in
+the listener callbacks and every command lands in that request's RequestProfile, with its
+duration and offset from the start of the request. Commands issued outside a request (startup,
+the lifecycle scheduler, settlement) are not recorded.
+
+After the response is sent the middleware finishes the profile:
+- commands slower than slow_ms are explained again with verbosity "executionStats" (writes are
+  not applied by explain) and the profile keeps docs/keys examined, documents returned, the
+  indexes the winning plan used and whether it scanned the collection;
+- a request that issued more than max_queries commands is logged as a likely N+1, naming the
+  command shape it repeated most.
+
+Responses carry X-Query-Profile with the profile id and a Server-Timing entry with the command
+count and MongoDB time known when the headers were sent; the full breakdown is kept for the
+last `history` requests. Explains are extra load on the database, which is one of the reasons
+this is for development only.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from metrics import command_collection
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Fields the driver adds to every command; explain takes the command without them.
+DRIVER_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "readConcern", "writeConcern"}
+
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+class CommandRecord:
+    def __init__(self, name: str, database: str, collection: str, command: dict, offset: float):
+        self.name = name
+        self.database = database
+        self.collection = collection
+        self.command = command
+        self.offset = offset
+        self.duration: Optional[float] = None
+        self.failed = False
+        self.explain: Optional[dict] = None
+
+    def shape(self) -> Tuple[str, str, Tuple[str, ...]]:
+        """Command, collection and filter fields: what repeats in an N+1, whatever the values."""
+        query = self.command.get("filter") or self.command.get("query") or {}
+        if self.name == "aggregate":
+            first = (self.command.get("pipeline") or [{}])[0]
+            query = first.get("$match", {})
+        elif self.name in ("update", "delete"):
+            statements = self.command.get("updates") or self.command.get("deletes") or [{}]
+            query = statements[0].get("q", {})
+        return self.name, self.collection, tuple(sorted(query)) if isinstance(query, dict) else ()
+
+    def as_dict(self) -> dict:
+        return {
+            "command": self.name,
+            "collection": self.collection,
+            "offset_ms": round(self.offset * 1000, 3),
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 3),
+            "failed": self.failed,
+            "body": self.command,
+            "explain": self.explain,
+        }
+
+
+class RequestProfile:
+    def __init__(self, profile_id: str, method: str, path: str):
+        self.profile_id = profile_id
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.commands: List[CommandRecord] = []
+        self.n_plus_one: Optional[dict] = None
+
+    def mongo_time(self) -> float:
+        return sum(command.duration or 0.0 for command in self.commands)
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 3),
+            "queries": len(self.commands),
+            "mongo_ms": round(self.mongo_time() * 1000, 3),
+            "slow_queries": sum(command.explain is not None for command in self.commands),
+            "n_plus_one": self.n_plus_one,
+            "commands": [command.as_dict() for command in self.commands],
+        }
+
+
+def explain_summary(explain: dict) -> dict:
+    """The parts of an executionStats explain that say why a command was slow."""
+    stats, stages, indexes = {}, [], []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if not stats and isinstance(node.get("executionStats"), dict):
+                stats.update(node["executionStats"])
+            if isinstance(node.get("stage"), str):
+                stages.append(node["stage"])
+            if isinstance(node.get("indexName"), str) and node["indexName"] not in indexes:
+                indexes.append(node["indexName"])
+            for key, value in node.items():
+                if key not in ("rejectedPlans", "allPlansExecution"):
+                    walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(explain)
+    return {
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "returned": stats.get("nReturned"),
+        "execution_ms": stats.get("executionTimeMillis"),
+        "indexes": indexes,
+        "collection_scan": "COLLSCAN" in stages,
+    }
+
+
+class QueryProfiler(monitoring.CommandListener):
+    def __init__(self, slow_ms: float = 100.0, max_queries: int = 20, history: int = 200):
+        self.slow = slow_ms / 1000
+        self.max_queries = max_queries
+        self.history = history
+        self.profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self.pending: Dict[Tuple[object, int], CommandRecord] = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    # CommandListener callbacks, on Motor's executor threads.
+    def started(self, event):
+        profile = current_profile.get()
+        if profile is None:
+            return
+        command = {key: value for key, value in event.command.items() if key not in DRIVER_FIELDS}
+        record = CommandRecord(
+            event.command_name, event.database_name, command_collection(event.command_name, command),
+            command, time.perf_counter() - profile.started,
+        )
+        with self.lock:
+            self.pending[(event.connection_id, event.request_id)] = record
+        profile.commands.append(record)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        with self.lock:
+            record = self.pending.pop((event.connection_id, event.request_id), None)
+        if record is not None:
+            record.duration = event.duration_micros / 1e6
+            record.failed = failed
+
+    def begin(self, method: str, path: str) -> RequestProfile:
+        return RequestProfile(str(next(self.ids)), method, path)
+
+    async def finish(self, profile: RequestProfile, client):
+        """Explain the slow commands, check for N+1 and keep the profile."""
+        profile.duration = time.perf_counter() - profile.started
+        if len(profile.commands) > self.max_queries:
+            (shape, repeats), = Counter(command.shape() for command in profile.commands).most_common(1)
+            profile.n_plus_one = {"command": shape[0], "collection": shape[1], "filter": list(shape[2]), "repeats": repeats}
+            logger.warning(
+                "%s %s issued %d queries (limit %d); %s on %s by %s repeated %d times",
+                profile.method, profile.route or profile.path, len(profile.commands), self.max_queries,
+                shape[0], shape[1], list(shape[2]), repeats,
+            )
+        for command in profile.commands:
+            if command.name in EXPLAINABLE and command.duration is not None and command.duration >= self.slow:
+                command.explain = await self.explain(client, command)
+        self.profiles[profile.profile_id] = profile
+        while len(self.profiles) > self.history:
+            self.profiles.popitem(last=False)
+
+    async def explain(self, client, command: CommandRecord) -> dict:
+        try:
+            explain = await client[command.database].command(
+                {"explain": command.command, "verbosity": "executionStats"},
+            )
+        except Exception as exc:
+            return {"error": str(exc)}
+        return explain_summary(explain)
+
+    def recent(self) -> List[dict]:
+        return [
+            {key: value for key, value in profile.as_dict().items() if key != "commands"}
+            for profile in reversed(self.profiles.values())
+        ]
+
+
+class QueryProfilerMiddleware:
+    def __init__(self, app, profiler: QueryProfiler, client, enabled: bool = True):
+        self.app = app
+        self.profiler = profiler
+        self.client = client
+        self.enabled = enabled
+        self.tasks = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+        profile = self.profiler.begin(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                mongo_ms = profile.mongo_time() * 1000
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-query-profile", profile.profile_id.encode("ascii")),
+                    (b"server-timing", f'mongo;dur={mongo_ms:.3f};desc="{len(profile.commands)} queries"'.encode("ascii")),
+                ]
+            await send(message)
+
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            profile.route = getattr(scope.get("route"), "path", None)
+            # Off the request path, and outside the profile so the explains are not recorded.
+            task = asyncio.get_running_loop().create_task(self.profiler.finish(profile, self.client))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
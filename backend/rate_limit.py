@@ -0,0 +1,211 @@
+"""
+Admission control: token-bucket rate limits and in-flight caps, checked before any handler runs.
+
+AdmissionControl is plain ASGI middleware. For each rule matching the request's method and path
+it takes a slot from the rule's concurrency limit, then a token from the client IP's bucket and
+from the account's bucket. Anything unavailable is answered with 429 and Retry-After right there,
+so a rejected request never reaches bcrypt, MongoDB or even request parsing in FastAPI. The slot
+is checked first so that a request turned away for lack of one costs the client no tokens.
+When the account is read from the body, a body over MAX_BODY_BYTES is answered with 413: padding
+it must not be a way to skip the per-account limit.
+
+Behind reverse proxies the client IP is read from X-Forwarded-For, counting trusted_proxies
+entries from the right: each trusted proxy appends the address it received the request from, so
+those entries are genuine, while anything further left was sent by the client and can be forged.
+
+Buckets hold up to `capacity` tokens and refill continuously at capacity per `period` seconds.
+They live in an OrderedDict by last use, bounded to max_keys: past that, the least recently
+seen keys are dropped, so a flood of spoofed or rotating keys cannot grow memory. A dropped key
+comes back with a full bucket, which only ever errs on the side of admitting.
+
+Everything here is local to one worker, so with N workers a client gets up to N times the
+configured rates; the limits are meant to protect each worker, not to meter clients exactly.
+"""
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional, Tuple
+
+MAX_BODY_BYTES = 16384  # bodies read to find the account; larger ones are rejected
+
+
+class TokenBuckets:
+    def __init__(self, capacity: float, period: float, max_keys: int,
+                 clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.max_keys = max_keys
+        self.clock = clock
+        self.buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self.rejected = 0
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def take(self, key: Hashable) -> float:
+        """Take one token for key: 0.0 if there was one, otherwise seconds until there will be."""
+        now = self.clock()
+        tokens, updated = self.buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        if tokens >= 1.0:
+            tokens -= 1.0
+            wait = 0.0
+        else:
+            self.rejected += 1
+            wait = (1.0 - tokens) / self.rate
+        self.buckets[key] = (tokens, now)
+        self.buckets.move_to_end(key)
+        while len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return wait
+
+
+class ConcurrencyLimit:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+
+
+class AdmissionRule:
+    """
+    Limits for the requests matching method and a path template ("/api/items/{item_id}/bids").
+    account(headers, body) names the account a request acts for, or None; it gets the body only
+    when read_body is set. Rules may share their limiters to count several routes together.
+    """
+
+    def __init__(self, method: str, path: str, per_ip: Optional[TokenBuckets] = None,
+                 per_account: Optional[TokenBuckets] = None, concurrency: Optional[ConcurrencyLimit] = None,
+                 account: Optional[Callable[[dict, bytes], Optional[str]]] = None, read_body: bool = False):
+        self.method = method
+        self.pattern = re.compile("^" + re.sub(r"\{[^/]+\}", "[^/]+", path) + "$")
+        self.per_ip = per_ip
+        self.per_account = per_account
+        self.concurrency = concurrency
+        self.account = account
+        self.read_body = read_body
+
+    def matches(self, method: str, path: str) -> bool:
+        return method == self.method and self.pattern.match(path) is not None
+
+
+def json_body_field(field: str) -> Callable[[dict, bytes], Optional[str]]:
+    """Account taken from a JSON body field, e.g. the email of a login attempt."""
+    def account(headers: dict, body: bytes) -> Optional[str]:
+        try:
+            value = json.loads(body).get(field)
+        except (ValueError, AttributeError):
+            return None
+        return value.strip().lower() if isinstance(value, str) else None
+    return account
+
+
+class AdmissionControl:
+    def __init__(self, app, rules: List[AdmissionRule], enabled: bool = True, trusted_proxies: int = 0):
+        self.app = app
+        self.rules = rules
+        self.enabled = enabled
+        self.trusted_proxies = trusted_proxies
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+        rule = next((rule for rule in self.rules if rule.matches(scope["method"], scope["path"])), None)
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        if rule.concurrency is not None and not rule.concurrency.try_acquire():
+            return await self.reject(send, 1.0)
+        try:
+            wait, receive = await self.take_tokens(rule, scope, receive)
+            if wait is None:
+                return await self.respond(send, 413, b'{"detail":"Request body too large"}')
+            if wait:
+                return await self.reject(send, wait)
+            await self.app(scope, receive, send)
+        finally:
+            if rule.concurrency is not None:
+                rule.concurrency.release()
+
+    async def take_tokens(self, rule: AdmissionRule, scope, receive):
+        """
+        Seconds to wait before retrying (0.0 if admitted, None if the body is too large to look
+        for the account in), and the receive to pass on.
+        """
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        if rule.per_ip is not None:
+            wait = rule.per_ip.take(self.client_ip(scope, headers))
+            if wait:
+                return wait, receive
+
+        if rule.per_account is not None and rule.account is not None:
+            body = b""
+            if rule.read_body:
+                body, receive = await self.buffer_body(receive)
+                if body is None:
+                    return None, receive
+            account = rule.account(headers, body)
+            if account is not None:
+                wait = rule.per_account.take(account)
+                if wait:
+                    return wait, receive
+        return 0.0, receive
+
+    def client_ip(self, scope, headers: dict) -> str:
+        """Address of the client as seen by the outermost trusted proxy, or the peer address."""
+        if self.trusted_proxies and "x-forwarded-for" in headers:
+            entries = [entry.strip() for entry in headers["x-forwarded-for"].split(",")]
+            # Fewer entries than trusted proxies: the request did not come through all of them.
+            if len(entries) >= self.trusted_proxies and entries[-self.trusted_proxies]:
+                return entries[-self.trusted_proxies]
+        client = scope.get("client")
+        return client[0] if client else ""
+
+    @staticmethod
+    async def buffer_body(receive):
+        """
+        Read the request body, returning it (None past MAX_BODY_BYTES, where reading stops) and a
+        receive that replays it to the app.
+        """
+        messages, size = [], 0
+        while True:
+            message = await receive()
+            messages.append(message)
+            size += len(message.get("body", b""))
+            if message["type"] != "http.request" or not message.get("more_body") or size > MAX_BODY_BYTES:
+                break
+        body = b"".join(message.get("body", b"") for message in messages) if size <= MAX_BODY_BYTES else None
+
+        async def replay():
+            return messages.pop(0) if messages else await receive()
+        return body, replay
+
+    @classmethod
+    async def reject(cls, send, wait: float):
+        retry_after = str(max(1, math.ceil(wait))).encode("ascii")
+        await cls.respond(send, 429, b'{"detail":"Too many requests"}', [(b"retry-after", retry_after)])
+
+    @staticmethod
+    async def respond(send, status: int, body: bytes, headers: Optional[list] = None):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                *(headers or []),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
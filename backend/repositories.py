@@ -0,0 +1,627 @@
+"""
+Repositories for users, auctions, lots, the bid log, registrations and the auction search, with a
+MongoDB engine and an in-memory one.
+
+Handlers ask for what they need ("a page of this auction's lots after this cursor", "place this
+bid if it beats the minimum") instead of building queries, so the same calls run on either
+engine. Documents go in and come out as plain dicts shaped like the stored ones, and projections
+are the same find projections the MongoDB engine sends, including the {"$ifNull": [...]}
+defaults of model_projection.
+
+The Motor engine is what production runs. The memory engine keeps each collection in a dict by
+its id, with the secondary indexes the handlers page on kept sorted, so it answers in the same
+order and with the same uniqueness rules. Every method finishes without awaiting anything, so
+on one event loop each call is atomic, like the single-document updates it stands in for. It is
+meant for tests and for benchmarks that should measure the application rather than the database;
+data lives in the worker's memory and is lost with it. Returned documents are fresh dicts, but
+nested values are shared with the store: callers must not mutate them.
+
+Proxy bids have their own memory engine in proxy_bidding.py. Settlement, image variants, catalog
+imports and the lifecycle scheduler still talk to MongoDB directly and need the Motor engine.
+"""
+import bisect
+import operator
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+ENGINES = ("mongo", "memory")
+
+
+def keyset_filter(sort_field: str, tie_field: str, sort_value, tie_value) -> dict:
+    """Documents strictly after (sort_value, tie_value) in ascending (sort_field, tie_field) order."""
+    return {"$or": [
+        {sort_field: {"$gt": sort_value}},
+        {sort_field: sort_value, tie_field: {"$gt": tie_value}},
+    ]}
+
+
+# MongoDB engine
+class MotorUserRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"user_id": user_id})
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        return await self.collection.find_one({"email": email})
+
+    async def insert(self, document: dict):
+        await self.collection.insert_one(document)
+
+    async def replace_password_hash(self, user_id: str, old_hash: str, new_hash: str) -> bool:
+        """Only replaces the hash that was verified, in case the password changed meanwhile."""
+        result = await self.collection.update_one(
+            {"user_id": user_id, "password_hash": old_hash}, {"$set": {"password_hash": new_hash}},
+        )
+        return result.modified_count == 1
+
+    async def add_registered_auction(self, user_id: str, auction_id: str):
+        await self.collection.update_one({"user_id": user_id}, {"$addToSet": {"registered_auctions": auction_id}})
+
+
+class MotorAuctionRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def get(self, auction_id: str, projection: Optional[dict] = None) -> Optional[dict]:
+        return await self.collection.find_one({"auction_id": auction_id}, projection)
+
+    async def page(self, after: Optional[tuple], limit: int, projection: Optional[dict] = None) -> List[dict]:
+        """Up to limit auctions by (start_date, auction_id), after that key if given."""
+        query = keyset_filter("start_date", "auction_id", *after) if after else {}
+        cursor = self.collection.find(query, projection).sort([("start_date", 1), ("auction_id", 1)]).limit(limit)
+        return await cursor.to_list(limit)
+
+    async def find_many(self, auction_ids: List[str], projection: Optional[dict] = None) -> List[dict]:
+        return await self.collection.find({"auction_id": {"$in": auction_ids}}, projection).to_list(None)
+
+    async def find_all(self, projection: Optional[dict] = None) -> AsyncIterator[dict]:
+        async for auction in self.collection.find({}, projection):
+            yield auction
+
+    async def count(self) -> int:
+        return await self.collection.count_documents({})
+
+    async def insert(self, document: dict):
+        await self.collection.insert_one(document)
+
+    async def set_fields(self, auction_id: str, fields: dict):
+        await self.collection.update_one({"auction_id": auction_id}, {"$set": fields})
+
+    async def increment(self, auction_id: str, field: str, amount: int = 1):
+        await self.collection.update_one({"auction_id": auction_id}, {"$inc": {field: amount}})
+
+
+class MotorItemRepository:
+    def __init__(self, collection, min_next_bid_expr: dict):
+        self.collection = collection
+        self.min_next_bid_expr = min_next_bid_expr
+
+    async def get(self, item_id: str, projection: Optional[dict] = None) -> Optional[dict]:
+        return await self.collection.find_one({"item_id": item_id}, projection)
+
+    async def page(self, auction_id: str, after: Optional[tuple], limit: int,
+                   projection: Optional[dict] = None) -> List[dict]:
+        """Up to limit lots of the auction by (lot_order, item_id), after that key if given."""
+        query = {"auction_id": auction_id}
+        if after:
+            query = {"$and": [query, keyset_filter("lot_order", "item_id", *after)]}
+        cursor = self.collection.find(query, projection).sort([("lot_order", 1), ("item_id", 1)]).limit(limit)
+        return await cursor.to_list(limit)
+
+    async def find_many(self, item_ids: List[str], projection: Optional[dict] = None) -> List[dict]:
+        return await self.collection.find({"item_id": {"$in": item_ids}}, projection).to_list(None)
+
+    async def find_all(self, projection: Optional[dict] = None) -> AsyncIterator[dict]:
+        async for item in self.collection.find({}, projection):
+            yield item
+
+    async def insert(self, document: dict):
+        await self.collection.insert_one(document)
+
+    async def set_auction_status(self, auction_id: str, auction_status: str):
+        """Copy an auction's status to its lots, so bids are validated without a join."""
+        await self.collection.update_many(
+            {"auction_id": auction_id, "auction_status": {"$ne": auction_status}},
+            {"$set": {"auction_status": auction_status}},
+        )
+
+    async def place_bid(self, item_id: str, user_id: str, amount: float) -> Optional[dict]:
+        """
+        Make amount the lot's price if the auction is active and amount reaches the minimum next
+        bid; returns auction_id and bid_count after the bid, or None if it was not accepted.
+        """
+        # The price check and the write are a single conditional update evaluated by mongod,
+        # so concurrent bidders on the same lot never need a read-modify-write cycle or a lock.
+        return await self.collection.find_one_and_update(
+            {
+                "item_id": item_id,
+                "auction_status": "activa",
+                "$expr": {"$gte": [amount, self.min_next_bid_expr]},
+            },
+            {
+                "$set": {"current_bid": amount, "high_bidder_id": user_id},
+                "$inc": {"bid_count": 1},
+            },
+            projection={"_id": 0, "auction_id": 1, "bid_count": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+
+
+class MotorBidRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def insert(self, document: dict):
+        await self.collection.insert_one(document)
+
+
+class MotorRegistrationRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def add(self, auction_id: str, user_id: str, created_at) -> bool:
+        """Register the user unless already registered; True if this call created the registration."""
+        # The unique (auction_id, user_id) index makes the upsert the single arbiter of a new
+        # registration, however often or concurrently it is sent.
+        result = await self.collection.update_one(
+            {"auction_id": auction_id, "user_id": user_id},
+            {"$setOnInsert": {"created_at": created_at}},
+            upsert=True,
+        )
+        return result.upserted_id is not None
+
+    async def get(self, auction_id: str, user_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"auction_id": auction_id, "user_id": user_id}, {"_id": 0})
+
+    async def page_for_user(self, user_id: str, after: Optional[tuple], limit: int) -> List[dict]:
+        """Up to limit of the user's registrations by (created_at, auction_id), after that key if given."""
+        query = {"user_id": user_id}
+        if after:
+            query = {"$and": [query, keyset_filter("created_at", "auction_id", *after)]}
+        cursor = self.collection.find(query, {"_id": 0, "auction_id": 1, "created_at": 1})
+        return await cursor.sort([("created_at", 1), ("auction_id", 1)]).limit(limit).to_list(limit)
+
+
+SEARCH_STATS = {
+    "match_count": {"$sum": 1},
+    "min_price": {"$min": "$starting_price"},
+    "max_price": {"$max": "$starting_price"},
+}
+
+
+class MotorSearchRepository:
+    def __init__(self, auctions, items):
+        self.auctions_collection = auctions
+        self.items_collection = items
+
+    def pipeline(self, item_match: dict, auction_match: dict, after: Optional[tuple], limit: int, projection: dict):
+        """
+        (collection, pipeline) answering a search in one round trip. Each result is an auction
+        document plus match_count, min_price and max_price over its matching lots, shaped by
+        projection.
+        """
+        if after:
+            auction_match = {"$and": [auction_match, keyset_filter("start_date", "auction_id", *after)]}
+        page = [{"$sort": {"start_date": 1, "auction_id": 1}}, {"$limit": limit}]
+        if item_match:
+            # Lot filters drive the search: group matching lots per auction, then join the auction.
+            return self.items_collection, [
+                {"$match": item_match},
+                {"$group": {"_id": "$auction_id", **SEARCH_STATS}},
+                {"$lookup": {"from": "auctions", "localField": "_id", "foreignField": "auction_id", "as": "auction"}},
+                {"$unwind": "$auction"},
+                {"$replaceRoot": {"newRoot": {"$mergeObjects": [
+                    "$auction",
+                    {"match_count": "$match_count", "min_price": "$min_price", "max_price": "$max_price"},
+                ]}}},
+                {"$match": auction_match},
+                *page,
+                {"$project": projection},
+            ]
+        # Only auction filters: page the auctions first, then summarize the lots of that page only.
+        return self.auctions_collection, [
+            {"$match": auction_match},
+            *page,
+            {"$lookup": {
+                "from": "auction_items",
+                "let": {"auction_id": "$auction_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$auction_id", "$$auction_id"]}}},
+                    {"$group": {"_id": None, **SEARCH_STATS}},
+                ],
+                "as": "matches",
+            }},
+            {"$replaceRoot": {"newRoot": {"$mergeObjects": ["$$ROOT", {"$arrayElemAt": ["$matches", 0]}]}}},
+            {"$project": projection},
+        ]
+
+    async def auctions(self, item_match: dict, auction_match: dict, after: Optional[tuple], limit: int,
+                       projection: dict) -> List[dict]:
+        """Up to limit matching auctions by (start_date, auction_id), after that key if given."""
+        collection, pipeline = self.pipeline(item_match, auction_match, after, limit, projection)
+        return await collection.aggregate(pipeline).to_list(limit)
+
+
+# In-memory engine
+def evaluate(expression, document: dict):
+    """The projection expressions model_projection produces: field paths, $literal and $ifNull."""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return document.get(expression[1:])
+    if isinstance(expression, dict):
+        if "$literal" in expression:
+            return expression["$literal"]
+        if "$ifNull" in expression:
+            value, default = expression["$ifNull"]
+            value = evaluate(value, document)
+            return evaluate(default, document) if value is None else value
+        raise ValueError(f"Unsupported projection expression: {expression}")
+    return expression
+
+
+def slice_array(value, spec):
+    """The find projection operator {"$slice": n} or {"$slice": [skip, limit]}, as mongod applies it."""
+    if isinstance(spec, bool) or not isinstance(spec, (int, list)):
+        raise ValueError(f"$slice in a find projection takes a number or [skip, limit], not {spec!r}")
+    if not isinstance(value, list):
+        return value
+    if isinstance(spec, int):
+        return value[:spec] if spec >= 0 else value[spec:]
+    skip, limit = spec
+    if not all(isinstance(n, int) and not isinstance(n, bool) for n in spec) or limit <= 0:
+        raise ValueError(f"$slice in a find projection takes a number or [skip, limit], not {spec!r}")
+    start = skip if skip >= 0 else max(len(value) + skip, 0)
+    return value[start:start + limit]
+
+
+def project(document: dict, projection: Optional[dict]) -> dict:
+    if projection is None:
+        return dict(document)
+    included = [key for key, spec in projection.items() if key != "_id" and spec not in (0, False)]
+    if not included:
+        return {key: value for key, value in document.items() if projection.get(key, 1)}
+    shaped = {"_id": document["_id"]} if projection.get("_id", 1) and "_id" in document else {}
+    for key in included:
+        spec = projection[key]
+        if isinstance(spec, dict) and "$slice" in spec:
+            if key in document:
+                shaped[key] = slice_array(document[key], spec["$slice"])
+        elif isinstance(spec, (dict, str)):
+            shaped[key] = evaluate(spec, document)
+        elif key in document:
+            shaped[key] = document[key]
+    return shaped
+
+
+COMPARISONS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+
+def matches(document: dict, query: dict) -> bool:
+    """The filters the search builds: equality, $gt, $gte, $lt and $lte on top-level fields."""
+    for field, condition in query.items():
+        value = document.get(field)
+        if isinstance(condition, dict):
+            for name, operand in condition.items():
+                if name not in COMPARISONS:
+                    raise ValueError(f"Unsupported query operator: {name}")
+                if value is None or not COMPARISONS[name](value, operand):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class SortedKeys:
+    """(sort value, id) pairs kept in order, for keyset pages without scanning."""
+
+    def __init__(self):
+        self.keys: List[tuple] = []
+
+    def add(self, key: tuple):
+        bisect.insort(self.keys, key)
+
+    def remove(self, key: tuple):
+        index = bisect.bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            del self.keys[index]
+
+    def after(self, after: Optional[tuple], limit: int) -> List[tuple]:
+        start = bisect.bisect_right(self.keys, after) if after else 0
+        return self.keys[start:start + limit]
+
+
+class MemoryCollection:
+    """Documents by a unique id field, with more unique fields checked on insert."""
+
+    def __init__(self, id_field: str, unique: Iterable[str] = ()):
+        self.id_field = id_field
+        self.documents: Dict[str, dict] = {}
+        self.unique: Dict[str, Dict[object, str]] = {field: {} for field in unique}
+
+    def clear(self):
+        self.documents.clear()
+        for index in self.unique.values():
+            index.clear()
+
+    def insert(self, document: dict) -> dict:
+        document = dict(document)
+        document.setdefault("_id", ObjectId())
+        key = document[self.id_field]
+        if key in self.documents:
+            raise DuplicateKeyError(f"Duplicate {self.id_field}: {key}")
+        for field, index in self.unique.items():
+            if document.get(field) in index:
+                raise DuplicateKeyError(f"Duplicate {field}: {document.get(field)}")
+        self.documents[key] = document
+        for field, index in self.unique.items():
+            index[document.get(field)] = key
+        return document
+
+    def lookup(self, field: str, value) -> Optional[dict]:
+        key = self.unique[field].get(value)
+        return None if key is None else self.documents[key]
+
+
+class MemoryUserRepository:
+    def __init__(self):
+        self.users = MemoryCollection("user_id", unique=["email"])
+
+    def clear(self):
+        self.users.clear()
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        user = self.users.documents.get(user_id)
+        return None if user is None else dict(user)
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        user = self.users.lookup("email", email)
+        return None if user is None else dict(user)
+
+    async def insert(self, document: dict):
+        self.users.insert(document)
+
+    async def replace_password_hash(self, user_id: str, old_hash: str, new_hash: str) -> bool:
+        user = self.users.documents.get(user_id)
+        if user is None or user.get("password_hash") != old_hash:
+            return False
+        user["password_hash"] = new_hash
+        return True
+
+    async def add_registered_auction(self, user_id: str, auction_id: str):
+        user = self.users.documents.get(user_id)
+        if user is not None and auction_id not in user.setdefault("registered_auctions", []):
+            user["registered_auctions"] = [*user["registered_auctions"], auction_id]
+
+
+class MemoryAuctionRepository:
+    def __init__(self):
+        self.auctions = MemoryCollection("auction_id")
+        self.by_start = SortedKeys()
+
+    def clear(self):
+        self.auctions.clear()
+        self.by_start = SortedKeys()
+
+    async def get(self, auction_id: str, projection: Optional[dict] = None) -> Optional[dict]:
+        auction = self.auctions.documents.get(auction_id)
+        return None if auction is None else project(auction, projection)
+
+    async def page(self, after: Optional[tuple], limit: int, projection: Optional[dict] = None) -> List[dict]:
+        documents = self.auctions.documents
+        return [project(documents[auction_id], projection) for _, auction_id in self.by_start.after(after, limit)]
+
+    async def find_many(self, auction_ids: List[str], projection: Optional[dict] = None) -> List[dict]:
+        documents = self.auctions.documents
+        return [project(documents[auction_id], projection) for auction_id in dict.fromkeys(auction_ids) if auction_id in documents]
+
+    async def find_all(self, projection: Optional[dict] = None) -> AsyncIterator[dict]:
+        for auction in list(self.auctions.documents.values()):
+            yield project(auction, projection)
+
+    async def count(self) -> int:
+        return len(self.auctions.documents)
+
+    async def insert(self, document: dict):
+        auction = self.auctions.insert(document)
+        self.by_start.add((auction["start_date"], auction["auction_id"]))
+
+    async def set_fields(self, auction_id: str, fields: dict):
+        auction = self.auctions.documents.get(auction_id)
+        if auction is None:
+            return
+        if "start_date" in fields:
+            self.by_start.remove((auction["start_date"], auction_id))
+            self.by_start.add((fields["start_date"], auction_id))
+        auction.update(fields)
+
+    async def increment(self, auction_id: str, field: str, amount: int = 1):
+        auction = self.auctions.documents.get(auction_id)
+        if auction is not None:
+            auction[field] = auction.get(field, 0) + amount
+
+
+class MemoryItemRepository:
+    def __init__(self, min_next_bid: Callable[[float, int, Optional[float]], float]):
+        self.min_next_bid = min_next_bid
+        self.items = MemoryCollection("item_id")
+        self.by_auction: Dict[str, SortedKeys] = {}
+
+    def clear(self):
+        self.items.clear()
+        self.by_auction.clear()
+
+    async def get(self, item_id: str, projection: Optional[dict] = None) -> Optional[dict]:
+        item = self.items.documents.get(item_id)
+        return None if item is None else project(item, projection)
+
+    async def page(self, auction_id: str, after: Optional[tuple], limit: int,
+                   projection: Optional[dict] = None) -> List[dict]:
+        keys = self.by_auction.get(auction_id)
+        if keys is None:
+            return []
+        documents = self.items.documents
+        return [project(documents[item_id], projection) for _, item_id in keys.after(after, limit)]
+
+    async def find_many(self, item_ids: List[str], projection: Optional[dict] = None) -> List[dict]:
+        documents = self.items.documents
+        return [project(documents[item_id], projection) for item_id in dict.fromkeys(item_ids) if item_id in documents]
+
+    async def find_all(self, projection: Optional[dict] = None) -> AsyncIterator[dict]:
+        for item in list(self.items.documents.values()):
+            yield project(item, projection)
+
+    async def insert(self, document: dict):
+        item = self.items.insert(document)
+        self.by_auction.setdefault(item["auction_id"], SortedKeys()).add((item.get("lot_order", 0), item["item_id"]))
+
+    async def set_auction_status(self, auction_id: str, auction_status: str):
+        keys = self.by_auction.get(auction_id)
+        for _, item_id in keys.keys if keys else ():
+            self.items.documents[item_id]["auction_status"] = auction_status
+
+    async def place_bid(self, item_id: str, user_id: str, amount: float) -> Optional[dict]:
+        item = self.items.documents.get(item_id)
+        if item is None or item.get("auction_status") != "activa":
+            return None
+        if amount < self.min_next_bid(item["current_bid"], item.get("bid_count", 0), item.get("starting_price")):
+            return None
+        item["current_bid"] = amount
+        item["high_bidder_id"] = user_id
+        item["bid_count"] = item.get("bid_count", 0) + 1
+        return {"auction_id": item["auction_id"], "bid_count": item["bid_count"]}
+
+
+class MemoryBidRepository:
+    def __init__(self):
+        self.bids: List[dict] = []
+
+    def clear(self):
+        self.bids.clear()
+
+    async def insert(self, document: dict):
+        self.bids.append(dict(document))
+
+
+class MemoryRegistrationRepository:
+    def __init__(self):
+        self.registrations: Dict[tuple, dict] = {}
+        self.by_user: Dict[str, SortedKeys] = {}
+
+    def clear(self):
+        self.registrations.clear()
+        self.by_user.clear()
+
+    async def add(self, auction_id: str, user_id: str, created_at) -> bool:
+        key = (auction_id, user_id)
+        if key in self.registrations:
+            return False
+        self.registrations[key] = {"auction_id": auction_id, "user_id": user_id, "created_at": created_at}
+        self.by_user.setdefault(user_id, SortedKeys()).add((created_at, auction_id))
+        return True
+
+    async def get(self, auction_id: str, user_id: str) -> Optional[dict]:
+        registration = self.registrations.get((auction_id, user_id))
+        return None if registration is None else dict(registration)
+
+    async def page_for_user(self, user_id: str, after: Optional[tuple], limit: int) -> List[dict]:
+        keys = self.by_user.get(user_id)
+        if keys is None:
+            return []
+        return [{"auction_id": auction_id, "created_at": created_at} for created_at, auction_id in keys.after(after, limit)]
+
+
+class MemorySearchRepository:
+    """
+    The search over the memory auctions and lots. Lot filters scan every lot, as the $group of
+    the mongod pipeline does; without them the auctions are paged first and only the lots of
+    that page are summarized.
+    """
+
+    def __init__(self, auctions: MemoryAuctionRepository, items: MemoryItemRepository):
+        self.auction_repository = auctions
+        self.item_repository = items
+
+    async def auctions(self, item_match: dict, auction_match: dict, after: Optional[tuple], limit: int,
+                       projection: dict) -> List[dict]:
+        auctions = self.auction_repository.auctions.documents
+        items = self.item_repository.items.documents
+        if item_match:
+            lots: Dict[str, List[dict]] = {}
+            for item in items.values():
+                if matches(item, item_match):
+                    lots.setdefault(item["auction_id"], []).append(item)
+            keys = sorted((auctions[auction_id]["start_date"], auction_id) for auction_id in lots if auction_id in auctions)
+            keys = keys[bisect.bisect_right(keys, after):] if after else keys
+        else:
+            keys = self.auction_repository.by_start.after(after, len(auctions))
+        results = []
+        for _, auction_id in keys:
+            auction = auctions[auction_id]
+            if not matches(auction, auction_match):
+                continue
+            if item_match:
+                auction_lots = lots[auction_id]
+            else:
+                lot_keys = self.item_repository.by_auction.get(auction_id)
+                auction_lots = [items[item_id] for _, item_id in lot_keys.keys] if lot_keys else []
+            results.append(project({**auction, **search_stats(auction_lots)}, projection))
+            if len(results) == limit:
+                break
+        return results
+
+
+def search_stats(lots: List[dict]) -> dict:
+    """SEARCH_STATS of the lots; no fields at all for an auction without lots, as on mongod."""
+    if not lots:
+        return {}
+    prices = [lot["starting_price"] for lot in lots if lot.get("starting_price") is not None]
+    return {
+        "match_count": len(lots),
+        "min_price": min(prices) if prices else None,
+        "max_price": max(prices) if prices else None,
+    }
+
+
+class Repositories:
+    def __init__(self, engine: str, users, auctions, items, bids, registrations, search):
+        self.engine = engine
+        self.users = users
+        self.auctions = auctions
+        self.items = items
+        self.bids = bids
+        self.registrations = registrations
+        self.search = search
+
+    def clear(self):
+        """Memory engine only: forget every document, e.g. between benchmark runs."""
+        for repository in (self.users, self.auctions, self.items, self.bids, self.registrations):
+            repository.clear()
+
+
+def create_repositories(engine: str, db, min_next_bid: Callable[[float, int, Optional[float]], float],
+                        min_next_bid_expr: dict) -> Repositories:
+    """
+    Repositories on the given engine. min_next_bid and min_next_bid_expr are the same bidding
+    rule, as a function for the memory engine and as an aggregation expression for mongod.
+    """
+    if engine == "mongo":
+        return Repositories(
+            engine,
+            MotorUserRepository(db.users),
+            MotorAuctionRepository(db.auctions),
+            MotorItemRepository(db.auction_items, min_next_bid_expr),
+            MotorBidRepository(db.bids),
+            MotorRegistrationRepository(db.registrations),
+            MotorSearchRepository(db.auctions, db.auction_items),
+        )
+    if engine == "memory":
+        auctions, items = MemoryAuctionRepository(), MemoryItemRepository(min_next_bid)
+        return Repositories(
+            engine, MemoryUserRepository(), auctions, items, MemoryBidRepository(), MemoryRegistrationRepository(),
+            MemorySearchRepository(auctions, items),
+        )
+    raise ValueError(f"Unknown repository engine {engine!r}; expected one of {', '.join(ENGINES)}")
@@ -0,0 +1,98 @@
+"""
+In-process cache of serialized catalog responses.
+
+A response is cached under its URL together with the versions of the scopes it was built from
+(e.g. "auction:<id>" or "items:<auction id>"). Writers bump the scopes they touched; an entry
+whose recorded versions no longer match is treated as a miss, so invalidation never needs to
+know which URLs depend on a scope. Versions are read before the database is queried, so a
+write that lands while a response is being built leaves that entry already out of date.
+
+Bodies are stored as the exact bytes sent, with a strong ETag derived from them, and the
+compressed variants of a body are kept with it as clients ask for them. Entries also expire
+after a TTL, which bounds how long a write made by another worker can go unnoticed.
+
+Only the most recently bumped scopes keep a version of their own. When one is dropped, the
+floor that unversioned scopes report rises to its version, so entries built before the drop
+miss instead of matching again.
+"""
+import hashlib
+import itertools
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from ttl_cache import TTLCache
+
+# Part of every entry's versions: bumping it invalidates the whole cache.
+ALL_SCOPES = "*"
+
+# Scopes versioned per cache entry before the least recently bumped ones are dropped.
+SCOPES_PER_ENTRY = 4
+
+
+class CachedResponse(NamedTuple):
+    versions: Tuple[int, ...]
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+    variants: Dict[str, bytes]  # body by Content-Encoding, filled in by cached_json
+
+
+def strong_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+class ResponseCache:
+    def __init__(self, max_size: int, ttl: float, max_scopes: Optional[int] = None):
+        self.enabled = max_size > 0
+        self.entries = TTLCache(max(max_size, 1), ttl)
+        self.versions: "OrderedDict[str, int]" = OrderedDict()
+        self.max_scopes = max_scopes or max(max_size, 1) * SCOPES_PER_ENTRY
+        # Version of every scope without one of its own: 0 until a scope is dropped.
+        self.floor = 0
+        # ALL_SCOPES is versioned apart, so dropping scopes never flushes the whole cache.
+        self.all_scopes = 0
+        # A single counter for every scope, so a version number is never reused.
+        self.counter = itertools.count(1)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def snapshot(self, scopes: Iterable[str]) -> Tuple[int, ...]:
+        return (self.all_scopes, *(self.versions.get(scope, self.floor) for scope in scopes))
+
+    def bump(self, *scopes: str):
+        for scope in scopes:
+            if scope == ALL_SCOPES:
+                self.all_scopes = next(self.counter)
+                continue
+            self.versions[scope] = next(self.counter)
+            self.versions.move_to_end(scope)
+        while len(self.versions) > self.max_scopes:
+            _, version = self.versions.popitem(last=False)
+            self.floor = max(self.floor, version)
+
+    def invalidate_all(self):
+        self.bump(ALL_SCOPES)
+
+    def get(self, key: str, scopes: Iterable[str]) -> Optional[CachedResponse]:
+        entry = self.entries.get(key) if self.enabled else None
+        if entry is not None and entry.versions == self.snapshot(scopes):
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def put(self, key: str, versions: Tuple[int, ...], body: bytes, headers: Dict[str, str]) -> CachedResponse:
+        entry = CachedResponse(versions, body, strong_etag(body), headers, {})
+        if self.enabled:
+            self.entries.set(key, entry)
+        return entry
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self.entries),
+            "scopes": len(self.versions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
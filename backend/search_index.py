@@ -0,0 +1,263 @@
+"""
+In-memory full-text index over auction lots.
+
+Text is folded to lowercase ASCII (so "Eléctrica" matches "electrica"), split on
+non-alphanumerics, stripped of Spanish stopwords and reduced with a light plural stemmer.
+Lots are ranked with BM25; every query also returns facet counts over all its matches. Each
+facet is counted with every filter applied but its own, so the other values of a filtered facet
+still show how many lots selecting them instead would give.
+
+Postings are kept in dicts so lots can be added and removed one at a time, and compiled
+lazily into numpy arrays for querying; a term's arrays are dropped whenever its postings
+change. The internal ids of removed lots are reused, so re-indexing a lot on every edit does
+not grow the index. Posting weights use the average document length known when the lot was added;
+reweight() recomputes them after a bulk load.
+"""
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+STOPWORDS = frozenset(
+    "a al con de del el en es la las lo los o para por se sin su sus un una uno y".split()
+)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Name matches count three times, brand and model twice.
+FIELD_WEIGHTS = (("name", 3), ("brand", 2), ("model", 2), ("description", 1))
+
+FACETS = ("category", "subcategory", "condition", "state", "year")
+
+UNKNOWN_YEAR = "desconocido"
+
+NO_VALUE = -1
+
+# Terms in at least this many lots are compiled eagerly after a bulk load, so the first
+# query for a common word does not pay for building its arrays.
+PRECOMPILE_MIN_DOCS = 256
+
+
+def fold(text: str) -> str:
+    return unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+
+
+def stem(token: str) -> str:
+    # camiones -> camion, motores -> motor, soldadoras -> soldadora
+    if len(token) > 5 and token.endswith("es") and token[-3] not in "aeiou":
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token[-2].isdigit():
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(token) for token in TOKEN_RE.findall(fold(text)) if token not in STOPWORDS]
+
+
+def year_bucket(year: Optional[int]) -> str:
+    if not year:
+        return UNKNOWN_YEAR
+    start = year - year % 5
+    return f"{start}-{start + 4}"
+
+
+def item_terms(item: dict) -> Counter:
+    terms = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        value = item.get(field)
+        if value:
+            for token in tokenize(str(value)):
+                terms[token] += weight
+    for value in (item.get("specifications") or {}).values():
+        if isinstance(value, str):
+            terms.update(tokenize(value))
+    return terms
+
+
+class FacetColumn:
+    """Facet value of every document, as integer codes into a label table."""
+
+    def __init__(self):
+        self.labels: List[str] = []
+        self.label_codes: Dict[str, int] = {}
+        self.codes = np.full(1024, NO_VALUE, dtype=np.int32)
+
+    def set(self, doc: int, value: Optional[str]):
+        if doc >= len(self.codes):
+            grown = np.full(max(doc + 1, 2 * len(self.codes)), NO_VALUE, dtype=np.int32)
+            grown[:len(self.codes)] = self.codes
+            self.codes = grown
+        if value is None:
+            self.codes[doc] = NO_VALUE
+            return
+        code = self.label_codes.get(value)
+        if code is None:
+            code = self.label_codes[value] = len(self.labels)
+            self.labels.append(value)
+        self.codes[doc] = code
+
+    def counts(self, docs: np.ndarray) -> Dict[str, int]:
+        codes = self.codes[docs]
+        totals = np.bincount(codes[codes != NO_VALUE], minlength=len(self.labels))
+        order = np.argsort(-totals, kind="stable")
+        return {self.labels[code]: int(totals[code]) for code in order if totals[code]}
+
+
+class ItemSearchIndex:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # Documents get a dense internal id; ids of removed documents wait in free for reuse.
+        self.doc_ids: Dict[str, int] = {}
+        self.item_ids: List[Optional[str]] = []
+        self.doc_terms: List[Optional[Counter]] = []
+        self.lengths: List[int] = []
+        self.free: List[int] = []
+        self.total_length = 0
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.compiled: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.facets: Dict[str, FacetColumn] = {facet: FacetColumn() for facet in FACETS}
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def _term_weight(self, tf: int, length: int, avgdl: float) -> float:
+        return tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avgdl))
+
+    def add(self, item: dict, state: Optional[str] = None):
+        """Index a lot, replacing any previous version with the same item_id."""
+        self.remove(item["item_id"])
+        terms = item_terms(item)
+        length = sum(terms.values())
+        if self.free:
+            doc = self.free.pop()
+            self.item_ids[doc] = item["item_id"]
+            self.doc_terms[doc] = terms
+            self.lengths[doc] = length
+        else:
+            doc = len(self.item_ids)
+            self.item_ids.append(item["item_id"])
+            self.doc_terms.append(terms)
+            self.lengths.append(length)
+        self.doc_ids[item["item_id"]] = doc
+        self.total_length += length
+
+        avgdl = self.total_length / len(self.doc_ids) or 1.0
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc] = self._term_weight(tf, length, avgdl)
+            self.compiled.pop(term, None)
+
+        self.facets["category"].set(doc, item.get("category"))
+        self.facets["subcategory"].set(doc, item.get("subcategory"))
+        self.facets["condition"].set(doc, item.get("condition"))
+        self.facets["state"].set(doc, state)
+        self.facets["year"].set(doc, year_bucket(item.get("year")))
+
+    def remove(self, item_id: str):
+        doc = self.doc_ids.pop(item_id, None)
+        if doc is None:
+            return
+        for term in self.doc_terms[doc]:
+            postings = self.postings[term]
+            del postings[doc]
+            if not postings:
+                del self.postings[term]
+            self.compiled.pop(term, None)
+        self.total_length -= self.lengths[doc]
+        for column in self.facets.values():
+            column.set(doc, None)
+        self.item_ids[doc] = None
+        self.doc_terms[doc] = None
+        self.lengths[doc] = 0
+        self.free.append(doc)
+
+    def reweight(self):
+        """Recompute every posting weight with the current average document length."""
+        if not self.doc_ids:
+            return
+        avgdl = self.total_length / len(self.doc_ids) or 1.0
+        for doc in self.doc_ids.values():
+            length = self.lengths[doc]
+            for term, tf in self.doc_terms[doc].items():
+                self.postings[term][doc] = self._term_weight(tf, length, avgdl)
+        self.compiled.clear()
+        for term, postings in self.postings.items():
+            if len(postings) >= PRECOMPILE_MIN_DOCS:
+                self._compiled_postings(term)
+
+    def _compiled_postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        compiled = self.compiled.get(term)
+        if compiled is None:
+            postings = self.postings.get(term)
+            if postings is None:
+                return None
+            docs = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            weights = np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+            order = np.argsort(docs)
+            compiled = self.compiled[term] = (docs[order], weights[order])
+        return compiled
+
+    def search(
+        self,
+        query: str,
+        filters: Optional[Dict[str, str]] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Tuple[int, List[Tuple[str, float]], Dict[str, Dict[str, int]]]:
+        """
+        Lots containing every query term, best BM25 score first.
+
+        Returns (total matches, [(item_id, score)] for the requested window, facet counts).
+        Facet counts are computed over all matches, applying every filter but the facet's own.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        compiled = [self._compiled_postings(term) for term in terms]
+        if not terms or any(c is None for c in compiled):
+            return 0, [], {facet: {} for facet in FACETS}
+        compiled.sort(key=lambda c: len(c[0]))
+        n = len(self.doc_ids)
+
+        docs, weights = compiled[0]
+        scores = weights * self._idf(len(docs), n)
+        for other_docs, other_weights in compiled[1:]:
+            # Both doc arrays are sorted: binary-search ours in theirs instead of re-sorting.
+            positions = np.searchsorted(other_docs, docs).clip(max=len(other_docs) - 1)
+            keep = other_docs[positions] == docs
+            docs, positions = docs[keep], positions[keep]
+            scores = scores[keep] + other_weights[positions] * self._idf(len(other_docs), n)
+        masks = {}
+        for facet, value in (filters or {}).items():
+            column = self.facets[facet]
+            masks[facet] = column.codes[docs] == column.label_codes.get(value, len(column.labels))
+        matches = docs
+        keep = np.ones(len(docs), dtype=bool)
+        for mask in masks.values():
+            keep &= mask
+        docs, scores = docs[keep], scores[keep]
+
+        window = min(offset + limit, len(docs))
+        if window:
+            top = np.argpartition(-scores, window - 1)[:window]
+            top = top[np.argsort(-scores[top], kind="stable")][offset:]
+        else:
+            top = np.empty(0, dtype=np.int64)
+        hits = [(self.item_ids[docs[i]], float(scores[i])) for i in top]
+        facets = {}
+        for facet, column in self.facets.items():
+            if facet not in masks:
+                facets[facet] = column.counts(docs)
+                continue
+            others = np.ones(len(matches), dtype=bool)
+            for other, mask in masks.items():
+                if other != facet:
+                    others &= mask
+            facets[facet] = column.counts(matches[others])
+        return len(docs), hits, facets
+
+    @staticmethod
+    def _idf(df: int, n: int) -> float:
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
@@ -1,41 +1,303 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, UploadFile, WebSocket, WebSocketDisconnect, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import os
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 import uuid
+import json
+import base64
+import io
 from datetime import datetime, timedelta
-from bson import ObjectId
+from bson import ObjectId, json_util
 import jwt
 import bcrypt
+import orjson
+
+from broadcast import BroadcastHub
+from catalog_import import CatalogImporter, import_files
+from compression import CompressionMiddleware, Compressor, encoded_etag
+from image_pipeline import FORMATS, SIZES, ImagePipeline, QueueFull, RenderError
+from image_store import ImageStore, MemoryImageStore, is_image_ref, parse_range, sniff_content_type
+from lifecycle import AuctionLifecycle
+from metrics import CounterCollector, MetricsMiddleware, MongoCommandListener, register_counters, render as render_metrics
+from proxy_bidding import MemoryProxyBidEngine, ProxyBidEngine
+from query_profiler import QueryProfiler, QueryProfilerMiddleware
+from rate_limit import AdmissionControl, AdmissionRule, ConcurrencyLimit, TokenBuckets, json_body_field
+from repositories import create_repositories
+from response_cache import ResponseCache
+from search_index import FACETS, ItemSearchIndex
+from settlement import SettlementEngine
+from ttl_cache import TTLCache
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Metrics Configuration
+# Prometheus metrics at /metrics (outside /api, for the scraper rather than the load balancer).
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+
+# Query profiler Configuration
+# Development only: records the MongoDB commands of each request, explains those slower than
+# QUERY_PROFILER_SLOW_MS and warns about requests issuing more than QUERY_PROFILER_MAX_QUERIES.
+# Profiles of the last QUERY_PROFILER_HISTORY requests are served under /api/admin/query-profiles.
+QUERY_PROFILER_ENABLED = os.environ.get("QUERY_PROFILER_ENABLED", "false").lower() == "true"
+QUERY_PROFILER_SLOW_MS = float(os.environ.get("QUERY_PROFILER_SLOW_MS", "100"))
+QUERY_PROFILER_MAX_QUERIES = int(os.environ.get("QUERY_PROFILER_MAX_QUERIES", "20"))
+QUERY_PROFILER_HISTORY = int(os.environ.get("QUERY_PROFILER_HISTORY", "200"))
+query_profiler = QueryProfiler(QUERY_PROFILER_SLOW_MS, QUERY_PROFILER_MAX_QUERIES, QUERY_PROFILER_HISTORY)
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+command_listeners = [MongoCommandListener()] if METRICS_ENABLED else []
+if QUERY_PROFILER_ENABLED:
+    command_listeners.append(query_profiler)
+client = AsyncIOMotorClient(mongo_url, event_listeners=command_listeners)
 db = client[os.environ['DB_NAME']]
 
+# Repository Configuration
+# "mongo", or "memory" to keep users, auctions, lots, bids, proxy bids, registrations and images
+# in this process (tests, and benchmarks of the application without the database). Image
+# variants, catalog import and settlement answer 503 with the memory engine, and auction
+# statuses are not advanced by the lifecycle scheduler; see repositories.py.
+REPOSITORY_ENGINE = os.environ.get("REPOSITORY_ENGINE", "mongo")
+image_store = MemoryImageStore() if REPOSITORY_ENGINE == "memory" else ImageStore(db)
+
 # JWT Configuration
 SECRET_KEY = "your-secret-key-here"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Password hashing Configuration
+# bcrypt runs on its own thread pool, so a login burst queues there instead of stalling the
+# event loop; the pool size caps how many CPUs hashing may take. Stored hashes with a different
+# cost are upgraded on the next successful login.
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "4"))
+
+# Auth cache Configuration
+# Users resolved from tokens are cached per worker; a write to a user invalidates this worker's
+# entry and the TTL bounds how stale other workers can be. With AUTH_TRUST_TOKEN_CLAIMS,
+# endpoints that only need the caller's identity read it from the signed token, without
+# checking that the account still exists.
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "60"))
+AUTH_TRUST_TOKEN_CLAIMS = os.environ.get("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() == "true"
+
+# Admission control Configuration
+# Checked in middleware before the handlers: token buckets per client IP and per account, in
+# requests per minute (also the burst allowed), and a cap on requests in flight. Over a limit
+# the answer is 429 with Retry-After. Limits are per worker.
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Reverse proxies in front of the app that append the client address to X-Forwarded-For; 0 uses the peer address.
+RATE_LIMIT_TRUSTED_PROXIES = int(os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", "0"))
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000"))
+AUTH_LIMIT_PER_IP = int(os.environ.get("AUTH_LIMIT_PER_IP", "30"))
+AUTH_LIMIT_PER_ACCOUNT = int(os.environ.get("AUTH_LIMIT_PER_ACCOUNT", "10"))
+AUTH_MAX_IN_FLIGHT = int(os.environ.get("AUTH_MAX_IN_FLIGHT", str(PASSWORD_HASH_WORKERS * 8)))
+WRITE_LIMIT_PER_IP = int(os.environ.get("WRITE_LIMIT_PER_IP", "600"))
+WRITE_LIMIT_PER_ACCOUNT = int(os.environ.get("WRITE_LIMIT_PER_ACCOUNT", "120"))
+WRITE_MAX_IN_FLIGHT = int(os.environ.get("WRITE_MAX_IN_FLIGHT", "1000"))
+
+# Admin Configuration
+# Comma-separated emails of the users allowed to call /api/admin endpoints.
+ADMIN_EMAILS = {email.strip().lower() for email in os.environ.get("ADMIN_EMAILS", "").split(",") if email.strip()}
+
+# Bidding Configuration
+# Minimum increment ladder: (current bid upper bound, increment). The last tier has no bound.
+BID_INCREMENTS = [
+    (10000.0, 100.0),
+    (100000.0, 1000.0),
+    (1000000.0, 5000.0),
+    (None, 10000.0),
+]
+
+# Live bids Configuration
+# "local": the bid handler publishes to this worker's listeners.
+# "change_stream": each auction's broadcaster tails auction_items (requires a replica set,
+# checked at startup), so listeners see bids accepted by any worker.
+LIVE_BIDS_SOURCE = os.environ.get("LIVE_BIDS_SOURCE", "local")
+LIVE_BIDS_QUEUE_SIZE = int(os.environ.get("LIVE_BIDS_QUEUE_SIZE", "64"))
+
+# Images Configuration
+# Image URLs are content hashes, so clients and CDNs may cache them forever.
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+IMAGE_MIGRATION_BATCH = 500
+IMAGE_MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+# Derivatives render in a process pool (default: one process per CPU). An upload waits up to
+# IMAGE_ENQUEUE_TIMEOUT seconds for room in the queue before being told to retry later.
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", "0")) or None
+IMAGE_QUEUE_SIZE = int(os.environ.get("IMAGE_QUEUE_SIZE", "100"))
+IMAGE_ENQUEUE_TIMEOUT = float(os.environ.get("IMAGE_ENQUEUE_TIMEOUT", "5"))
+
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+image_pipeline = ImagePipeline(image_store, db.image_variants, IMAGE_WORKERS, IMAGE_QUEUE_SIZE)
+
+# Response cache Configuration
+# Serialized catalog responses, invalidated by version bumps on write. The TTL bounds how long
+# writes made by other workers go unnoticed; RESPONSE_CACHE_SIZE=0 disables caching.
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "5000"))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "10"))
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+# Compression Configuration
+# JSON and text bodies of at least COMPRESSION_MIN_SIZE bytes are sent with brotli or gzip,
+# whichever Accept-Encoding prefers. Bodies of COMPRESSION_OFFLOAD_SIZE bytes or more are
+# compressed on a thread pool; cached catalog responses keep their compressed variants.
+COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_OFFLOAD_SIZE = int(os.environ.get("COMPRESSION_OFFLOAD_SIZE", str(64 * 1024)))
+COMPRESSION_WORKERS = int(os.environ.get("COMPRESSION_WORKERS", "2"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "4"))
+compression_executor = ThreadPoolExecutor(max_workers=COMPRESSION_WORKERS, thread_name_prefix="compress")
+compressor = Compressor(COMPRESSION_MIN_SIZE, COMPRESSION_OFFLOAD_SIZE, compression_executor, GZIP_LEVEL, BROTLI_QUALITY)
+
+# Auction lifecycle Configuration
+# Statuses flip at start_date/end_date; the schedule is also reloaded from the database this
+# often, to pick up auctions created or edited by other processes (e.g. a CLI import).
+LIFECYCLE_RESYNC_INTERVAL = float(os.environ.get("LIFECYCLE_RESYNC_INTERVAL", "300"))
+
+# Settlement Configuration
+# Ended auctions are settled by whichever worker claims them first; a claim older than this
+# (the worker died mid-settlement) can be taken over. Unsettled auctions are looked for at
+# startup and then every SETTLEMENT_RETRY_INTERVAL seconds.
+SETTLEMENT_CLAIM_TIMEOUT = float(os.environ.get("SETTLEMENT_CLAIM_TIMEOUT", "600"))
+SETTLEMENT_RETRY_INTERVAL = float(os.environ.get("SETTLEMENT_RETRY_INTERVAL", "300"))
+settlement = SettlementEngine(db, claim_timeout=SETTLEMENT_CLAIM_TIMEOUT, retry_interval=SETTLEMENT_RETRY_INTERVAL)
+
+# Pagination Configuration
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Login and registration count together, and so do all the write endpoints.
+def per_minute(limit: int) -> TokenBuckets:
+    return TokenBuckets(limit, 60.0, RATE_LIMIT_MAX_KEYS)
+
+def token_account(headers: dict, body: bytes) -> Optional[str]:
+    """Caller of a write endpoint; the signature is checked so nobody can drain another's bucket."""
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except jwt.PyJWTError:
+        return None
+
+auth_limits = {
+    "per_ip": per_minute(AUTH_LIMIT_PER_IP),
+    "per_account": per_minute(AUTH_LIMIT_PER_ACCOUNT),
+    "concurrency": ConcurrencyLimit(AUTH_MAX_IN_FLIGHT),
+    "account": json_body_field("email"),
+    "read_body": True,
+}
+write_limits = {
+    "per_ip": per_minute(WRITE_LIMIT_PER_IP),
+    "per_account": per_minute(WRITE_LIMIT_PER_ACCOUNT),
+    "concurrency": ConcurrencyLimit(WRITE_MAX_IN_FLIGHT),
+    "account": token_account,
+}
+ADMISSION_RULES = [
+    AdmissionRule("POST", "/api/auth/login", **auth_limits),
+    AdmissionRule("POST", "/api/auth/register", **auth_limits),
+    AdmissionRule("POST", "/api/items/{item_id}/bids", **write_limits),
+    AdmissionRule("POST", "/api/items/{item_id}/proxy-bids", **write_limits),
+    AdmissionRule("POST", "/api/auctions/{auction_id}/register", **write_limits),
+    AdmissionRule("POST", "/api/images", **write_limits),
+    AdmissionRule("POST", "/api/admin/import", **write_limits),
+]
+
+register_counters(
+    CounterCollector(
+        "cache_lookups", "Cache lookups by cache and result.", ["cache", "result"],
+        lambda: [
+            (("response", "hit"), response_cache.hits),
+            (("response", "miss"), response_cache.misses),
+            (("response", "not_modified"), response_cache.not_modified),
+            (("user", "hit"), user_cache.hits),
+            (("user", "miss"), user_cache.misses),
+        ],
+    ),
+    CounterCollector(
+        "admission_rejections", "Requests answered 429 by admission control, by limit.", ["limits", "limiter"],
+        lambda: [
+            ((name, limiter), limits[limiter].rejected)
+            for name, limits in (("auth", auth_limits), ("write", write_limits))
+            for limiter in ("per_ip", "per_account", "concurrency")
+        ],
+    ),
+    CounterCollector(
+        "response_compression_bytes", "Response bytes before (in) and after (out) compression.", ["encoding", "direction"],
+        lambda: [
+            ((encoding, direction), counts[encoding])
+            for direction, counts in (("in", compressor.bytes_in), ("out", compressor.bytes_out))
+            for encoding in counts
+        ],
+    ),
+    CounterCollector(
+        "response_compression_cpu_seconds", "CPU time spent compressing responses.", ["encoding"],
+        lambda: [((encoding,), seconds) for encoding, seconds in compressor.cpu_seconds.items()],
+    ),
+)
+
 # Create the main app without a prefix
 app = FastAPI()
 
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        body, content_type = render_metrics()
+        return Response(content=body, headers={"Content-Type": content_type})
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 # Security
 security = HTTPBearer()
 
+# Indexes: one per query shape issued by the API, created idempotently at startup.
+INDEXES = {
+    "auctions": [
+        IndexModel([("auction_id", ASCENDING)], unique=True),
+        IndexModel([("start_date", ASCENDING), ("auction_id", ASCENDING)]),
+        IndexModel([("state", ASCENDING), ("start_date", ASCENDING), ("auction_id", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("start_date", ASCENDING), ("auction_id", ASCENDING)]),
+        IndexModel([("end_date", ASCENDING)]),
+    ],
+    "auction_items": [
+        IndexModel([("item_id", ASCENDING)], unique=True),
+        IndexModel([("auction_id", ASCENDING), ("lot_order", ASCENDING), ("item_id", ASCENDING)]),
+        IndexModel([("category", ASCENDING), ("starting_price", ASCENDING), ("auction_id", ASCENDING)]),
+        IndexModel([("starting_price", ASCENDING), ("auction_id", ASCENDING)]),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING)], unique=True),
+    ],
+    "bids": [
+        IndexModel([("item_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "proxy_bids": [
+        IndexModel([("item_id", ASCENDING), ("user_id", ASCENDING)], unique=True),
+        IndexModel([("item_id", ASCENDING), ("max_amount", DESCENDING), ("created_at", ASCENDING)]),
+    ],
+    "registrations": [
+        IndexModel([("auction_id", ASCENDING), ("user_id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING), ("auction_id", ASCENDING)]),
+    ],
+}
+INDEX_PROGRESS_INTERVAL = 2.0  # seconds between build progress log lines
+
 # Pydantic Models
 class AuctionItem(BaseModel):
     id: Optional[str] = Field(alias="_id", default=None)
@@ -50,12 +312,15 @@ class AuctionItem(BaseModel):
     starting_price: float
     current_bid: float
     estimated_value: Dict[str, float]  # {"min": 50000, "max": 75000}
-    images: List[str]  # base64 encoded images
+    images: List[str]  # SHA-256 hashes in the image store, served at /api/images/{hash}
     condition: str  # excelente, bueno, regular, para_reparacion
     mileage: Optional[int] = None
     specifications: Dict[str, Any]
     location: str
     auction_id: str
+    auction_status: Optional[str] = None  # copy of the auction's status, read when validating bids
+    lot_order: int = 0  # position of the lot within its auction
+    bid_count: int = 0
 
     class Config:
         allow_population_by_field_name = True
@@ -73,12 +338,32 @@ class Auction(BaseModel):
     location: str
     state: str
     total_items: int = 0
+    registered_count: int = 0  # registered bidders, kept up to date on registration
     registration_fee: float = 500.0  # Tarifa de inscripción en pesos mexicanos
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Config:
         allow_population_by_field_name = True
 
+class AuctionSearchResult(Auction):
+    match_count: int = 0  # lots matching the filters
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+class ItemSearchHit(BaseModel):
+    score: float
+    item: AuctionItem
+
+class ItemSearchResponse(BaseModel):
+    total: int
+    hits: List[ItemSearchHit]
+    facets: Dict[str, Dict[str, int]]  # category, subcategory, condition, state, year
+
+class AuctionWithItems(BaseModel):
+    auction: Auction
+    items: List[AuctionItem]  # first page, as GET /auctions/{auction_id}/items returns it
+    next_cursor: Optional[str] = None  # cursor for the following page of that endpoint
+
 class User(BaseModel):
     id: Optional[str] = Field(alias="_id", default=None)
     user_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -94,6 +379,12 @@ class User(BaseModel):
     class Config:
         allow_population_by_field_name = True
 
+class Principal(BaseModel):
+    # Caller identity as carried in the access token claims.
+    user_id: str
+    email: str
+    full_name: str
+
 class UserRegister(BaseModel):
     email: str
     full_name: str
@@ -109,15 +400,53 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+class BidCreate(BaseModel):
+    amount: float = Field(gt=0)
+
+class Bid(BaseModel):
+    id: Optional[str] = Field(alias="_id", default=None)
+    bid_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    item_id: str
+    auction_id: str
+    user_id: str
+    amount: float
+    proxy: bool = False  # placed by the server on behalf of a bidder's maximum bid
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Config:
+        allow_population_by_field_name = True
+
+class ProxyBidCreate(BaseModel):
+    max_amount: float = Field(gt=0)
+
+class ProxyBidStatus(BaseModel):
+    item_id: str
+    max_amount: float  # the bidder's stored ceiling, which may be higher than the one just sent
+    current_bid: float
+    winning: bool
+
+class Registration(BaseModel):
+    auction_id: str
+    user_id: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
 # Auth functions
 def hash_password(password: str) -> str:
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    # Modular crypt format: $2b$<cost>$<salt and hash>
+    return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+
+async def run_password_hasher(func, *args):
+    # bcrypt releases the GIL, so the pool threads hash in parallel with the event loop.
+    return await asyncio.get_running_loop().run_in_executor(password_executor, func, *args)
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -125,24 +454,514 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def create_user_token(user_id: str, email: str, full_name: str) -> str:
+    return create_access_token(data={"sub": user_id, "email": email, "name": full_name})
+
+def decode_access_token(token: str) -> dict:
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    
-    user = await db.users.find_one({"user_id": user_id})
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    return payload
+
+async def load_user(user_id: str) -> User:
+    # Cached instances are shared between requests: handlers must not mutate them.
+    user = user_cache.get(user_id)
     if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
-    return User(**user)
+        document = await repos.users.get(user_id)
+        if document is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        if "_id" in document:
+            document["_id"] = str(document["_id"])
+        user = User(**document)
+        user_cache.set(user_id, user)
+    return user
+
+def invalidate_user(user_id: str):
+    """Call after any write to a user document."""
+    user_cache.invalidate(user_id)
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    payload = decode_access_token(credentials.credentials)
+    return await load_user(payload["sub"])
+
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+async def get_current_principal(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    # For endpoints that need only who is calling, not the rest of the user document.
+    payload = decode_access_token(credentials.credentials)
+    if AUTH_TRUST_TOKEN_CLAIMS and "email" in payload and "name" in payload:
+        return Principal(user_id=payload["sub"], email=payload["email"], full_name=payload["name"])
+    user = await load_user(payload["sub"])
+    return Principal(user_id=user.user_id, email=user.email, full_name=user.full_name)
+
+def require_mongo():
+    """Dependency of the endpoints built on collections the memory repository engine does not hold."""
+    if REPOSITORY_ENGINE != "mongo":
+        raise HTTPException(status_code=503, detail="Not available with the in-memory repository engine")
+
+# Pagination functions
+# List endpoints page with an opaque cursor holding the sort key of the last document returned,
+# so each page is an index range scan no matter how deep the client has paged.
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def auctions_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    """(start_date, auction_id) of the last auction of the previous page."""
+    if not cursor:
+        return None
+    start_date, auction_id = decode_cursor(cursor, 2)
+    try:
+        start_date = datetime.fromisoformat(start_date)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(auction_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return start_date, auction_id
+
+def items_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    """(lot_order, item_id) of the last lot of the previous page."""
+    if not cursor:
+        return None
+    lot_order, item_id = decode_cursor(cursor, 2)
+    if not isinstance(lot_order, int) or not isinstance(item_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return lot_order, item_id
+
+def finish_page(docs: list, sort: list, limit: int, response: Response) -> list:
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(*(last.get(field) for field, _ in sort))
+    for doc in docs:
+        if "_id" in doc:
+            doc["_id"] = str(doc["_id"])
+    return docs
+
+def registrations_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    """(created_at, auction_id) of the last registration of the previous page."""
+    if not cursor:
+        return None
+    created_at, auction_id = decode_cursor(cursor, 2)
+    try:
+        created_at = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(auction_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, auction_id
+
+AUCTIONS_SORT = [("start_date", 1), ("auction_id", 1)]
+ITEMS_SORT = [("lot_order", 1), ("item_id", 1)]
+REGISTRATIONS_SORT = [("created_at", 1), ("auction_id", 1)]
+
+# Response cache functions
+def model_projection(model) -> dict:
+    """
+    Find projection that returns documents already shaped like the model's JSON, without _id.
+
+    Stored documents were written through the models, so they are valid as they are; only
+    fields added to a model after a document was written need their default filled in.
+    """
+    projection = {"_id": 0}
+    for name, field in model.model_fields.items():
+        key = field.alias or name
+        if key == "_id":
+            continue
+        if field.is_required() or field.default_factory is not None:
+            projection[key] = 1
+        else:
+            projection[key] = {"$ifNull": [f"${key}", {"$literal": field.default}]}
+    return projection
+
+AUCTION_PROJECTION = model_projection(Auction)
+ITEM_PROJECTION = model_projection(AuctionItem)
+SEARCH_RESULT_PROJECTION = model_projection(AuctionSearchResult)
+
+def encode_model(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(by_alias=True)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def dump_json(content) -> bytes:
+    return orjson.dumps(content, default=encode_model)
+
+def json_response(content, response: Optional[Response] = None) -> Response:
+    """JSON for already-shaped documents, keeping headers set on the injected response."""
+    headers = dict(response.headers) if response is not None else {}
+    headers.pop("content-length", None)
+    return Response(dump_json(content), media_type="application/json", headers=headers)
+
+# Sparse fieldsets
+# fields= selects top-level fields and view= names a preset; both become the find projection.
+# Identifiers and sort keys are always returned, so pagination cursors keep working.
+def pick(projection: dict, fields: List[str]) -> dict:
+    return {field: projection[field] for field in fields}
+
+AUCTION_KEY_FIELDS = ["auction_id", "start_date"]
+ITEM_KEY_FIELDS = ["item_id", "auction_id", "lot_order"]
+AUCTION_VIEWS = {
+    "card": pick(AUCTION_PROJECTION, ["title", "end_date", "status", "location", "state", "total_items"]),
+}
+ITEM_VIEWS = {
+    "card": {
+        **pick(ITEM_PROJECTION, ["name", "current_bid", "starting_price", "auction_status", "bid_count", "condition", "year"]),
+        "images": {"$slice": 1},  # cover image only
+    },
+}
+
+def sparse_projection(full: dict, key_fields: List[str], views: Dict[str, dict], fields: Optional[str], view: Optional[str]) -> dict:
+    if not fields and not view:
+        return full
+    if view and view not in views:
+        raise HTTPException(status_code=400, detail=f"Unknown view: {view}")
+    selected = [field.strip() for field in (fields or "").split(",") if field.strip()]
+    unknown = [field for field in selected if field == "_id" or field not in full]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    projection = {"_id": 0, **pick(full, key_fields)}
+    if view:
+        projection.update(views[view])
+    projection.update(pick(full, selected))
+    return projection
+
+def auction_fields(fields: Optional[str] = None, view: Optional[str] = Query(None, description="card")) -> dict:
+    return sparse_projection(AUCTION_PROJECTION, AUCTION_KEY_FIELDS, AUCTION_VIEWS, fields, view)
+
+def item_fields(fields: Optional[str] = None, view: Optional[str] = Query(None, description="card")) -> dict:
+    return sparse_projection(ITEM_PROJECTION, ITEM_KEY_FIELDS, ITEM_VIEWS, fields, view)
+
+def search_result_fields(fields: Optional[str] = None, view: Optional[str] = Query(None, description="card")) -> dict:
+    return sparse_projection(SEARCH_RESULT_PROJECTION, AUCTION_KEY_FIELDS, AUCTION_VIEWS, fields, view)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+async def cached_json(request: Request, scopes: List[str], build) -> Response:
+    """
+    Serve build(response)'s JSON from the response cache, building it on a miss.
+
+    Headers that build sets on the response it receives (e.g. X-Next-Cursor) are cached too,
+    and so is each compressed variant of the body once a client has asked for it.
+    """
+    key = f"{request.url.path}?{request.url.query}"
+    entry = response_cache.get(key, scopes)
+    cache_status = "HIT"
+    if entry is None:
+        versions = response_cache.snapshot(scopes)
+        partial = Response()
+        content = await build(partial)
+        # Handlers return documents fetched with model_projection, so they are serialized as
+        # they are instead of being validated into models and back.
+        body = dump_json(content)
+        extra = {name: value for name, value in partial.headers.items() if name.startswith("x-")}
+        entry = response_cache.put(key, versions, body, extra)
+        cache_status = "MISS"
+    headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": "no-cache", "X-Cache": cache_status}
+    encoding = None
+    if COMPRESSION_ENABLED:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = compressor.choose(request.headers.get("accept-encoding", ""), len(entry.body))
+        if encoding is not None:
+            headers["ETag"] = encoded_etag(entry.etag, encoding)
+    if etag_matches(request, headers["ETag"]):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        return Response(entry.body, media_type="application/json", headers=headers)
+    body = entry.variants.get(encoding)
+    if body is None:
+        body = entry.variants[encoding] = await compressor.compress(entry.body, encoding)
+    return Response(body, media_type="application/json", headers={**headers, "Content-Encoding": encoding})
+
+def auction_changed(auction_id: str):
+    response_cache.bump("auctions", f"auction:{auction_id}")
+
+def item_changed(item_id: str, auction_id: str):
+    response_cache.bump(f"item:{item_id}", f"items:{auction_id}")
+
+# Search functions
+def search_item_match(category: Optional[str], min_price: Optional[float], max_price: Optional[float]) -> dict:
+    match = {}
+    if category:
+        match["category"] = category
+    price_filter = {}
+    if min_price is not None:
+        price_filter["$gte"] = min_price
+    if max_price is not None:
+        price_filter["$lte"] = max_price
+    if price_filter:
+        match["starting_price"] = price_filter
+    return match
+
+# Item search index
+# Built in the background at startup; until then /search/items answers 503.
+item_search_index: Optional[ItemSearchIndex] = None
+SEARCH_INDEX_PROJECTION = {"images": 0, "_id": 0}
+
+async def auction_states() -> Dict[str, str]:
+    return {
+        auction["auction_id"]: auction.get("state")
+        async for auction in repos.auctions.find_all({"auction_id": 1, "state": 1})
+    }
+
+async def build_item_search_index():
+    global item_search_index
+    started = datetime.utcnow()
+    states = await auction_states()
+    index = ItemSearchIndex()
+    async for item in repos.items.find_all(SEARCH_INDEX_PROJECTION):
+        index.add(item, states.get(item["auction_id"]))
+    index.reweight()
+    item_search_index = index
+    elapsed = (datetime.utcnow() - started).total_seconds()
+    logger.info("Item search index built with %d lots in %.2fs", len(index), elapsed)
+
+async def reindex_items(item_ids: List[str]):
+    """Refresh the search index after lots were created or edited; call from every item writer."""
+    if item_search_index is None:
+        return  # the running build reads the new documents itself
+    states = await auction_states()
+    found = set()
+    for item in await repos.items.find_many(item_ids, SEARCH_INDEX_PROJECTION):
+        item_search_index.add(item, states.get(item["auction_id"]))
+        found.add(item["item_id"])
+    for item_id in set(item_ids) - found:
+        item_search_index.remove(item_id)
+
+REINDEX_BATCH = 1000
+
+async def reindex_auctions(auction_ids: List[str]):
+    """Refresh the search index for every lot of the auctions, e.g. after the auctions changed."""
+    for auction_id in auction_ids:
+        after = None
+        while True:
+            items = await repos.items.page(auction_id, after, REINDEX_BATCH, {"_id": 0, "item_id": 1, "lot_order": 1})
+            if not items:
+                break
+            await reindex_items([item["item_id"] for item in items])
+            after = (items[-1]["lot_order"], items[-1]["item_id"])
+
+# Bidding functions
+def bid_increment(current_bid: float) -> float:
+    for upper, increment in BID_INCREMENTS:
+        if upper is None or current_bid < upper:
+            return increment
+
+def min_next_bid(current_bid: float, bid_count: int = 1, starting_price: Optional[float] = None) -> float:
+    """
+    The opening bid may match the starting price; later bids add an increment. A lot seeded with a
+    current_bid above its starting price has a standing bid to beat even before its first bid.
+    """
+    if bid_count == 0 and current_bid == starting_price:
+        return current_bid
+    return current_bid + bid_increment(current_bid)
+
+def min_next_bid_expr() -> dict:
+    """Same rule as min_next_bid, as an aggregation expression evaluated by mongod."""
+    branches = [
+        {"case": {"$lt": ["$current_bid", upper]}, "then": increment}
+        for upper, increment in BID_INCREMENTS
+        if upper is not None
+    ]
+    increment = {"$switch": {"branches": branches, "default": BID_INCREMENTS[-1][1]}}
+    opening = {"$and": [{"$eq": [{"$ifNull": ["$bid_count", 0]}, 0]}, {"$eq": ["$current_bid", "$starting_price"]}]}
+    return {"$add": ["$current_bid", {"$cond": [opening, 0, increment]}]}
+
+def bid_delta(item_id: str, current_bid: float, bid_count: int) -> dict:
+    """Compact price change pushed to live listeners; bid_count orders deltas for the same item."""
+    return {
+        "type": "bid",
+        "item_id": item_id,
+        "current_bid": current_bid,
+        "bid_count": bid_count,
+        "min_next_bid": min_next_bid(current_bid, bid_count),
+    }
+
+async def watch_auction_bids(auction_id: str, publish):
+    pipeline = [
+        {"$match": {
+            "operationType": "update",
+            "fullDocument.auction_id": auction_id,
+            "updateDescription.updatedFields.current_bid": {"$exists": True},
+        }},
+        {"$project": {"fullDocument.item_id": 1, "fullDocument.current_bid": 1, "fullDocument.bid_count": 1}},
+    ]
+    async with db.auction_items.watch(pipeline, full_document="updateLookup") as stream:
+        async for change in stream:
+            item = change["fullDocument"]
+            publish(bid_delta(item["item_id"], item["current_bid"], item.get("bid_count", 0)))
+
+async def check_live_bids_source():
+    """Refuse to start in change_stream mode without change streams, instead of serving no live bids."""
+    if LIVE_BIDS_SOURCE == "local":
+        return
+    if LIVE_BIDS_SOURCE != "change_stream":
+        raise RuntimeError(f"Unknown LIVE_BIDS_SOURCE {LIVE_BIDS_SOURCE!r}; expected local or change_stream")
+    if REPOSITORY_ENGINE != "mongo":
+        raise RuntimeError("LIVE_BIDS_SOURCE=change_stream needs REPOSITORY_ENGINE=mongo")
+    hello = await client.admin.command("hello")
+    # Change streams are served by replica set members and by mongos, not by a standalone mongod.
+    if "setName" not in hello and hello.get("msg") != "isdbgrid":
+        raise RuntimeError("LIVE_BIDS_SOURCE=change_stream needs a replica set; use LIVE_BIDS_SOURCE=local on a standalone mongod")
+
+bid_hub = BroadcastHub(
+    queue_size=LIVE_BIDS_QUEUE_SIZE,
+    watcher=watch_auction_bids if LIVE_BIDS_SOURCE == "change_stream" else None,
+)
+
+repos = create_repositories(REPOSITORY_ENGINE, db, min_next_bid, min_next_bid_expr())
+proxy_bids = ProxyBidEngine(db, bid_increment) if REPOSITORY_ENGINE == "mongo" else MemoryProxyBidEngine(repos.items, bid_increment)
+
+async def bid_accepted(item_id: str, auction_id: str, user_id: str, amount: float, bid_count: int, proxy: bool = False) -> Bid:
+    """Everything that follows a successful price update: caches, live listeners and the bid log."""
+    item_changed(item_id, auction_id)
+    if LIVE_BIDS_SOURCE == "local":
+        bid_hub.publish(auction_id, bid_delta(item_id, amount, bid_count))
+    # The item document is the source of truth for the price; the bid log is an audit trail.
+    bid = Bid(item_id=item_id, auction_id=auction_id, user_id=user_id, amount=amount, proxy=proxy)
+    await repos.bids.insert(bid.dict(by_alias=True, exclude={"id"}))
+    return bid
+
+async def resolve_proxy_bids(item_id: str):
+    """Answer the standing bid with the lot's proxies; call after every price change a bidder makes."""
+    item = await proxy_bids.resolve(item_id)
+    if item is not None:
+        await bid_accepted(item_id, item["auction_id"], item["high_bidder_id"], item["current_bid"], item["bid_count"], proxy=True)
+
+async def sync_item_auction_status():
+    """Copy each auction's status to its lots (auction_status), so bids are validated without a join."""
+    async for auction in repos.auctions.find_all({"auction_id": 1, "status": 1}):
+        await repos.items.set_auction_status(auction["auction_id"], auction["status"])
+    # Lots created before lot_order existed would fall out of the pagination order without it.
+    if REPOSITORY_ENGINE == "mongo":
+        await db.auction_items.update_many({"lot_order": {"$exists": False}}, {"$set": {"lot_order": 0}})
+
+search_reindex_tasks: Set[asyncio.Task] = set()
+
+async def reindex_changed_auctions(auction_ids: List[str]):
+    try:
+        await reindex_auctions(auction_ids)
+    except Exception:
+        logger.exception("Search reindex of auctions %s failed", auction_ids)
+
+def auction_statuses_changed(changed: Dict[str, str], written: Set[str]):
+    """Called by the lifecycle scheduler after auctions started or ended; written are those this worker flipped."""
+    response_cache.invalidate_all()
+    # Their lots' facets are read from the auctions, so they are refreshed in the background.
+    task = asyncio.create_task(reindex_changed_auctions(sorted(changed)))
+    search_reindex_tasks.add(task)
+    task.add_done_callback(search_reindex_tasks.discard)
+    for auction_id, auction_status in changed.items():
+        bid_hub.publish(auction_id, {"type": "status", "auction_id": auction_id, "status": auction_status})
+    # Only the worker that ended an auction settles it; settle_pending() covers a worker that dies first.
+    ended = sorted(auction_id for auction_id in written if changed[auction_id] == "finalizada")
+    if ended:
+        settlement.schedule(ended)
+
+lifecycle = AuctionLifecycle(db, auction_statuses_changed, LIFECYCLE_RESYNC_INTERVAL)
+
+# Image functions
+async def store_image_refs(images: List[str]) -> List[str]:
+    """
+    Move inline base64 images into the image store, returning the list as references.
+    Entries that are neither references nor valid base64 are dropped and logged.
+    """
+    refs = []
+    for image in images:
+        if not is_image_ref(image):
+            try:
+                data = base64.b64decode(image, validate=True)
+            except (TypeError, ValueError):
+                logger.warning("Dropping an image that is not valid base64: %.40r", image)
+                continue
+            image = await image_store.put(data)
+        refs.append(image)
+    return refs
+
+async def migrate_inline_images():
+    """One-off conversion of the lots that still keep base64 images inside the document."""
+    if await db.migrations.find_one({"_id": "inline_images"}):
+        return
+    inline = {"images": {"$elemMatch": {"$not": {"$regex": "^[0-9a-f]{64}$"}}}}
+    migrated = 0
+    updates = []
+    async for item in db.auction_items.find(inline, {"_id": 1, "images": 1}):
+        updates.append(UpdateOne({"_id": item["_id"]}, {"$set": {"images": await store_image_refs(item["images"])}}))
+        if len(updates) >= IMAGE_MIGRATION_BATCH:
+            await db.auction_items.bulk_write(updates, ordered=False)
+            migrated += len(updates)
+            updates = []
+    if updates:
+        await db.auction_items.bulk_write(updates, ordered=False)
+        migrated += len(updates)
+    await db.migrations.insert_one({"_id": "inline_images", "items": migrated, "done_at": datetime.utcnow()})
+    logger.info("Moved inline images of %d lots to the image store", migrated)
+
+# Index bootstrap
+async def log_index_build_progress(collection_name: str):
+    while True:
+        await asyncio.sleep(INDEX_PROGRESS_INTERVAL)
+        ops = await client.admin.command({
+            "currentOp": True,
+            "ns": f"{db.name}.{collection_name}",
+            "command.createIndexes": {"$exists": True},
+        })
+        for op in ops.get("inprog", []):
+            logger.info("Index build on %s: %s", collection_name, op.get("msg", "in progress"))
+
+async def ensure_indexes():
+    """Create the indexes declared in INDEXES; existing ones are not rebuilt."""
+    for collection_name, indexes in INDEXES.items():
+        existing = await db[collection_name].index_information()
+        for index in indexes:
+            name = index.document["name"]
+            if name in existing:
+                continue
+            logger.info("Building index %s on %s", name, collection_name)
+            started = datetime.utcnow()
+            progress = asyncio.create_task(log_index_build_progress(collection_name))
+            try:
+                await db[collection_name].create_indexes([index])
+            except OperationFailure as exc:
+                # A conflicting index or duplicate data must not keep the API from starting.
+                logger.error("Could not build index %s on %s: %s", name, collection_name, exc)
+                continue
+            finally:
+                progress.cancel()
+            elapsed = (datetime.utcnow() - started).total_seconds()
+            logger.info("Built index %s on %s in %.2fs", name, collection_name, elapsed)
 
 # Initialize sample data
+async def insert_seed_auction(auction: Auction) -> bool:
+    """Insert a seeded auction; False if it already exists, e.g. because another worker seeded it first."""
+    # Workers start together on an empty database: the unique auction_id index lets one of them
+    # seed each auction and its lots, instead of failing the others' startup.
+    try:
+        await repos.auctions.insert(auction.dict(by_alias=True, exclude={"id"}))
+    except DuplicateKeyError:
+        return False
+    return True
+
 async def init_sample_data():
     # Check if data already exists
-    existing_auctions = await db.auctions.count_documents({})
+    existing_auctions = await repos.auctions.count()
     if existing_auctions > 0:
         return
     
@@ -189,9 +1008,12 @@ async def init_sample_data():
         }
     ]
     
-    for auction_data in sample_auctions:
-        auction = Auction(**auction_data)
-        await db.auctions.insert_one(auction.dict(by_alias=True, exclude={"id"}))
+    auctions = []
+    for n, auction_data in enumerate(sample_auctions, start=1):
+        auction = Auction(auction_id=f"muestra-{n}", **auction_data)
+        if not await insert_seed_auction(auction):
+            return
+        auctions.append(auction)
 
     # Sample auction items
     sample_items = [
@@ -271,12 +1093,14 @@ async def init_sample_data():
         }
     ]
 
-    auctions = await db.auctions.find().to_list(10)
     for i, item_data in enumerate(sample_items):
         if i < len(auctions):
-            item_data["auction_id"] = auctions[i]["auction_id"]
+            item_data["auction_id"] = auctions[i].auction_id
+            item_data["auction_status"] = auctions[i].status
+            item_data["lot_order"] = 1
+            item_data["images"] = await store_image_refs(item_data["images"])
             item = AuctionItem(**item_data)
-            await db.auction_items.insert_one(item.dict(by_alias=True, exclude={"id"}))
+            await repos.items.insert(item.dict(by_alias=True, exclude={"id"}))
 
 async def seed_custom_auctions():
     """
@@ -285,30 +1109,28 @@ async def seed_custom_auctions():
     """
     # Subasta: Gran Subasta Multimarcas (Webcast) - Jueves 9 de octubre de 2025, termina viernes
     multimarcas_id = "multimarcas-2025-10-09"
-    existing_multimarcas = await db.auctions.find_one({"auction_id": multimarcas_id})
-    if not existing_multimarcas:
-        multimarcas_auction = Auction(
-            auction_id=multimarcas_id,
-            title="Gran Subasta Multimarcas",
-            description=(
-                "Webcast | Motocicletas · Automóviles · Rines · Refacciones · Camionetas · "
-                "Tractocamiones · Camiones · Cajas Secas · Equipo de Minería · Equipo de Construcción · "
-                "Maquinaría Amarilla y mucho más. Inspecciones disponibles: Del 6 al 8 de octubre."
-            ),
-            reason="renovacion_flotilla",
-            company_name="Hilco Global México",
-            start_date=datetime(2025, 10, 9, 11, 0),
-            end_date=datetime(2025, 10, 10, 18, 0),
-            status="proxima",
-            location="Vía webcast",
-            state="Jalisco",
-            total_items=0,
-            registration_fee=500.0,
-        )
-        await db.auctions.insert_one(multimarcas_auction.dict(by_alias=True, exclude={"id"}))
-
+    multimarcas_auction = Auction(
+        auction_id=multimarcas_id,
+        title="Gran Subasta Multimarcas",
+        description=(
+            "Webcast | Motocicletas · Automóviles · Rines · Refacciones · Camionetas · "
+            "Tractocamiones · Camiones · Cajas Secas · Equipo de Minería · Equipo de Construcción · "
+            "Maquinaría Amarilla y mucho más. Inspecciones disponibles: Del 6 al 8 de octubre."
+        ),
+        reason="renovacion_flotilla",
+        company_name="Hilco Global México",
+        start_date=datetime(2025, 10, 9, 11, 0),
+        end_date=datetime(2025, 10, 10, 18, 0),
+        status="proxima",
+        location="Vía webcast",
+        state="Jalisco",
+        total_items=0,
+        registration_fee=500.0,
+    )
+    if await insert_seed_auction(multimarcas_auction):
         # Lotes Nissan Tsuru
         base64_placeholder = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+        placeholder_ref = await image_store.put(base64.b64decode(base64_placeholder))
         multimarcas_items = [
             {
                 "name": "Nissan Tsuru | 2012",
@@ -321,7 +1143,7 @@ async def seed_custom_auctions():
                 "starting_price": 30000.0,
                 "current_bid": 30000.0,
                 "estimated_value": {"min": 28000, "max": 35000},
-                "images": [base64_placeholder],
+                "images": [placeholder_ref],
                 "condition": "bueno",
                 "mileage": None,
                 "specifications": {"estado_lote": "VENDIDO", "numero_lote": "11"},
@@ -339,7 +1161,7 @@ async def seed_custom_auctions():
                 "starting_price": 35000.0,
                 "current_bid": 35000.0,
                 "estimated_value": {"min": 32000, "max": 38000},
-                "images": [base64_placeholder],
+                "images": [placeholder_ref],
                 "condition": "bueno",
                 "mileage": None,
                 "specifications": {"estado_lote": "VENDIDO", "numero_lote": "11A"},
@@ -357,7 +1179,7 @@ async def seed_custom_auctions():
                 "starting_price": 40000.0,
                 "current_bid": 40000.0,
                 "estimated_value": {"min": 38000, "max": 45000},
-                "images": [base64_placeholder],
+                "images": [placeholder_ref],
                 "condition": "bueno",
                 "mileage": None,
                 "specifications": {"estado_lote": "VENDIDO", "numero_lote": "12"},
@@ -375,7 +1197,7 @@ async def seed_custom_auctions():
                 "starting_price": 35000.0,
                 "current_bid": 35000.0,
                 "estimated_value": {"min": 32000, "max": 38000},
-                "images": [base64_placeholder],
+                "images": [placeholder_ref],
                 "condition": "bueno",
                 "mileage": None,
                 "specifications": {"estado_lote": "VENDIDO", "numero_lote": "13"},
@@ -393,7 +1215,7 @@ async def seed_custom_auctions():
                 "starting_price": 40000.0,
                 "current_bid": 40000.0,
                 "estimated_value": {"min": 38000, "max": 45000},
-                "images": [base64_placeholder],
+                "images": [placeholder_ref],
                 "condition": "bueno",
                 "mileage": None,
                 "specifications": {"estado_lote": "VENDIDO", "numero_lote": "14"},
@@ -411,7 +1233,7 @@ async def seed_custom_auctions():
                 "starting_price": 45000.0,
                 "current_bid": 45000.0,
                 "estimated_value": {"min": 43000, "max": 50000},
-                "images": [base64_placeholder],
+                "images": [placeholder_ref],
                 "condition": "bueno",
                 "mileage": None,
                 "specifications": {"estado_lote": "VENDIDO", "numero_lote": "15"},
@@ -429,7 +1251,7 @@ async def seed_custom_auctions():
                 "starting_price": 30000.0,
                 "current_bid": 30000.0,
                 "estimated_value": {"min": 28000, "max": 35000},
-                "images": [base64_placeholder],
+                "images": [placeholder_ref],
                 "condition": "bueno",
                 "mileage": None,
                 "specifications": {"estado_lote": "VENDIDO", "numero_lote": "16"},
@@ -438,34 +1260,34 @@ async def seed_custom_auctions():
             },
         ]
 
-        for item in multimarcas_items:
-            await db.auction_items.insert_one(AuctionItem(**item).dict(by_alias=True, exclude={"id"}))
-        await db.auctions.update_one({"auction_id": multimarcas_id}, {"$set": {"total_items": len(multimarcas_items)}})
+        for lot_order, item in enumerate(multimarcas_items, start=1):
+            item["auction_status"] = multimarcas_auction.status
+            item["lot_order"] = lot_order
+            await repos.items.insert(AuctionItem(**item).dict(by_alias=True, exclude={"id"}))
+        await repos.auctions.set_fields(multimarcas_id, {"total_items": len(multimarcas_items)})
 
     # Subasta: Cierre de Planta Pacific Aquaculture - Jueves 16 de octubre de 2025 11:00 hrs
     pacific_id = "pacific-aquaculture-2025-10-16"
-    existing_pacific = await db.auctions.find_one({"auction_id": pacific_id})
-    if not existing_pacific:
-        pacific_auction = Auction(
-            auction_id=pacific_id,
-            title="Gran Subasta por Cierre de Planta Pacific Aquaculture",
-            description=(
-                "Presencial y por Internet | City Express Plus Ensenada. "
-                "Inspecciones disponibles: Del 13 al 15 de octubre."
-            ),
-            reason="cierre_empresa",
-            company_name="Pacific Aquaculture",
-            start_date=datetime(2025, 10, 16, 11, 0),
-            end_date=datetime(2025, 10, 16, 18, 0),
-            status="proxima",
-            location="City Express Plus Ensenada",
-            state="Baja California",
-            total_items=0,
-            registration_fee=300.0,
-        )
-        await db.auctions.insert_one(pacific_auction.dict(by_alias=True, exclude={"id"}))
-
+    pacific_auction = Auction(
+        auction_id=pacific_id,
+        title="Gran Subasta por Cierre de Planta Pacific Aquaculture",
+        description=(
+            "Presencial y por Internet | City Express Plus Ensenada. "
+            "Inspecciones disponibles: Del 13 al 15 de octubre."
+        ),
+        reason="cierre_empresa",
+        company_name="Pacific Aquaculture",
+        start_date=datetime(2025, 10, 16, 11, 0),
+        end_date=datetime(2025, 10, 16, 18, 0),
+        status="proxima",
+        location="City Express Plus Ensenada",
+        state="Baja California",
+        total_items=0,
+        registration_fee=300.0,
+    )
+    if await insert_seed_auction(pacific_auction):
         base64_placeholder = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+        placeholder_ref = await image_store.put(base64.b64decode(base64_placeholder))
         pacific_items = [
             {
                 "name": "Lote De Herramientas Manuales",
@@ -478,7 +1300,7 @@ async def seed_custom_auctions():
                 "starting_price": 1.0,
                 "current_bid": 1.0,
                 "estimated_value": {"min": 1000, "max": 3000},
-                "images": [base64_placeholder],
+                "images": [placeholder_ref],
                 "condition": "bueno",
                 "mileage": None,
                 "specifications": {"precio_reservado": True, "numero_lote": "Lote 2"},
@@ -496,7 +1318,7 @@ async def seed_custom_auctions():
                 "starting_price": 1.0,
                 "current_bid": 1.0,
                 "estimated_value": {"min": 3000, "max": 8000},
-                "images": [base64_placeholder],
+                "images": [placeholder_ref],
                 "condition": "bueno",
                 "mileage": None,
                 "specifications": {"precio_reservado": True, "numero_lote": "Lote 4"},
@@ -514,7 +1336,7 @@ async def seed_custom_auctions():
                 "starting_price": 1.0,
                 "current_bid": 1.0,
                 "estimated_value": {"min": 2500, "max": 7000},
-                "images": [base64_placeholder],
+                "images": [placeholder_ref],
                 "condition": "bueno",
                 "mileage": None,
                 "specifications": {"precio_reservado": True, "numero_lote": "Lote 5"},
@@ -532,7 +1354,7 @@ async def seed_custom_auctions():
                 "starting_price": 1.0,
                 "current_bid": 1.0,
                 "estimated_value": {"min": 8000, "max": 15000},
-                "images": [base64_placeholder],
+                "images": [placeholder_ref],
                 "condition": "bueno",
                 "mileage": None,
                 "specifications": {"precio_reservado": True, "numero_lote": "SLote 6"},
@@ -550,7 +1372,7 @@ async def seed_custom_auctions():
                 "starting_price": 1.0,
                 "current_bid": 1.0,
                 "estimated_value": {"min": 2000, "max": 6000},
-                "images": [base64_placeholder],
+                "images": [placeholder_ref],
                 "condition": "bueno",
                 "mileage": None,
                 "specifications": {"precio_reservado": True, "numero_lote": "LLote 7"},
@@ -568,7 +1390,7 @@ async def seed_custom_auctions():
                 "starting_price": 1.0,
                 "current_bid": 1.0,
                 "estimated_value": {"min": 4000, "max": 9000},
-                "images": [base64_placeholder],
+                "images": [placeholder_ref],
                 "condition": "bueno",
                 "mileage": None,
                 "specifications": {"precio_reservado": True, "numero_lote": "SLote 8"},
@@ -586,7 +1408,7 @@ async def seed_custom_auctions():
                 "starting_price": 1.0,
                 "current_bid": 1.0,
                 "estimated_value": {"min": 1200, "max": 3500},
-                "images": [base64_placeholder],
+                "images": [placeholder_ref],
                 "condition": "bueno",
                 "mileage": None,
                 "specifications": {"precio_reservado": True, "numero_lote": "LLote 9"},
@@ -595,20 +1417,22 @@ async def seed_custom_auctions():
             },
         ]
 
-        for item in pacific_items:
-            await db.auction_items.insert_one(AuctionItem(**item).dict(by_alias=True, exclude={"id"}))
-        await db.auctions.update_one({"auction_id": pacific_id}, {"$set": {"total_items": len(pacific_items)}})
+        for lot_order, item in enumerate(pacific_items, start=1):
+            item["auction_status"] = pacific_auction.status
+            item["lot_order"] = lot_order
+            await repos.items.insert(AuctionItem(**item).dict(by_alias=True, exclude={"id"}))
+        await repos.auctions.set_fields(pacific_id, {"total_items": len(pacific_items)})
 
 # Auth endpoints
 @api_router.post("/auth/register", response_model=Token)
 async def register_user(user_data: UserRegister):
     # Check if user exists
-    existing_user = await db.users.find_one({"email": user_data.email})
+    existing_user = await repos.users.get_by_email(user_data.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create new user
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await run_password_hasher(hash_password, user_data.password)
     user = User(
         email=user_data.email,
         full_name=user_data.full_name,
@@ -617,132 +1441,452 @@ async def register_user(user_data: UserRegister):
         password_hash=hashed_password
     )
     
-    await db.users.insert_one(user.dict(by_alias=True, exclude={"id"}))
+    try:
+        await repos.users.insert(user.dict(by_alias=True, exclude={"id"}))
+    except DuplicateKeyError:
+        # A concurrent registration with the same email won the unique index.
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create access token
-    access_token = create_access_token(data={"sub": user.user_id})
+    access_token = create_user_token(user.user_id, user.email, user.full_name)
     return {"access_token": access_token, "token_type": "bearer"}
 
 @api_router.post("/auth/login", response_model=Token)
 async def login_user(user_credentials: UserLogin):
-    user = await db.users.find_one({"email": user_credentials.email})
-    if not user or not verify_password(user_credentials.password, user["password_hash"]):
+    user = await repos.users.get_by_email(user_credentials.email)
+    if not user or not await run_password_hasher(verify_password, user_credentials.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Incorrect email or password")
-    
-    access_token = create_access_token(data={"sub": user["user_id"]})
+
+    if password_needs_rehash(user["password_hash"]):
+        new_hash = await run_password_hasher(hash_password, user_credentials.password)
+        await repos.users.replace_password_hash(user["user_id"], user["password_hash"], new_hash)
+        invalidate_user(user["user_id"])
+
+    access_token = create_user_token(user["user_id"], user["email"], user["full_name"])
     return {"access_token": access_token, "token_type": "bearer"}
 
 # Auction endpoints
 @api_router.get("/auctions", response_model=List[Auction])
-async def get_auctions():
-    auctions = await db.auctions.find().sort("start_date", 1).to_list(100)
-    # Convert ObjectId to string
-    for auction in auctions:
-        if "_id" in auction:
-            auction["_id"] = str(auction["_id"])
-    return [Auction(**auction) for auction in auctions]
+async def get_auctions(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    projection: dict = Depends(auction_fields),
+):
+    async def build(response: Response):
+        auctions = await repos.auctions.page(auctions_cursor(cursor), limit + 1, projection)
+        return finish_page(auctions, AUCTIONS_SORT, limit, response)
+    return await cached_json(request, ["auctions"], build)
 
 @api_router.get("/auctions/{auction_id}", response_model=Auction)
-async def get_auction_detail(auction_id: str):
-    auction = await db.auctions.find_one({"auction_id": auction_id})
-    if not auction:
-        raise HTTPException(status_code=404, detail="Auction not found")
-    if "_id" in auction:
-        auction["_id"] = str(auction["_id"])
-    return Auction(**auction)
+async def get_auction_detail(auction_id: str, request: Request, projection: dict = Depends(auction_fields)):
+    async def build(response: Response):
+        auction = await repos.auctions.get(auction_id, projection)
+        if not auction:
+            raise HTTPException(status_code=404, detail="Auction not found")
+        return auction
+    return await cached_json(request, [f"auction:{auction_id}"], build)
 
 @api_router.get("/auctions/{auction_id}/items", response_model=List[AuctionItem])
-async def get_auction_items(auction_id: str):
-    items = await db.auction_items.find({"auction_id": auction_id}).to_list(100)
-    # Convert ObjectId to string
-    for item in items:
-        if "_id" in item:
-            item["_id"] = str(item["_id"])
-    return [AuctionItem(**item) for item in items]
+async def get_auction_items(
+    auction_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    projection: dict = Depends(item_fields),
+):
+    async def build(response: Response):
+        items = await repos.items.page(auction_id, items_cursor(cursor), limit + 1, projection)
+        return finish_page(items, ITEMS_SORT, limit, response)
+    return await cached_json(request, [f"items:{auction_id}"], build)
 
 @api_router.get("/items/{item_id}", response_model=AuctionItem)
-async def get_item_detail(item_id: str):
-    item = await db.auction_items.find_one({"item_id": item_id})
+async def get_item_detail(item_id: str, request: Request, projection: dict = Depends(item_fields)):
+    async def build(response: Response):
+        item = await repos.items.get(item_id, projection)
+        if not item:
+            raise HTTPException(status_code=404, detail="Item not found")
+        return item
+    return await cached_json(request, [f"item:{item_id}"], build)
+
+@api_router.get("/auctions/{auction_id}/full", response_model=AuctionWithItems)
+async def get_auction_with_items(
+    auction_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    projection: dict = Depends(item_fields),
+):
+    """The auction and the first page of its lots in one round trip; fields/view shape the lots."""
+    async def build(response: Response):
+        auction, items = await asyncio.gather(
+            repos.auctions.get(auction_id, AUCTION_PROJECTION),
+            repos.items.page(auction_id, None, limit + 1, projection),
+        )
+        if not auction:
+            raise HTTPException(status_code=404, detail="Auction not found")
+        items = finish_page(items, ITEMS_SORT, limit, response)
+        return {"auction": auction, "items": items, "next_cursor": response.headers.get("x-next-cursor")}
+    return await cached_json(request, [f"auction:{auction_id}", f"items:{auction_id}"], build)
+
+@api_router.get("/items", response_model=List[AuctionItem])
+async def get_items(
+    request: Request,
+    ids: str = Query(..., description="Comma-separated item_ids"),
+    projection: dict = Depends(item_fields),
+):
+    """Several lots in one query, in the order asked for; unknown ids are left out."""
+    item_ids = list(dict.fromkeys(item_id for item_id in ids.split(",") if item_id))
+    if not item_ids:
+        raise HTTPException(status_code=400, detail="No item ids")
+    if len(item_ids) > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PAGE_SIZE} item ids")
+
+    async def build(response: Response):
+        items = {item["item_id"]: item for item in await repos.items.find_many(item_ids, projection)}
+        return [items[item_id] for item_id in item_ids if item_id in items]
+    return await cached_json(request, [f"item:{item_id}" for item_id in item_ids], build)
+
+# Registration endpoints
+@api_router.post("/auctions/{auction_id}/register", response_model=Registration, status_code=201)
+async def register_for_auction(auction_id: str, response: Response, current_user: User = Depends(get_current_user)):
+    """Register the caller as a bidder; registering again returns the existing registration with 200."""
+    auction = await repos.auctions.get(auction_id, {"status": 1})
+    if not auction:
+        raise HTTPException(status_code=404, detail="Auction not found")
+    if auction["status"] == "finalizada":
+        raise HTTPException(status_code=409, detail="Auction has ended")
+
+    # Only the call that creates the registration goes on, so the counter is incremented once
+    # however often or concurrently it is sent.
+    registration = Registration(auction_id=auction_id, user_id=current_user.user_id)
+    if not await repos.registrations.add(auction_id, current_user.user_id, registration.created_at):
+        response.status_code = status.HTTP_200_OK
+        return Registration(**await repos.registrations.get(auction_id, current_user.user_id))
+
+    await repos.auctions.increment(auction_id, "registered_count")
+    await repos.users.add_registered_auction(current_user.user_id, auction_id)
+    invalidate_user(current_user.user_id)
+    auction_changed(auction_id)
+    return registration
+
+# Bidding endpoints
+@api_router.post("/items/{item_id}/bids", response_model=Bid, response_model_exclude={"id"}, status_code=201)
+async def place_bid(item_id: str, bid_data: BidCreate, current_user: User = Depends(get_current_user)):
+    # The price check and the write are one atomic step in the repository, so concurrent
+    # bidders on the same lot never need a read-modify-write cycle or a lock.
+    item = await repos.items.place_bid(item_id, current_user.user_id, bid_data.amount)
+    if item is None:
+        await raise_bid_rejection(item_id, bid_data.amount)
+    bid = await bid_accepted(item_id, item["auction_id"], current_user.user_id, bid_data.amount, item["bid_count"])
+    # Proxies above this bid answer it right away, in one write.
+    await resolve_proxy_bids(item_id)
+    return bid
+
+@api_router.post("/items/{item_id}/proxy-bids", response_model=ProxyBidStatus, status_code=201)
+async def place_proxy_bid(item_id: str, proxy_data: ProxyBidCreate, current_user: User = Depends(get_current_user)):
+    """Leave a maximum: the server outbids others for the caller, one increment at a time, up to it."""
+    item = await repos.items.get(item_id, {"current_bid": 1, "bid_count": 1, "starting_price": 1, "auction_status": 1})
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-    if "_id" in item:
-        item["_id"] = str(item["_id"])
-    return AuctionItem(**item)
+    if item.get("auction_status") != "activa":
+        raise HTTPException(status_code=409, detail="Auction is not active")
+    minimum = min_next_bid(item["current_bid"], item.get("bid_count", 0), item.get("starting_price"))
+    if proxy_data.max_amount < minimum:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Maximum bid must be at least {minimum:.2f}",
+            headers={"X-Current-Bid": str(item["current_bid"]), "X-Min-Next-Bid": str(minimum)},
+        )
+
+    max_amount = await proxy_bids.set_ceiling(item_id, current_user.user_id, proxy_data.max_amount)
+    await resolve_proxy_bids(item_id)
+    item = await repos.items.get(item_id, {"current_bid": 1, "high_bidder_id": 1})
+    return ProxyBidStatus(
+        item_id=item_id,
+        max_amount=max_amount,
+        current_bid=item["current_bid"],
+        winning=item.get("high_bidder_id") == current_user.user_id,
+    )
+
+async def raise_bid_rejection(item_id: str, amount: float):
+    # Only rejected bids pay for this extra read, to explain why the update did not match.
+    item = await repos.items.get(item_id, {"current_bid": 1, "bid_count": 1, "starting_price": 1, "auction_status": 1})
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    if item.get("auction_status") != "activa":
+        raise HTTPException(status_code=409, detail="Auction is not active")
+    minimum = min_next_bid(item["current_bid"], item.get("bid_count", 0), item.get("starting_price"))
+    raise HTTPException(
+        status_code=409,
+        detail=f"Bid must be at least {minimum:.2f}",
+        headers={"X-Current-Bid": str(item["current_bid"]), "X-Min-Next-Bid": str(minimum)},
+    )
+
+# Live bids endpoint
+async def wait_for_disconnect(websocket: WebSocket, subscriber):
+    # Listeners never send anything; reading only lets us notice a closed socket while idle.
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+    subscriber.drop()
+
+@api_router.websocket("/auctions/{auction_id}/live")
+async def auction_live_bids(websocket: WebSocket, auction_id: str):
+    await websocket.accept()
+    subscriber = bid_hub.subscribe(auction_id)
+    disconnect = asyncio.create_task(wait_for_disconnect(websocket, subscriber))
+    try:
+        while True:
+            message = await subscriber.get()
+            if message is None:
+                if not disconnect.done():
+                    # Dropped for falling behind: the client reconnects and refetches the items.
+                    await websocket.close(code=1013)
+                return
+            await websocket.send_text(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnect.cancel()
+        bid_hub.unsubscribe(auction_id, subscriber)
 
 # Search endpoints
-@api_router.get("/search/auctions")
+@api_router.get("/search/auctions", response_model=List[AuctionSearchResult])
 async def search_auctions(
+    response: Response,
     category: Optional[str] = None,
     state: Optional[str] = None,
     status: Optional[str] = None,
     min_price: Optional[float] = None,
-    max_price: Optional[float] = None
+    max_price: Optional[float] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    projection: dict = Depends(search_result_fields),
 ):
-    query = {}
-    
-    if category:
-        # Search in auction items and get auction_ids
-        item_query = {"category": category}
-        if min_price or max_price:
-            price_filter = {}
-            if min_price:
-                price_filter["$gte"] = min_price
-            if max_price:
-                price_filter["$lte"] = max_price
-            item_query["starting_price"] = price_filter
-        
-        items = await db.auction_items.find(item_query, {"auction_id": 1}).to_list(1000)
-        auction_ids = list(set([item["auction_id"] for item in items]))
-        query["auction_id"] = {"$in": auction_ids}
-    
+    auction_match = {}
     if state:
-        query["state"] = state
+        auction_match["state"] = state
     if status:
-        query["status"] = status
-    
-    auctions = await db.auctions.find(query).to_list(100)
-    return [Auction(**auction) for auction in auctions]
-
-# Public endpoints for auctions
-@api_router.get("/auctions")
-async def get_public_auctions():
-    auctions = await db.auctions.find({}).to_list(100)
-    return [Auction(**auction) for auction in auctions]
-
-@api_router.get("/auctions/{auction_id}")
-async def get_auction_detail(auction_id: str):
-    auction = await db.auctions.find_one({"auction_id": auction_id})
+        auction_match["status"] = status
+
+    item_match = search_item_match(category, min_price, max_price)
+    auctions = await repos.search.auctions(item_match, auction_match, auctions_cursor(cursor), limit + 1, projection)
+    return json_response(finish_page(auctions, AUCTIONS_SORT, limit, response), response)
+
+@api_router.get("/search/items", response_model=ItemSearchResponse)
+async def search_items(
+    q: str = Query(..., min_length=1),
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    condition: Optional[str] = None,
+    state: Optional[str] = None,
+    year: Optional[str] = Query(None, description="5-year range, e.g. 2020-2024"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    projection: dict = Depends(item_fields),
+):
+    if item_search_index is None:
+        raise HTTPException(status_code=503, detail="Search index is warming up")
+    filters = dict(category=category, subcategory=subcategory, condition=condition, state=state, year=year)
+    filters = {facet: value for facet, value in filters.items() if facet in FACETS and value}
+    total, hits, facets = item_search_index.search(q, filters, limit, offset)
+
+    # One round trip for the page of lots, reordered by score.
+    item_ids = [item_id for item_id, _ in hits]
+    items = {item["item_id"]: item for item in await repos.items.find_many(item_ids, projection)}
+    return json_response({
+        "total": total,
+        "hits": [{"score": score, "item": items[item_id]} for item_id, score in hits if item_id in items],
+        "facets": facets,
+    })
+
+# Image endpoints
+@api_router.post("/images", status_code=201, dependencies=[Depends(require_mongo)])
+async def upload_image(file: UploadFile, principal: Principal = Depends(get_current_principal)):
+    data = await file.read(IMAGE_MAX_UPLOAD_BYTES + 1)
+    if len(data) > IMAGE_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large")
+    content_type = sniff_content_type(data)
+    if not content_type.startswith("image/"):
+        raise HTTPException(status_code=415, detail="Unsupported image format")
+    digest = await image_store.put(data, content_type)
+    try:
+        await image_pipeline.enqueue(digest, IMAGE_ENQUEUE_TIMEOUT)
+    except QueueFull:
+        # The original is stored; its variants would still render on first request, but
+        # telling the client to slow down keeps a bulk upload from outrunning the workers.
+        raise HTTPException(status_code=503, detail="Image queue is full", headers={"Retry-After": "5"})
+    return {"image": digest}
+
+@api_router.get("/images/{digest}")
+async def get_image(
+    digest: str,
+    request: Request,
+    size: Optional[str] = Query(None, description=f"One of: {', '.join(SIZES)}"),
+    format: Optional[str] = Query(None, description=f"One of: {', '.join(FORMATS)}"),
+):
+    if not is_image_ref(digest):
+        raise HTTPException(status_code=404, detail="Image not found")
+    if size or format:
+        require_mongo()  # derivatives are recorded in image_variants
+        if size and size not in SIZES or format and format not in FORMATS:
+            raise HTTPException(status_code=400, detail="Unknown image size or format")
+        try:
+            digest = await image_pipeline.variant(digest, size or "full", format or "jpeg")
+        except RenderError:
+            raise HTTPException(status_code=415, detail="Image cannot be resized")
+        if digest is None:
+            raise HTTPException(status_code=404, detail="Image not found")
+    return await serve_image(digest, request)
+
+async def serve_image(digest: str, request: Request) -> Response:
+    grid_out = await image_store.open(digest)
+    if grid_out is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    size = grid_out.length
+    start, end, status_code = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    media_type = (grid_out.metadata or {}).get("content_type", "application/octet-stream")
+    return StreamingResponse(
+        image_store.iter_range(grid_out, start, end - start + 1),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers,
+    )
+
+# Admin endpoints
+@api_router.post("/admin/import", dependencies=[Depends(require_mongo)])
+async def import_catalog(
+    auctions: Optional[UploadFile] = None,
+    items: Optional[UploadFile] = None,
+    admin: User = Depends(get_admin_user),
+):
+    """Upsert auctions and lots from .csv/.jsonl files; see catalog_import.py for the format."""
+    if auctions is None and items is None:
+        raise HTTPException(status_code=400, detail="Send an auctions file, an items file or both")
+
+    def text(upload: Optional[UploadFile]):
+        return io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="") if upload else None
+
+    importer = CatalogImporter(db, Auction, AuctionItem)
+    try:
+        report = await import_files(
+            importer,
+            text(auctions), auctions.filename if auctions else "",
+            text(items), items.filename if items else "",
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    response_cache.invalidate_all()
+    lifecycle.notify()
+    # Changes to re-imported auctions also change their lots' search facets.
+    await reindex_auctions(sorted(importer.touched_auctions))
+    return report
+
+@api_router.post("/admin/auctions/{auction_id}/settlement", dependencies=[Depends(require_mongo)])
+async def settle_auction(auction_id: str, admin: User = Depends(get_admin_user)):
+    """Settle an ended auction now instead of waiting for the scheduler; returns its summary."""
+    auction = await repos.auctions.get(auction_id, {"status": 1})
     if not auction:
         raise HTTPException(status_code=404, detail="Auction not found")
-    return Auction(**auction)
+    if auction["status"] != "finalizada":
+        raise HTTPException(status_code=409, detail="Auction has not ended")
+    summary = await settlement.settle(auction_id)
+    if summary is None:
+        raise HTTPException(status_code=409, detail="Auction is already settled or being settled")
+    return json_response(summary)
 
-@api_router.get("/auctions/{auction_id}/items")
-async def get_auction_items(auction_id: str):
-    items = await db.auction_items.find({"auction_id": auction_id}).to_list(1000)
-    if not items:
-        return []
-    return [AuctionItem(**item) for item in items]
+@api_router.get("/admin/auctions/{auction_id}/settlement", dependencies=[Depends(require_mongo)])
+async def get_auction_settlement(auction_id: str, admin: User = Depends(get_admin_user)):
+    auction = await repos.auctions.get(auction_id, {"_id": 0, "auction_id": 1, "settlement": 1})
+    if not auction:
+        raise HTTPException(status_code=404, detail="Auction not found")
+    if "settlement" not in auction:
+        raise HTTPException(status_code=404, detail="Auction is not settled")
+    return json_response(auction["settlement"])
+
+if QUERY_PROFILER_ENABLED:
+    @api_router.get("/admin/query-profiles")
+    async def list_query_profiles(admin: User = Depends(get_admin_user)):
+        """Summaries of the last profiled requests, newest first."""
+        return Response(json_util.dumps(query_profiler.recent()), media_type="application/json")
+
+    @api_router.get("/admin/query-profiles/{profile_id}")
+    async def get_query_profile(profile_id: str, admin: User = Depends(get_admin_user)):
+        """Every command of one request (the id is its X-Query-Profile header), with explains."""
+        profile = query_profiler.profiles.get(profile_id)
+        if profile is None:
+            raise HTTPException(status_code=404, detail="Query profile not found")
+        return Response(json_util.dumps(profile.as_dict()), media_type="application/json")
 
 # User profile endpoints
 @api_router.get("/user/profile", response_model=User)
 async def get_user_profile(current_user: User = Depends(get_current_user)):
     return current_user
 
-@api_router.get("/user/auctions")
-async def get_user_auctions(current_user: User = Depends(get_current_user)):
-    user_auction_ids = current_user.registered_auctions
-    auctions = await db.auctions.find({"auction_id": {"$in": user_auction_ids}}).to_list(100)
-    return [Auction(**auction) for auction in auctions]
+@api_router.get("/user/auctions", response_model=List[Auction])
+async def get_user_auctions(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_principal),
+    projection: dict = Depends(auction_fields),
+):
+    """Auctions the caller registered for, in registration order, paged like the catalog."""
+    registrations = await repos.registrations.page_for_user(current_user.user_id, registrations_cursor(cursor), limit + 1)
+    registrations = finish_page(registrations, REGISTRATIONS_SORT, limit, response)
+    auction_ids = [registration["auction_id"] for registration in registrations]
+    auctions = {auction["auction_id"]: auction for auction in await repos.auctions.find_many(auction_ids, projection)}
+    return json_response([auctions[auction_id] for auction_id in auction_ids if auction_id in auctions], response)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Inside admission control: rejected requests never reach routing, so they would have no route
+# to be labelled with; admission_rejections counts them instead.
+app.add_middleware(MetricsMiddleware, enabled=METRICS_ENABLED)
+
+# Metrics waits on this middleware's send, so request latency includes the compression time.
+app.add_middleware(CompressionMiddleware, compressor=compressor, enabled=COMPRESSION_ENABLED)
+
+# Added before CORS so CORS wraps it and browsers can read the Retry-After of a 429.
+app.add_middleware(
+    AdmissionControl,
+    rules=ADMISSION_RULES,
+    enabled=RATE_LIMIT_ENABLED,
+    trusted_proxies=RATE_LIMIT_TRUSTED_PROXIES,
+)
+
+app.add_middleware(
+    QueryProfilerMiddleware,
+    profiler=query_profiler,
+    client=client,
+    enabled=QUERY_PROFILER_ENABLED,
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Content-Range", "Retry-After", "X-Query-Profile", "Server-Timing"],
 )
 
 # Configure logging
@@ -754,9 +1898,24 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup_event():
+    await check_live_bids_source()
+    if REPOSITORY_ENGINE == "mongo":
+        await ensure_indexes()
     await init_sample_data()
     await seed_custom_auctions()
+    await sync_item_auction_status()
+    if REPOSITORY_ENGINE == "mongo":
+        await lifecycle.start()
+        settlement.start()
+        await migrate_inline_images()
+        image_pipeline.start()
+    app.state.search_index_build = asyncio.create_task(build_item_search_index())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await lifecycle.stop()
+    await settlement.stop()
+    await image_pipeline.stop()
+    password_executor.shutdown(wait=False)
+    compression_executor.shutdown(wait=False)
     client.close()
\ No newline at end of file
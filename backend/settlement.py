@@ -0,0 +1,189 @@
+"""
+Settlement of ended auctions: the result of every lot and a summary per auction.
+
+A lot's item document already holds what settlement needs: current_bid and high_bidder_id are
+written by the same conditional update that accepts a bid, and no bid can land once the lot's
+auction_status left "activa". So one aggregation over the auction's lots resolves them all,
+with no per-lot queries against the bid log:
+
+- sin_pujas: bid_count is 0;
+- reserva_no_alcanzada: specifications.precio_reservado is an amount above the last bid;
+- sujeto_a_aprobacion: precio_reservado is true, a reserve whose amount was never published,
+  so the seller has to accept the last bid;
+- vendido: otherwise, at hammer_price = current_bid to high_bidder_id.
+
+Results stream from the cursor into unordered bulk_write batches that set each lot's
+settlement field; the summary is accumulated on the way and stored as the auction's settlement.
+
+Before starting, a worker claims the auction with a conditional update, so with several API
+workers each ended auction is settled once. A claim left behind by a worker that died half-way
+expires after claim_timeout seconds and the auction is settled again from scratch; rewriting a
+lot's result is idempotent. settle_pending() looks for such auctions at startup and then every
+retry_interval seconds, so a failed settlement is retried without waiting for a restart.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from pymongo import ReturnDocument, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+CLAIM_TIMEOUT = 600.0
+RETRY_INTERVAL = 300.0
+
+RESULTS = ("vendido", "sujeto_a_aprobacion", "reserva_no_alcanzada", "sin_pujas")
+
+
+def lot_results_pipeline(auction_id: str) -> List[dict]:
+    bid_count = {"$ifNull": ["$bid_count", 0]}
+    has_bids = {"$gt": [bid_count, 0]}
+    reserve = "$specifications.precio_reservado"
+    return [
+        {"$match": {"auction_id": auction_id}},
+        {"$project": {
+            "_id": 0,
+            "item_id": 1,
+            "result": {"$switch": {
+                "branches": [
+                    {"case": {"$lte": [bid_count, 0]}, "then": "sin_pujas"},
+                    {"case": {"$and": [{"$isNumber": reserve}, {"$lt": ["$current_bid", reserve]}]},
+                     "then": "reserva_no_alcanzada"},
+                    {"case": {"$eq": [reserve, True]}, "then": "sujeto_a_aprobacion"},
+                ],
+                "default": "vendido",
+            }},
+            "high_bid": {"$cond": [has_bids, "$current_bid", None]},
+            "high_bidder_id": {"$cond": [has_bids, {"$ifNull": ["$high_bidder_id", None]}, None]},
+        }},
+        {"$addFields": {"hammer_price": {"$cond": [{"$eq": ["$result", "vendido"]}, "$high_bid", None]}}},
+    ]
+
+
+class SettlementSummary:
+    def __init__(self):
+        self.counts: Dict[str, int] = dict.fromkeys(RESULTS, 0)
+        self.hammer_total = 0.0
+        self.bidders: Set[str] = set()
+
+    def add(self, lot: dict):
+        self.counts[lot["result"]] += 1
+        if lot["hammer_price"] is not None:
+            self.hammer_total += lot["hammer_price"]
+        if lot["high_bidder_id"]:
+            self.bidders.add(lot["high_bidder_id"])
+
+    def as_dict(self) -> dict:
+        return {
+            "lots": sum(self.counts.values()),
+            **self.counts,
+            "hammer_total": self.hammer_total,
+            "winning_bidders": len(self.bidders),
+        }
+
+
+class SettlementEngine:
+    def __init__(self, db, batch_size: int = BATCH_SIZE, claim_timeout: float = CLAIM_TIMEOUT,
+                 retry_interval: float = RETRY_INTERVAL):
+        self.db = db
+        self.batch_size = batch_size
+        self.claim_timeout = claim_timeout
+        self.retry_interval = retry_interval
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def claim(self, auction_id: str, now: datetime) -> Optional[dict]:
+        """Mark an ended auction as being settled by this worker; None if it is not ours to settle."""
+        return await self.db.auctions.find_one_and_update(
+            {
+                "auction_id": auction_id,
+                "status": "finalizada",
+                "$or": [
+                    {"settlement": {"$exists": False}},
+                    {"settlement.state": "en_proceso", "settlement.started_at": {"$lt": now - timedelta(seconds=self.claim_timeout)}},
+                ],
+            },
+            {"$set": {"settlement": {"state": "en_proceso", "started_at": now}}},
+            projection={"auction_id": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def settle(self, auction_id: str) -> Optional[dict]:
+        """Settle one ended auction and return its summary, or None if it was not claimed."""
+        started_at = datetime.utcnow()
+        if await self.claim(auction_id, started_at) is None:
+            return None
+        started = time.perf_counter()
+        summary = SettlementSummary()
+        pending: Optional[asyncio.Task] = None
+        batch: List[UpdateOne] = []
+        async for lot in self.db.auction_items.aggregate(lot_results_pipeline(auction_id)):
+            summary.add(lot)
+            item_id = lot.pop("item_id")
+            lot["settled_at"] = started_at
+            batch.append(UpdateOne({"item_id": item_id}, {"$set": {"settlement": lot}}))
+            if len(batch) >= self.batch_size:
+                # Keep one write in flight while the next batch is read.
+                if pending is not None:
+                    await pending
+                pending = asyncio.create_task(self.db.auction_items.bulk_write(batch, ordered=False))
+                batch = []
+        if pending is not None:
+            await pending
+        if batch:
+            await self.db.auction_items.bulk_write(batch, ordered=False)
+
+        result = {
+            "state": "liquidada",
+            "started_at": started_at,
+            "settled_at": datetime.utcnow(),
+            "seconds": round(time.perf_counter() - started, 3),
+            **summary.as_dict(),
+        }
+        await self.db.auctions.update_one({"auction_id": auction_id}, {"$set": {"settlement": result}})
+        logger.info("Settled auction %s: %s", auction_id, summary.as_dict())
+        return result
+
+    async def settle_many(self, auction_ids: Iterable[str]):
+        for auction_id in auction_ids:
+            try:
+                await self.settle(auction_id)
+            except Exception:
+                # The claim expires, so a later settle_pending() pass retries this auction.
+                logger.exception("Settlement of auction %s failed", auction_id)
+
+    async def settle_pending(self):
+        """Settle ended auctions nobody settled, e.g. those that ended while the server was down."""
+        query = {
+            "status": "finalizada",
+            "$or": [{"settlement": {"$exists": False}}, {"settlement.state": "en_proceso"}],
+        }
+        await self.settle_many(await self.db.auctions.distinct("auction_id", query))
+
+    async def run(self):
+        while True:
+            try:
+                await self.settle_pending()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Looking for unsettled auctions failed")
+            await asyncio.sleep(self.retry_interval)
+
+    def start(self):
+        self._spawn(self.run())
+
+    def schedule(self, auction_ids: Iterable[str]):
+        """Settle in the background; for callers that cannot wait, like the lifecycle scheduler."""
+        self._spawn(self.settle_many(sorted(auction_ids)))
+
+    async def stop(self):
+        for task in list(self.tasks):
+            task.cancel()
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
@@ -0,0 +1,51 @@
+"""
+Size-bounded LRU cache whose entries also expire after a fixed time.
+
+Entries live in an OrderedDict ordered by last use, so evicting the least recently used entry
+and refreshing one on a hit are both O(1). Expired entries are dropped when read; unread ones
+age out through LRU eviction. The cache is local to one worker: writers invalidate
+their own worker's entry, and the TTL bounds how long other workers may serve the old value.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self.entries.get(key, MISSING)
+        if entry is not MISSING:
+            expires_at, value = entry
+            if expires_at > self.clock():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.entries[key]
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any):
+        self.entries[key] = (self.clock() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> Optional[Any]:
+        entry = self.entries.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self):
+        self.entries.clear()
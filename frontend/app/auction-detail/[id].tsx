@@ -47,10 +47,7 @@ export default function AuctionDetailScreen() {
 
   const loadAuctionDetail = async () => {
     try {
-      const [auctionData, itemsData] = await Promise.all([
-        auctionService.getAuctionDetail(id!),
-        auctionService.getAuctionItems(id!),
-      ]);
+      const { auction: auctionData, items: itemsData } = await auctionService.getAuctionFull(id!);
       
       setAuction(auctionData);
       setItems(itemsData);
@@ -25,6 +25,19 @@ export const setAuthToken = (token: string | null) => {
   }
 };
 
+export type ImageSize = 'thumb' | 'card' | 'full';
+export type ImageFormat = 'jpeg' | 'webp';
+
+// Images are immutable and served by hash, so the URL can be cached indefinitely.
+// Without a size the original upload is served; cards and carousels should ask for a thumbnail.
+export const imageUrl = (hash: string, size?: ImageSize, format?: ImageFormat) => {
+  const params = new URLSearchParams();
+  if (size) params.append('size', size);
+  if (format) params.append('format', format);
+  const query = params.toString();
+  return `${API_BASE_URL}/images/${hash}${query ? `?${query}` : ''}`;
+};
+
 // Types
 export interface Auction {
   auction_id: string;
@@ -38,9 +51,16 @@ export interface Auction {
   location: string;
   state: string;
   total_items: number;
+  registered_count: number;
   registration_fee: number;
 }
 
+export interface Registration {
+  auction_id: string;
+  user_id: string;
+  created_at: string;
+}
+
 export interface AuctionItem {
   item_id: string;
   name: string;
@@ -56,12 +76,32 @@ export interface AuctionItem {
     min: number;
     max: number;
   };
-  images: string[];
+  images: string[]; // content hashes, see imageUrl()
   condition: string;
   mileage?: number;
   specifications: Record<string, any>;
   location: string;
   auction_id: string;
+  auction_status?: 'proxima' | 'activa' | 'finalizada';
+  bid_count: number;
+  lot_order: number;
+}
+
+export interface Bid {
+  bid_id: string;
+  item_id: string;
+  auction_id: string;
+  user_id: string;
+  amount: number;
+  proxy: boolean;
+  created_at: string;
+}
+
+export interface ProxyBidStatus {
+  item_id: string;
+  max_amount: number;
+  current_bid: number;
+  winning: boolean;
 }
 
 export interface User {
@@ -75,6 +115,47 @@ export interface User {
   registered_auctions: string[];
 }
 
+// view=card: the fields list screens render, with only the cover image.
+export type AuctionCard = Pick<Auction, 'auction_id' | 'title' | 'start_date' | 'end_date' | 'status' | 'location' | 'state' | 'total_items'>;
+export type AuctionItemCard = Pick<
+  AuctionItem,
+  'item_id' | 'auction_id' | 'lot_order' | 'name' | 'current_bid' | 'starting_price' | 'auction_status' | 'bid_count' | 'condition' | 'year' | 'images'
+>;
+
+export interface Page<T> {
+  data: T[];
+  nextCursor: string | null;
+}
+
+export interface AuctionWithItems {
+  auction: Auction;
+  items: AuctionItem[];
+  next_cursor: string | null;
+}
+
+export interface ItemSearchResponse {
+  total: number;
+  hits: { score: number; item: AuctionItem }[];
+  facets: Record<'category' | 'subcategory' | 'condition' | 'state' | 'year', Record<string, number>>;
+}
+
+export interface BidDelta {
+  type: 'bid';
+  item_id: string;
+  current_bid: number;
+  bid_count: number;
+  min_next_bid: number;
+}
+
+// Sent when the auction starts or ends; bidding is only accepted while status is 'activa'.
+export interface AuctionStatusChange {
+  type: 'status';
+  auction_id: string;
+  status: 'proxima' | 'activa' | 'finalizada';
+}
+
+export type LiveMessage = BidDelta | AuctionStatusChange;
+
 export interface LoginCredentials {
   email: string;
   password: string;
@@ -121,6 +202,11 @@ export const auctionService = {
     return response.data;
   },
 
+  async getAuctionCards(): Promise<AuctionCard[]> {
+    const response = await apiClient.get('/auctions', { params: { view: 'card' } });
+    return response.data;
+  },
+
   async getAuctionDetail(auctionId: string): Promise<Auction> {
     const response = await apiClient.get(`/auctions/${auctionId}`);
     return response.data;
@@ -131,11 +217,34 @@ export const auctionService = {
     return response.data;
   },
 
+  // Keyset pagination: pass back nextCursor until it is null.
+  async getAuctionItemsPage(auctionId: string, cursor?: string, limit?: number): Promise<Page<AuctionItem>> {
+    const response = await apiClient.get(`/auctions/${auctionId}/items`, { params: { cursor, limit } });
+    return { data: response.data, nextCursor: response.headers['x-next-cursor'] ?? null };
+  },
+
+  async getAuctionItemCardsPage(auctionId: string, cursor?: string, limit?: number): Promise<Page<AuctionItemCard>> {
+    const response = await apiClient.get(`/auctions/${auctionId}/items`, { params: { cursor, limit, view: 'card' } });
+    return { data: response.data, nextCursor: response.headers['x-next-cursor'] ?? null };
+  },
+
   async getItemDetail(itemId: string): Promise<AuctionItem> {
     const response = await apiClient.get(`/items/${itemId}`);
     return response.data;
   },
 
+  // Auction and first page of lots in one request; next_cursor continues getAuctionItemsPage.
+  async getAuctionFull(auctionId: string, limit?: number): Promise<AuctionWithItems> {
+    const response = await apiClient.get(`/auctions/${auctionId}/full`, { params: { limit } });
+    return response.data;
+  },
+
+  // Several lots in one request, in the order given; ids that do not exist are left out.
+  async getItems(ids: string[]): Promise<AuctionItem[]> {
+    const response = await apiClient.get('/items', { params: { ids: ids.join(',') } });
+    return response.data;
+  },
+
   async searchAuctions(params: {
     category?: string;
     state?: string;
@@ -146,6 +255,54 @@ export const auctionService = {
     const response = await apiClient.get('/search/auctions', { params });
     return response.data;
   },
+
+  async searchItems(params: {
+    q: string;
+    category?: string;
+    subcategory?: string;
+    condition?: string;
+    state?: string;
+    year?: string;
+    limit?: number;
+    offset?: number;
+  }): Promise<ItemSearchResponse> {
+    const response = await apiClient.get('/search/items', { params });
+    return response.data;
+  },
+
+  // Registering again is harmless: the server answers 200 with the existing registration.
+  async registerForAuction(auctionId: string): Promise<Registration> {
+    const response = await apiClient.post(`/auctions/${auctionId}/register`);
+    return response.data;
+  },
+
+  async placeBid(itemId: string, amount: number): Promise<Bid> {
+    const response = await apiClient.post(`/items/${itemId}/bids`, { amount });
+    return response.data;
+  },
+
+  // Leave a maximum: the server bids for the user up to it. A maximum can only be raised.
+  async placeProxyBid(itemId: string, maxAmount: number): Promise<ProxyBidStatus> {
+    const response = await apiClient.post(`/items/${itemId}/proxy-bids`, { max_amount: maxAmount });
+    return response.data;
+  },
+
+  // Live price changes for every lot of an auction, plus its status changes (check `type`).
+  // Bid deltas may arrive out of order: ignore one whose bid_count is not greater than the
+  // last seen for that item.
+  // If the server drops the socket (code 1013) reload the items and subscribe again.
+  subscribeToAuction(
+    auctionId: string,
+    onMessage: (message: LiveMessage) => void,
+    onClose?: (event: CloseEvent) => void,
+  ): () => void {
+    const socket = new WebSocket(`${API_BASE_URL.replace(/^http/, 'ws')}/auctions/${auctionId}/live`);
+    socket.onmessage = (event) => onMessage(JSON.parse(event.data));
+    if (onClose) {
+      socket.onclose = onClose;
+    }
+    return () => socket.close();
+  },
 };
 
 // User Services
@@ -159,6 +316,11 @@ export const userService = {
     const response = await apiClient.get('/user/auctions');
     return response.data;
   },
+
+  async getUserAuctionsPage(cursor?: string, limit?: number): Promise<Page<Auction>> {
+    const response = await apiClient.get('/user/auctions', { params: { cursor, limit } });
+    return { data: response.data, nextCursor: response.headers['x-next-cursor'] ?? null };
+  },
 };
 
 export default {
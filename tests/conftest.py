@@ -0,0 +1,97 @@
+"""
+Shared fixtures: the API runs in-process on the memory repository engine, so the suite needs
+no mongod. Tests that exercise Mongo-only code paths use the `mongo_db` fixture, which skips
+when no mongod answers on TEST_MONGO_URL.
+"""
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "auction_test")
+os.environ["REPOSITORY_ENGINE"] = "memory"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL", "mongodb://127.0.0.1:27017")
+
+
+@pytest.fixture(scope="session")
+def server():
+    import server as server_module
+    return server_module
+
+
+@pytest.fixture(scope="session")
+def app_client(server):
+    from fastapi.testclient import TestClient
+
+    async def search_index_built():
+        await server.app.state.search_index_build
+
+    with TestClient(server.app) as client:
+        client.portal.call(search_index_built)
+        yield client
+
+
+@pytest.fixture
+def client(server, app_client):
+    server.response_cache.invalidate_all()
+    server.user_cache.clear()
+    app_client.headers.pop("Authorization", None)
+    yield app_client
+
+
+@pytest.fixture
+def run(app_client):
+    """Run a coroutine function on the app's event loop."""
+    return lambda func, *args: app_client.portal.call(func, *args)
+
+
+@pytest.fixture
+def user_data():
+    return {
+        "email": f"carlos.mendoza.{uuid.uuid4().hex[:8]}@empresarial.mx",
+        "full_name": "Carlos Mendoza García",
+        "phone": "+52 81 1234 5678",
+        "company": "Inversiones del Norte S.A. de C.V.",
+        "password": "MiPassword123!",
+    }
+
+
+@pytest.fixture
+def auth_headers(client, user_data):
+    response = client.post("/api/auth/register", json=user_data)
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def mongo_client():
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    probe = MongoClient(TEST_MONGO_URL, serverSelectionTimeoutMS=500)
+    try:
+        probe.admin.command("ping")
+    except PyMongoError:
+        probe.close()
+        pytest.skip(f"no mongod at {TEST_MONGO_URL}")
+    yield probe
+    probe.close()
+
+
+@pytest.fixture
+def mongo_db(mongo_client):
+    """A scratch database on a real mongod, one per test; the test is skipped when none is reachable."""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    name = f"auction_test_{uuid.uuid4().hex[:8]}"
+    yield lambda: AsyncIOMotorClient(TEST_MONGO_URL)[name]
+    mongo_client.drop_database(name)
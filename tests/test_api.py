@@ -0,0 +1,262 @@
+"""Functional tests of the public API, ported from the original backend_test.py script."""
+
+
+def test_register_returns_token(client, user_data):
+    response = client.post("/api/auth/register", json=user_data)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["token_type"] == "bearer"
+    assert data["access_token"]
+
+
+def test_register_twice_is_rejected(client, user_data):
+    assert client.post("/api/auth/register", json=user_data).status_code == 200
+    response = client.post("/api/auth/register", json=user_data)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+
+def test_login(client, user_data, auth_headers):
+    response = client.post("/api/auth/login", json={"email": user_data["email"], "password": user_data["password"]})
+    assert response.status_code == 200
+    assert response.json()["token_type"] == "bearer"
+
+
+def test_login_wrong_password(client, user_data, auth_headers):
+    response = client.post("/api/auth/login", json={"email": user_data["email"], "password": "otra"})
+    assert response.status_code == 401
+
+
+def test_get_auctions(client):
+    response = client.get("/api/auctions")
+    assert response.status_code == 200
+    auctions = response.json()
+    assert auctions
+    for auction in auctions:
+        for field in ("auction_id", "title", "company_name", "status", "start_date", "end_date"):
+            assert field in auction
+        assert "_id" not in auction
+
+
+def test_get_auction_detail(client):
+    auction = client.get("/api/auctions").json()[0]
+    response = client.get(f"/api/auctions/{auction['auction_id']}")
+    assert response.status_code == 200
+    assert response.json()["title"] == auction["title"]
+
+
+def test_get_unknown_auction(client):
+    assert client.get("/api/auctions/no-existe").status_code == 404
+
+
+def test_get_auction_items(client):
+    auction = client.get("/api/auctions").json()[0]
+    response = client.get(f"/api/auctions/{auction['auction_id']}/items")
+    assert response.status_code == 200
+    items = response.json()
+    assert items
+    assert all(item["auction_id"] == auction["auction_id"] for item in items)
+    assert [item["lot_order"] for item in items] == sorted(item["lot_order"] for item in items)
+
+
+def test_get_item_detail(client):
+    auction = client.get("/api/auctions").json()[0]
+    item = client.get(f"/api/auctions/{auction['auction_id']}/items").json()[0]
+    response = client.get(f"/api/items/{item['item_id']}")
+    assert response.status_code == 200
+    data = response.json()
+    for field in ("name", "description", "category", "starting_price", "current_bid"):
+        assert field in data
+    assert client.get("/api/items/no-existe").status_code == 404
+
+
+def test_auctions_cursor_pages_cover_the_catalog(client):
+    everything = [auction["auction_id"] for auction in client.get("/api/auctions").json()]
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/auctions", params=params)
+        assert response.status_code == 200
+        seen += [auction["auction_id"] for auction in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert seen == everything
+
+
+def test_bad_cursor_is_rejected(client):
+    assert client.get("/api/auctions", params={"cursor": "basura"}).status_code == 400
+
+
+def test_items_cursor_pages(client):
+    auction = client.get("/api/auctions").json()[0]
+    url = f"/api/auctions/{auction['auction_id']}/items"
+    everything = [item["item_id"] for item in client.get(url).json()]
+    first = client.get(url, params={"limit": 1})
+    second = client.get(url, params={"limit": 1, "cursor": first.headers["x-next-cursor"]})
+    assert [item["item_id"] for item in first.json() + second.json()] == everything[:2]
+
+
+def test_etag_and_not_modified(client):
+    response = client.get("/api/auctions")
+    etag = response.headers["etag"]
+    again = client.get("/api/auctions", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+
+
+def test_cached_response_is_invalidated_on_change(client, server):
+    auction = client.get("/api/auctions").json()[0]
+    url = f"/api/auctions/{auction['auction_id']}"
+    etag = client.get(url).headers["etag"]
+    assert client.get(url).headers["x-cache"] == "HIT"
+    server.auction_changed(auction["auction_id"])
+    response = client.get(url, headers={"If-None-Match": etag})
+    # Rebuilt, but the document did not change, so the client's copy is still current.
+    assert response.headers["x-cache"] == "MISS"
+    assert response.status_code == 304
+
+
+def test_sparse_fields(client):
+    auction = client.get("/api/auctions").json()[0]
+    response = client.get(f"/api/auctions/{auction['auction_id']}/items", params={"fields": "name,current_bid"})
+    assert response.status_code == 200
+    item = response.json()[0]
+    assert set(item) == {"item_id", "auction_id", "lot_order", "name", "current_bid"}
+
+
+def test_unknown_field_is_rejected(client):
+    auction = client.get("/api/auctions").json()[0]
+    response = client.get(f"/api/auctions/{auction['auction_id']}/items", params={"fields": "password_hash"})
+    assert response.status_code == 400
+
+
+def test_card_view_keeps_only_the_cover_image(client):
+    auction = client.get("/api/auctions").json()[0]
+    items = client.get(f"/api/auctions/{auction['auction_id']}/items", params={"view": "card"}).json()
+    assert items
+    assert all(len(item.get("images", [])) <= 1 for item in items)
+    assert all("description" not in item for item in items)
+
+
+def test_auction_with_items_and_multi_get(client):
+    auction = client.get("/api/auctions").json()[0]
+    full = client.get(f"/api/auctions/{auction['auction_id']}/full", params={"limit": 2}).json()
+    assert full["auction"]["auction_id"] == auction["auction_id"]
+    assert len(full["items"]) <= 2
+    ids = [item["item_id"] for item in full["items"]][::-1]
+    response = client.get("/api/items", params={"ids": ",".join(ids + ["no-existe"])})
+    assert [item["item_id"] for item in response.json()] == ids
+
+
+def test_search_items(client):
+    response = client.get("/api/search/items", params={"q": "motor"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] >= len(data["hits"])
+    assert set(data["facets"]) == {"category", "subcategory", "condition", "state", "year"}
+
+
+def test_search_auctions(client):
+    response = client.get("/api/search/auctions", params={"category": "vehiculos"})
+    assert response.status_code == 200
+    results = response.json()
+    assert results
+    for result in results:
+        assert result["match_count"] >= 1
+        assert result["min_price"] <= result["max_price"]
+
+    first = client.get("/api/search/auctions", params={"limit": 1})
+    assert len(first.json()) == 1
+    following = client.get("/api/search/auctions", params={"limit": 1, "cursor": first.headers["X-Next-Cursor"]})
+    assert following.json()[0]["auction_id"] != first.json()[0]["auction_id"]
+
+
+def test_registered_auctions_are_listed(client, auth_headers):
+    assert client.get("/api/user/auctions", headers=auth_headers).json() == []
+    auction_id = client.get("/api/auctions", params={"limit": 1}).json()[0]["auction_id"]
+    assert client.post(f"/api/auctions/{auction_id}/register", headers=auth_headers).status_code == 201
+    assert [auction["auction_id"] for auction in client.get("/api/user/auctions", headers=auth_headers).json()] == [auction_id]
+
+
+def test_registered_auctions_take_sparse_fields(client, auth_headers):
+    auction_id = client.get("/api/auctions", params={"limit": 1}).json()[0]["auction_id"]
+    assert client.post(f"/api/auctions/{auction_id}/register", headers=auth_headers).status_code == 201
+    response = client.get("/api/user/auctions", params={"fields": "title"}, headers=auth_headers)
+    assert [set(auction) for auction in response.json()] == [{"auction_id", "start_date", "title"}]
+    card = client.get("/api/user/auctions", params={"view": "card"}, headers=auth_headers).json()[0]
+    assert "description" not in card and card["status"]
+    assert client.get("/api/user/auctions", params={"fields": "password_hash"}, headers=auth_headers).status_code == 400
+
+
+def test_mongo_only_endpoints_answer_503(client):
+    assert client.get(f"/api/images/{'0' * 64}", params={"size": "card"}).status_code == 503
+
+
+def test_user_profile(client, user_data, auth_headers):
+    response = client.get("/api/user/profile", headers=auth_headers)
+    assert response.status_code == 200
+    profile = response.json()
+    assert profile["email"] == user_data["email"]
+    assert profile["full_name"] == user_data["full_name"]
+    assert profile["phone"] == user_data["phone"]
+
+
+def test_profile_requires_token(client):
+    assert client.get("/api/user/profile").status_code in (401, 403)
+    assert client.get("/api/user/profile", headers={"Authorization": "Bearer basura"}).status_code == 401
+
+
+
+def test_seeding_from_concurrent_workers(server, run, monkeypatch):
+    from collections import Counter
+
+    from repositories import create_repositories
+
+    repos = create_repositories("memory", None, server.min_next_bid, {})
+    monkeypatch.setattr(server, "repos", repos)
+
+    def lots_per_auction():
+        return Counter(item["auction_id"] for item in repos.items.items.documents.values())
+
+    async def empty():
+        return 0
+
+    async def seed():
+        await server.init_sample_data()
+        await server.seed_custom_auctions()
+
+    run(seed)
+    seeded = lots_per_auction()
+    # A second worker that checked for data before the first one wrote any.
+    monkeypatch.setattr(repos.auctions, "count", empty)
+    run(seed)
+    assert list(repos.auctions.auctions.documents) == [
+        "muestra-1", "muestra-2", "muestra-3", "multimarcas-2025-10-09", "pacific-aquaculture-2025-10-16",
+    ]
+    assert lots_per_auction() == seeded
+
+
+def test_registering_twice_counts_once(client, auth_headers):
+    def registered_count():
+        return client.get("/api/auctions/muestra-2").json()["registered_count"]
+
+    before = registered_count()
+    first = client.post("/api/auctions/muestra-2/register", headers=auth_headers)
+    assert first.status_code == 201
+    again = client.post("/api/auctions/muestra-2/register", headers=auth_headers)
+    assert again.status_code == 200
+    assert again.json() == first.json()
+    assert registered_count() == before + 1
+    assert client.get("/api/user/profile", headers=auth_headers).json()["registered_auctions"] == ["muestra-2"]
+    assert [auction["auction_id"] for auction in client.get("/api/user/auctions", headers=auth_headers).json()] == ["muestra-2"]
+
+
+def test_registration_needs_an_open_auction(client, server, run, auth_headers):
+    assert client.post("/api/auctions/no-existe/register", headers=auth_headers).status_code == 404
+    assert client.post("/api/auctions/muestra-3/register").status_code in (401, 403)
+    run(server.repos.auctions.set_fields, "muestra-3", {"status": "finalizada"})
+    try:
+        assert client.post("/api/auctions/muestra-3/register", headers=auth_headers).status_code == 409
+    finally:
+        run(server.repos.auctions.set_fields, "muestra-3", {"status": "activa"})
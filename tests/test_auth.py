@@ -0,0 +1,94 @@
+import pytest
+
+
+@pytest.fixture
+def user_id(server, auth_headers):
+    return server.decode_access_token(auth_headers["Authorization"].split()[1])["sub"]
+
+
+@pytest.fixture
+def user_reads(server, monkeypatch):
+    """Counts the user documents read from the repository."""
+    reads = []
+    get = server.repos.users.get
+
+    async def counting_get(user_id):
+        reads.append(user_id)
+        return await get(user_id)
+
+    monkeypatch.setattr(server.repos.users, "get", counting_get)
+    return reads
+
+
+def test_cached_user_is_reused(client, auth_headers, user_reads):
+    for _ in range(3):
+        assert client.get("/api/user/profile", headers=auth_headers).status_code == 200
+    assert len(user_reads) == 1
+
+
+def test_auction_registration_invalidates_the_cached_user(client, auth_headers):
+    assert client.get("/api/user/profile", headers=auth_headers).json()["registered_auctions"] == []
+    assert client.post("/api/auctions/muestra-1/register", headers=auth_headers).status_code == 201
+    assert client.get("/api/user/profile", headers=auth_headers).json()["registered_auctions"] == ["muestra-1"]
+
+
+def test_password_hash_change_invalidates_the_cached_user(client, server, run, user_data, auth_headers, user_id):
+    # Stored at another cost, so the next login rewrites the hash.
+    stored = run(server.repos.users.get, user_id)["password_hash"]
+    other_cost = server.bcrypt.hashpw(user_data["password"].encode(), server.bcrypt.gensalt(server.BCRYPT_ROUNDS + 1))
+    assert run(server.repos.users.replace_password_hash, user_id, stored, other_cost.decode())
+    assert client.get("/api/user/profile", headers=auth_headers).status_code == 200
+    assert server.user_cache.get(user_id) is not None
+
+    login = {"email": user_data["email"], "password": user_data["password"]}
+    assert client.post("/api/auth/login", json=login).status_code == 200
+    assert server.user_cache.get(user_id) is None
+
+
+def test_trusted_token_claims_skip_the_user_read(client, server, auth_headers, user_id, user_reads, monkeypatch):
+    monkeypatch.setattr(server, "AUTH_TRUST_TOKEN_CLAIMS", True)
+    assert client.get("/api/user/auctions", headers=auth_headers).status_code == 200
+    assert user_reads == []
+
+    # Tokens issued without the identity claims still resolve the user from the database.
+    token = server.create_access_token(data={"sub": user_id})
+    assert client.get("/api/user/auctions", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    assert user_reads == [user_id]
+
+
+def test_token_claims_are_not_trusted_by_default(client, server, auth_headers, user_id, user_reads):
+    assert client.get("/api/user/auctions", headers=auth_headers).status_code == 200
+    assert user_reads == [user_id]
+
+
+def test_login_rehashes_at_the_configured_cost_off_the_event_loop(client, server, run, user_data, user_id, monkeypatch):
+    import threading
+
+    # The stored hash has the lowest cost bcrypt allows; the configured one is higher.
+    monkeypatch.setattr(server, "BCRYPT_ROUNDS", 5)
+    stored = run(server.repos.users.get, user_id)["password_hash"]
+    low_cost = server.bcrypt.hashpw(user_data["password"].encode(), server.bcrypt.gensalt(4)).decode()
+    assert run(server.repos.users.replace_password_hash, user_id, stored, low_cost)
+
+    hashing_threads = []
+    for name in ("verify_password", "hash_password"):
+        def record(*args, func=getattr(server, name)):
+            hashing_threads.append(threading.get_ident())
+            return func(*args)
+        monkeypatch.setattr(server, name, record)
+
+    async def loop_thread():
+        return threading.get_ident()
+
+    login = {"email": user_data["email"], "password": user_data["password"]}
+    assert client.post("/api/auth/login", json=login).status_code == 200
+    rehashed = run(server.repos.users.get, user_id)["password_hash"]
+    assert rehashed.startswith("$2b$05$")
+    assert server.bcrypt.checkpw(user_data["password"].encode(), rehashed.encode())
+    assert len(hashing_threads) == 2
+    assert run(loop_thread) not in hashing_threads
+
+    # At the configured cost already: verified, not rewritten.
+    assert client.post("/api/auth/login", json=login).status_code == 200
+    assert run(server.repos.users.get, user_id)["password_hash"] == rehashed
+    assert len(hashing_threads) == 3
@@ -0,0 +1,177 @@
+import asyncio
+import uuid
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from proxy_bidding import resolve_proxies
+
+
+@pytest.fixture
+def item(server, run):
+    """An unbid lot of an active auction, starting at 50,000."""
+    auction = server.Auction(
+        title="Subasta de Prueba",
+        description="Lotes para probar pujas",
+        reason="liquidacion",
+        company_name="Pruebas S.A.",
+        start_date=server.datetime.utcnow() - server.timedelta(days=1),
+        end_date=server.datetime.utcnow() + server.timedelta(days=1),
+        status="activa",
+        location="Monterrey, Nuevo León",
+        state="Nuevo León",
+    )
+    lot = server.AuctionItem(
+        name="Montacargas Toyota 8FGU25",
+        description="Montacargas a gas LP",
+        category="maquinaria",
+        subcategory="montacargas",
+        brand="Toyota",
+        starting_price=50000.0,
+        current_bid=50000.0,
+        estimated_value={"min": 45000, "max": 70000},
+        images=[],
+        condition="bueno",
+        specifications={"capacidad": "2,500 kg"},
+        location="Monterrey, Nuevo León",
+        auction_id=auction.auction_id,
+        auction_status="activa",
+    )
+    run(server.repos.auctions.insert, auction.dict(by_alias=True, exclude={"id"}))
+    run(server.repos.items.insert, lot.dict(by_alias=True, exclude={"id"}))
+    return lot
+
+
+def bid(client, headers, item_id, amount):
+    return client.post(f"/api/items/{item_id}/bids", json={"amount": amount}, headers=headers)
+
+
+def test_min_next_bid(server):
+    assert server.min_next_bid(50000.0, 0, 50000.0) == 50000.0
+    assert server.min_next_bid(50000.0, 1, 50000.0) == 51000.0
+    # A seeded standing bid above the starting price has to be beaten, bids or not.
+    assert server.min_next_bid(485000.0, 0, 450000.0) == 490000.0
+    assert server.min_next_bid(50000.0, 0) == 51000.0
+    assert server.min_next_bid(5000.0) == 5100.0
+    assert server.min_next_bid(2000000.0, 3) == 2010000.0
+
+
+def test_opening_bid_at_starting_price(client, auth_headers, item):
+    response = bid(client, auth_headers, item.item_id, 50000.0)
+    assert response.status_code == 201, response.text
+    data = response.json()
+    assert data["amount"] == 50000.0
+    assert "_id" not in data
+    assert not data["proxy"]
+
+
+def test_seeded_standing_bid_needs_an_increment(client, auth_headers, item, server, run):
+    lot = item.copy(update={"item_id": "lote-con-puja-inicial", "current_bid": 55000.0})
+    run(server.repos.items.insert, lot.dict(by_alias=True, exclude={"id"}))
+    rejected = bid(client, auth_headers, lot.item_id, 55000.0)
+    assert rejected.status_code == 409
+    assert rejected.headers["x-min-next-bid"] == "56000.0"
+    assert bid(client, auth_headers, lot.item_id, 56000.0).status_code == 201
+
+
+def test_later_bids_need_an_increment(client, auth_headers, item):
+    assert bid(client, auth_headers, item.item_id, 50000.0).status_code == 201
+    rejected = bid(client, auth_headers, item.item_id, 50000.0)
+    assert rejected.status_code == 409
+    assert rejected.headers["x-min-next-bid"] == "51000.0"
+    assert bid(client, auth_headers, item.item_id, 51000.0).status_code == 201
+
+
+def test_bid_below_starting_price_is_rejected(client, auth_headers, item):
+    response = bid(client, auth_headers, item.item_id, 49000.0)
+    assert response.status_code == 409
+    assert response.headers["x-min-next-bid"] == "50000.0"
+
+
+def test_bid_on_unknown_or_inactive_lot(client, auth_headers, item, server, run):
+    assert bid(client, auth_headers, "no-existe", 100.0).status_code == 404
+    run(server.repos.items.set_auction_status, item.auction_id, "finalizada")
+    assert bid(client, auth_headers, item.item_id, 60000.0).status_code == 409
+
+
+def test_bid_requires_token(client, item):
+    assert client.post(f"/api/items/{item.item_id}/bids", json={"amount": 60000.0}).status_code in (401, 403)
+
+
+def test_proxy_answers_a_manual_bid(client, auth_headers, item, user_data):
+    response = client.post(f"/api/items/{item.item_id}/proxy-bids", json={"max_amount": 60000.0}, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    assert response.json() == {"item_id": item.item_id, "max_amount": 60000.0, "current_bid": 50000.0, "winning": True}
+
+    rival = {**user_data, "email": f"rival.{uuid.uuid4().hex[:8]}@empresarial.mx"}
+    token = client.post("/api/auth/register", json=rival).json()["access_token"]
+    assert bid(client, {"Authorization": f"Bearer {token}"}, item.item_id, 55000.0).status_code == 201
+    lot = client.get(f"/api/items/{item.item_id}").json()
+    assert (lot["current_bid"], lot["bid_count"]) == (56000.0, 3)
+
+
+def test_bid_updates_cached_item(client, auth_headers, item):
+    url = f"/api/items/{item.item_id}"
+    assert client.get(url).json()["current_bid"] == 50000.0
+    assert bid(client, auth_headers, item.item_id, 52000.0).status_code == 201
+    response = client.get(url)
+    assert response.headers["x-cache"] == "MISS"
+    assert response.json()["current_bid"] == 52000.0
+    assert response.json()["bid_count"] == 1
+
+
+def test_concurrent_duplicate_registration(client, server, user_data, monkeypatch):
+    assert client.post("/api/auth/register", json=user_data).status_code == 200
+
+    async def not_found(email):
+        return None
+
+    # The second request passes the existence check, as a concurrent one would.
+    monkeypatch.setattr(server.repos.users, "get_by_email", not_found)
+    response = client.post("/api/auth/register", json=user_data)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+
+def test_proxy_opens_at_starting_price():
+    proxies = [{"user_id": "a", "max_amount": 80000.0}]
+    assert resolve_proxies(50000.0, None, proxies, lambda price: 1000.0, opening=True) == (50000.0, "a")
+    # A seeded standing bid with no bidder behind it still needs an increment.
+    assert resolve_proxies(50000.0, None, proxies, lambda price: 1000.0) == (51000.0, "a")
+    assert resolve_proxies(50000.0, "b", proxies, lambda price: 1000.0) == (51000.0, "a")
+
+
+def test_min_next_bid_expr_matches_function(server, mongo_db):
+    """The mongod expression and the Python rule accept the same opening and later bids."""
+    from repositories import MotorItemRepository
+
+    async def check():
+        db = mongo_db()
+        repository = MotorItemRepository(db.auction_items, server.min_next_bid_expr())
+        for current_bid in (5000.0, 50000.0, 500000.0, 5000000.0):
+            for bid_count in (0, 2):
+                for starting_price in (current_bid, current_bid / 2):
+                    item_id = str(uuid.uuid4())
+                    await db.auction_items.insert_one({
+                        "item_id": item_id, "auction_id": "a", "auction_status": "activa",
+                        "starting_price": starting_price, "current_bid": current_bid, "bid_count": bid_count,
+                    })
+                    minimum = server.min_next_bid(current_bid, bid_count, starting_price)
+                    assert await repository.place_bid(item_id, "u", minimum - 1) is None
+                    assert await repository.place_bid(item_id, "u", minimum) is not None
+        # Lots written before bid_count existed count as unbid.
+        await db.auction_items.insert_one({
+            "item_id": "legacy", "auction_id": "a", "auction_status": "activa", "starting_price": 100.0, "current_bid": 100.0,
+        })
+        assert await repository.place_bid("legacy", "u", 100.0) is not None
+
+    asyncio.run(check())
+
+
+def test_memory_users_reject_duplicate_email(server, run, user_data):
+    from repositories import MemoryUserRepository
+
+    users = MemoryUserRepository()
+    run(users.insert, {"user_id": "1", "email": user_data["email"]})
+    with pytest.raises(DuplicateKeyError):
+        run(users.insert, {"user_id": "2", "email": user_data["email"]})
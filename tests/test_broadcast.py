@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from broadcast import BroadcastHub
+
+
+def test_published_messages_reach_subscribers():
+    async def check():
+        hub = BroadcastHub(queue_size=2)
+        subscriber = hub.subscribe("subasta-1")
+        hub.publish("subasta-1", {"type": "bid", "current_bid": 51000.0})
+        hub.publish("subasta-2", {"type": "bid"})
+        assert await subscriber.get() == '{"type":"bid","current_bid":51000.0}'
+        hub.unsubscribe("subasta-1", subscriber)
+        assert hub.broadcasters == {}
+
+    asyncio.run(check())
+
+
+def test_slow_subscriber_is_dropped():
+    async def check():
+        hub = BroadcastHub(queue_size=1)
+        slow, fast = hub.subscribe("subasta-1"), hub.subscribe("subasta-1")
+        hub.publish("subasta-1", {"n": 1})
+        assert await fast.get() == '{"n":1}'
+        hub.publish("subasta-1", {"n": 2})
+        assert slow.dropped and await slow.get() is None
+        assert await fast.get() == '{"n":2}'
+
+    asyncio.run(check())
+
+
+def test_failed_watcher_drops_its_subscribers():
+    started = []
+
+    async def watcher(auction_id, publish):
+        started.append(auction_id)
+        if len(started) == 1:
+            raise ConnectionError("The $changeStream stage is only supported on replica sets")
+        await asyncio.Event().wait()
+
+    async def check():
+        hub = BroadcastHub(watcher=watcher)
+        subscriber = hub.subscribe("subasta-1")
+        # The client is told to reconnect instead of waiting on a feed that went quiet.
+        assert await asyncio.wait_for(subscriber.get(), 1) is None
+        assert subscriber.dropped
+        assert "subasta-1" not in hub.broadcasters
+        hub.unsubscribe("subasta-1", subscriber)
+
+        again = hub.subscribe("subasta-1")
+        await asyncio.sleep(0)
+        assert started == ["subasta-1", "subasta-1"]
+        assert not again.dropped
+        hub.unsubscribe("subasta-1", again)
+
+    asyncio.run(check())
+
+
+def test_change_stream_mode_needs_a_replica_set(server, monkeypatch):
+    class Admin:
+        def __init__(self, hello):
+            self.hello = hello
+
+        async def command(self, name):
+            assert name == "hello"
+            return self.hello
+
+    class Client:
+        def __init__(self, hello):
+            self.admin = Admin(hello)
+
+    monkeypatch.setattr(server, "LIVE_BIDS_SOURCE", "change_stream")
+    monkeypatch.setattr(server, "REPOSITORY_ENGINE", "mongo")
+    monkeypatch.setattr(server, "client", Client({"isWritablePrimary": True}))
+    with pytest.raises(RuntimeError, match="replica set"):
+        asyncio.run(server.check_live_bids_source())
+
+    monkeypatch.setattr(server, "client", Client({"isWritablePrimary": True, "setName": "rs0"}))
+    asyncio.run(server.check_live_bids_source())
+    monkeypatch.setattr(server, "client", Client({"isWritablePrimary": True, "msg": "isdbgrid"}))
+    asyncio.run(server.check_live_bids_source())
+
+    monkeypatch.setattr(server, "REPOSITORY_ENGINE", "memory")
+    with pytest.raises(RuntimeError, match="REPOSITORY_ENGINE"):
+        asyncio.run(server.check_live_bids_source())
+    monkeypatch.setattr(server, "LIVE_BIDS_SOURCE", "kafka")
+    with pytest.raises(RuntimeError, match="Unknown LIVE_BIDS_SOURCE"):
+        asyncio.run(server.check_live_bids_source())
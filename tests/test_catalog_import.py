@@ -0,0 +1,102 @@
+import asyncio
+import io
+import threading
+
+from pymongo.errors import BulkWriteError
+
+from catalog_import import CatalogImporter, item_id_for, read_rows
+
+AUCTIONS_CSV = """auction_id,title,description,reason,company_name,start_date,end_date,status,location,state
+sub-1,Subasta Uno,Flotilla,renovacion_flotilla,Uno S.A.,2025-10-01T09:00:00,2025-10-02T18:00:00,activa,Monterrey,Nuevo León
+sub-2,Subasta Dos,Maquinaria,cierre_empresa,Dos S.A.,2025-10-03T09:00:00,2025-10-04T18:00:00,proxima,Saltillo,Coahuila
+sub-3,Sin fechas,,,,,,,,
+"""
+
+
+class FakeResult:
+    def __init__(self, count):
+        self.upserted_count = count
+        self.modified_count = 0
+
+
+class FakeCollection:
+    def __init__(self, documents=(), fail_index=None):
+        self.documents = list(documents)
+        self.fail_index = fail_index
+        self.batches = []
+
+    async def bulk_write(self, batch, ordered=True):
+        self.batches.append(batch)
+        if self.fail_index is not None and self.fail_index < len(batch):
+            raise BulkWriteError({
+                "writeErrors": [{"index": self.fail_index, "code": 11000, "errmsg": "E11000 duplicate key error"}],
+                "writeConcernErrors": [],
+                "nUpserted": len(batch) - 1,
+                "nModified": 0,
+            })
+        return FakeResult(len(batch))
+
+    def find(self, query, projection=None):
+        async def documents():
+            for document in self.documents:
+                yield document
+        return documents()
+
+
+class FakeDB:
+    def __init__(self, auctions=None, items=None):
+        self.auctions = auctions or FakeCollection()
+        self.auction_items = items or FakeCollection()
+
+
+def importer(server, db, batch_size=1000):
+    return CatalogImporter(db, server.Auction, server.AuctionItem, batch_size)
+
+
+def test_invalid_rows_are_reported_and_skipped(server):
+    db = FakeDB()
+    imports = importer(server, db)
+    asyncio.run(imports.import_auctions(read_rows(io.StringIO(AUCTIONS_CSV), "subastas.csv"), "subastas.csv"))
+    report = imports.report.as_dict()
+    assert (report["rows"], report["written"], report["upserted"], report["error_count"]) == (3, 2, 2, 1)
+    assert report["errors"][0]["row"] == 3
+    assert imports.touched_auctions == {"sub-1", "sub-2"}
+
+
+def test_rows_are_validated_off_the_event_loop(server):
+    db = FakeDB()
+    imports = importer(server, db, batch_size=1)
+    threads = set()
+    upsert = imports._auction_upsert
+
+    def recording_upsert(record):
+        threads.add(threading.get_ident())
+        return upsert(record)
+
+    imports._auction_upsert = recording_upsert
+
+    async def run_import():
+        await imports.import_auctions(read_rows(io.StringIO(AUCTIONS_CSV), "subastas.csv"), "subastas.csv")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run_import())
+    assert threads and loop_thread not in threads
+    assert [len(batch) for batch in db.auctions.batches] == [1, 1]
+
+
+def test_bulk_write_errors_become_report_errors(server):
+    auctions = FakeCollection([{"auction_id": "sub-1", "status": "activa"}])
+    items = FakeCollection(fail_index=1)
+    imports = importer(server, FakeDB(auctions, items))
+    rows = [
+        {"auction_id": "sub-1", "lot_order": n, "name": f"Lote {n}", "description": "Camión", "category": "camiones",
+         "subcategory": "carga", "brand": "Kenworth", "starting_price": 1000.0, "estimated_value": {"min": 1, "max": 2},
+         "condition": "bueno", "specifications": {}, "location": "Monterrey"}
+        for n in range(3)
+    ]
+    asyncio.run(imports.import_items(rows))
+    report = imports.report.as_dict()
+    assert (report["rows"], report["written"], report["upserted"], report["error_count"]) == (3, 2, 2, 1)
+    assert report["errors"] == [{"file": "items", "row": 2, "error": "E11000 duplicate key error"}]
+    assert imports.item_ids[0] == item_id_for("sub-1", 0)
+
@@ -0,0 +1,98 @@
+import gzip
+
+import brotli
+
+from compression import encoded_etag, negotiate
+
+
+def test_negotiate():
+    assert negotiate("") is None
+    assert negotiate("identity") is None
+    assert negotiate("gzip") == "gzip"
+    assert negotiate("gzip, br") == "br"
+    assert negotiate("br;q=0.5, gzip") == "gzip"
+    assert negotiate("gzip;q=0, *;q=0.1") == "br"
+    assert negotiate("BR") == "br"
+
+
+def test_encoded_etag():
+    assert encoded_etag('"abc"', "br") == '"abc-br"'
+    assert encoded_etag('W/"abc"', "gzip") == 'W/"abc-gzip"'
+
+
+def items_url(client):
+    auction = client.get("/api/auctions").json()[0]
+    return f"/api/auctions/{auction['auction_id']}/items"
+
+
+def test_cached_response_variants(client, server):
+    url = items_url(client)
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["vary"] == "Accept-Encoding"
+    assert len(plain.content) >= server.COMPRESSION_MIN_SIZE
+
+    for encoding, decompress in (("gzip", gzip.decompress), ("br", brotli.decompress)):
+        response = client.get(url, headers={"Accept-Encoding": encoding})
+        assert response.headers["content-encoding"] == encoding
+        assert response.headers["etag"] == encoded_etag(plain.headers["etag"], encoding)
+        assert response.content == plain.content
+        raw = server.response_cache.entries.get(f"{url}?").variants[encoding]
+        assert decompress(raw) == plain.content
+        again = client.get(url, headers={"Accept-Encoding": encoding, "If-None-Match": response.headers["etag"]})
+        assert again.status_code == 304
+
+
+def test_plain_etag_does_not_match_compressed_variant(client):
+    url = items_url(client)
+    etag = client.get(url, headers={"Accept-Encoding": "identity"}).headers["etag"]
+    response = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+
+
+def test_middleware_compresses_whole_json_bodies():
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Route
+    from starlette.testclient import TestClient
+
+    from compression import Compressor, CompressionMiddleware
+
+    payload = {"lots": [{"name": f"Lote {n}", "brand": "Caterpillar"} for n in range(200)]}
+    app = Starlette(routes=[
+        Route("/json", lambda request: JSONResponse(payload)),
+        Route("/image", lambda request: Response(b"x" * 4096, media_type="image/webp")),
+    ])
+    app.add_middleware(CompressionMiddleware, compressor=Compressor(1024, 64 * 1024, None))
+    client = TestClient(app)
+
+    response = client.get("/json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == payload
+
+    image = client.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in image.headers
+    assert image.content == b"x" * 4096
+
+
+def test_small_bodies_are_not_compressed(client):
+    response = client.get("/api/auctions/no-existe", headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 404
+    assert "content-encoding" not in response.headers
+
+
+def test_compressor_offloads_large_bodies(server):
+    import asyncio
+
+    from compression import Compressor
+
+    body = b'{"name": "Excavadora Caterpillar 320D"}' * 4000
+    compressor = Compressor(1024, 64 * 1024, server.compression_executor)
+    compressed = asyncio.run(compressor.compress(body, "br"))
+    assert brotli.decompress(compressed) == body
+    assert compressor.bytes_in["br"] == len(body)
+    assert compressor.bytes_out["br"] == len(compressed)
+    assert compressor.choose("gzip", 10) is None
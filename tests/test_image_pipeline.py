@@ -0,0 +1,110 @@
+import asyncio
+import io
+import os
+
+import pytest
+from PIL import Image
+
+import image_pipeline
+from image_pipeline import ImagePipeline, RenderError
+
+
+class StoredBytes:
+    def __init__(self, data):
+        self.data = data
+
+    async def read(self):
+        return self.data
+
+
+class FakeStore:
+    def __init__(self):
+        self.images = {}
+
+    async def put(self, data, content_type=None):
+        digest = f"{len(self.images):064x}"
+        self.images[digest] = data
+        return digest
+
+    async def exists(self, digest):
+        return digest in self.images
+
+    async def open(self, digest):
+        return StoredBytes(self.images[digest])
+
+
+class FakeVariants:
+    def __init__(self):
+        self.documents = {}
+
+    async def find_one(self, query):
+        return self.documents.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        self.documents[query["_id"]] = {"_id": query["_id"], **update["$set"]}
+
+
+def png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "orange").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def crash_worker(data):
+    os._exit(1)
+
+
+async def render(pipeline, data):
+    digest = await pipeline.store.put(data)
+    pipeline.start()
+    try:
+        await pipeline.render(digest)
+        return digest
+    finally:
+        await pipeline.stop()
+
+
+def test_renders_every_variant():
+    pipeline = ImagePipeline(FakeStore(), FakeVariants(), workers=1)
+    digest = asyncio.run(render(pipeline, png(2000, 1000)))
+    assert len(pipeline.variants.documents) == len(image_pipeline.SIZES) * len(image_pipeline.FORMATS)
+    thumb = pipeline.store.images[pipeline.variants.documents[f"{digest}:thumb:webp"]["image"]]
+    assert Image.open(io.BytesIO(thumb)).size == (160, 80)
+
+
+def test_undecodable_image():
+    pipeline = ImagePipeline(FakeStore(), FakeVariants(), workers=1)
+    with pytest.raises(RenderError):
+        asyncio.run(render(pipeline, b"no es una imagen"))
+
+
+def test_decompression_bomb(monkeypatch):
+    # Workers are forked on first use, so they inherit the lowered limit.
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+    pipeline = ImagePipeline(FakeStore(), FakeVariants(), workers=1)
+    with pytest.raises(RenderError) as raised:
+        asyncio.run(render(pipeline, png(20, 20)))
+    assert isinstance(raised.value.__cause__, Image.DecompressionBombError)
+
+
+def test_dead_worker_replaces_the_pool(monkeypatch):
+    pipeline = ImagePipeline(FakeStore(), FakeVariants(), workers=1)
+
+    async def crash_then_render():
+        bomb = await pipeline.store.put(b"mata al proceso")
+        good = await pipeline.store.put(png(50, 50))
+        pipeline.start()
+        try:
+            broken = pipeline.executor
+            monkeypatch.setattr(image_pipeline, "render_variants", crash_worker)
+            with pytest.raises(RenderError):
+                await pipeline.render(bomb)
+            assert pipeline.executor is not broken
+            monkeypatch.undo()
+            await pipeline.render(good)
+            return good
+        finally:
+            await pipeline.stop()
+
+    good = asyncio.run(crash_then_render())
+    assert f"{good}:card:jpeg" in pipeline.variants.documents
@@ -0,0 +1,63 @@
+import base64
+
+import pytest
+
+from image_store import parse_range
+
+PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=90-500", (90, 99)),
+    ("bytes=5-5", (5, 5)),
+    # Malformed or unsupported: the whole body is sent.
+    ("bytes=5-3", None),
+    ("bytes=a-3", None),
+    ("bytes=--3", None),
+    ("bytes=-", None),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=150-200", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 100)
+
+
+@pytest.fixture
+def digest(server, run):
+    return run(server.image_store.put, PNG, "image/png")
+
+
+def test_serve_image_ranges(client, digest):
+    url = f"/api/images/{digest}"
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.content == PNG
+    part = client.get(url, headers={"Range": "bytes=0-7"})
+    assert part.status_code == 206
+    assert part.content == PNG[:8]
+    assert part.headers["content-range"] == f"bytes 0-7/{len(PNG)}"
+    backwards = client.get(url, headers={"Range": "bytes=5-3"})
+    assert backwards.status_code == 200
+    assert backwards.content == PNG
+    beyond = client.get(url, headers={"Range": f"bytes={len(PNG)}-"})
+    assert beyond.status_code == 416
+    assert beyond.headers["content-range"] == f"bytes */{len(PNG)}"
+
+
+def test_store_image_refs_skips_invalid_base64(server, run, digest, caplog):
+    inline = base64.b64encode(PNG).decode("ascii")
+    refs = run(server.store_image_refs, [inline, "no es base64!", digest, "iVBORw0K%%%"])
+    assert refs == [digest, digest]
+    assert "not valid base64" in caplog.text
@@ -0,0 +1,183 @@
+"""
+Every query shape the API and the background jobs issue is answered from an index: explain()
+on a real mongod, with the indexes ensure_indexes() creates, must not pick a COLLSCAN.
+
+One-off startup migrations (lot_order backfill, inline image migration) scan on purpose and are
+left out.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from image_pipeline import variant_id
+from lifecycle import status_queries
+from proxy_bidding import PROXY_ORDER
+from repositories import MotorSearchRepository, keyset_filter
+from settlement import lot_results_pipeline
+
+
+def plan_stages(plan):
+    """All stage names of a query plan tree."""
+    stages = [plan.get("stage")]
+    for child_key in ("inputStage", "outerStage", "innerStage"):
+        if child_key in plan:
+            stages += plan_stages(plan[child_key])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+
+def winning_plan(explain):
+    planner = explain.get("queryPlanner")
+    if planner is None:
+        # Aggregations report the plan of their initial $cursor stage.
+        for stage in explain.get("stages", []):
+            if "$cursor" in stage:
+                planner = stage["$cursor"]["queryPlanner"]
+                break
+    plan = planner["winningPlan"]
+    # Slot-based engine wraps the classic tree in queryPlan.
+    return plan.get("queryPlan", plan)
+
+
+def find(collection, query, sort=None, limit=None):
+    command = {"find": collection, "filter": query}
+    if sort:
+        command["sort"] = dict(sort)
+    if limit:
+        command["limit"] = limit
+    return command
+
+
+def distinct(collection, key, query):
+    return {"distinct": collection, "key": key, "query": query}
+
+
+def update(collection, query, change, multi=False, upsert=False):
+    return {"update": collection, "updates": [{"q": query, "u": change, "multi": multi, "upsert": upsert}]}
+
+
+def find_and_modify(collection, query, change, upsert=False):
+    return {"findAndModify": collection, "query": query, "update": change, "upsert": upsert}
+
+
+def aggregate(collection, pipeline):
+    return {"aggregate": collection, "pipeline": pipeline, "cursor": {}}
+
+
+def api_queries(server):
+    """{name: explain command} for every query shape issued while serving or in the background."""
+    now = datetime.utcnow()
+    auctions_page = keyset_filter("start_date", "auction_id", now, "x")
+    items_page = {"$and": [{"auction_id": "x"}, keyset_filter("lot_order", "item_id", 1, "x")]}
+    registrations_page = {"$and": [{"user_id": "x"}, keyset_filter("created_at", "auction_id", now, "x")]}
+    search_repository = MotorSearchRepository(server.db.auctions, server.db.auction_items)
+
+    def search(item_match, auction_match):
+        collection, pipeline = search_repository.pipeline(item_match, auction_match, None, 11, server.SEARCH_RESULT_PROJECTION)
+        return aggregate(collection.name, pipeline)
+
+    queries = {
+        "get_auctions": find("auctions", {}, server.AUCTIONS_SORT, 101),
+        "get_auctions cursor": find("auctions", auctions_page, server.AUCTIONS_SORT, 101),
+        "get_auction_detail": find("auctions", {"auction_id": "x"}),
+        "get_auction_items": find("auction_items", {"auction_id": "x"}, server.ITEMS_SORT, 101),
+        "get_auction_items cursor": find("auction_items", items_page, server.ITEMS_SORT, 101),
+        "get_item_detail": find("auction_items", {"item_id": "x"}),
+        "multi-get items": find("auction_items", {"item_id": {"$in": ["x", "y", "z"]}}),
+        "multi-get auctions": find("auctions", {"auction_id": {"$in": ["x", "y", "z"]}}),
+        "place_bid": find_and_modify("auction_items", {
+            "item_id": "x", "auction_status": "activa", "$expr": {"$gte": [1.0, server.min_next_bid_expr()]},
+        }, {"$inc": {"bid_count": 1}}),
+        "search_auctions category": search(server.search_item_match("vehiculos", 1.0, 100.0), {"state": "Jalisco"}),
+        "search_auctions price": search(server.search_item_match(None, 1.0, None), {}),
+        "search_auctions state": search({}, {"state": "Jalisco"}),
+        "search_auctions status": search({}, {"status": "activa"}),
+        "login_user": find("users", {"email": "x"}),
+        "get_current_user": find("users", {"user_id": "x"}),
+        "register_for_auction": update("registrations", {"auction_id": "x", "user_id": "y"},
+                                       {"$setOnInsert": {"created_at": now}}, upsert=True),
+        "registration lookup": find("registrations", {"auction_id": "x", "user_id": "y"}),
+        "get_user_auctions": find("registrations", {"user_id": "x"}, server.REGISTRATIONS_SORT, 101),
+        "get_user_auctions cursor": find("registrations", registrations_page, server.REGISTRATIONS_SORT, 101),
+        "proxy ceiling": find_and_modify("proxy_bids", {"item_id": "x", "user_id": "y"},
+                                         {"$max": {"max_amount": 1.0}}, upsert=True),
+        "proxy top two": find("proxy_bids", {"item_id": "x"}, PROXY_ORDER, 2),
+        "proxy resolution": find_and_modify("auction_items", {
+            "item_id": "x", "auction_status": "activa", "current_bid": 1.0, "high_bidder_id": "y",
+        }, {"$set": {"current_bid": 2.0}}),
+        "lot status copy": update("auction_items", {"auction_id": "x", "auction_status": {"$ne": "activa"}},
+                                  {"$set": {"auction_status": "activa"}}, multi=True),
+        "lifecycle status write": update("auctions", {"auction_id": "x", "status": {"$ne": "activa"}},
+                                         {"$set": {"status": "activa"}}),
+        "lifecycle schedule": find("auctions", {"$or": [{"start_date": {"$gt": now}}, {"end_date": {"$gt": now}}]}),
+        "settlement pending": distinct("auctions", "auction_id", {
+            "status": "finalizada",
+            "$or": [{"settlement": {"$exists": False}}, {"settlement.state": "en_proceso"}],
+        }),
+        "settlement claim": find_and_modify("auctions", {
+            "auction_id": "x",
+            "status": "finalizada",
+            "$or": [{"settlement": {"$exists": False}},
+                    {"settlement.state": "en_proceso", "settlement.started_at": {"$lt": now}}],
+        }, {"$set": {"settlement": {"state": "en_proceso", "started_at": now}}}),
+        "settlement lots": aggregate("auction_items", lot_results_pipeline("x")),
+        "settlement lot write": update("auction_items", {"item_id": "x"}, {"$set": {"settlement": {}}}),
+        "image variant": find("image_variants", {"_id": variant_id("0" * 64, "card", "webp")}),
+        "image variant write": update("image_variants", {"_id": variant_id("0" * 64, "card", "webp")},
+                                      {"$set": {"size": "card"}}, upsert=True),
+    }
+    # The lifecycle sweeps, one per status.
+    for status, query in status_queries(now):
+        queries[f"lifecycle sweep {status}"] = distinct("auctions", "auction_id", {**query, "status": {"$ne": status}})
+    return queries
+
+
+def query_names():
+    return [
+        "get_auctions", "get_auctions cursor", "get_auction_detail", "get_auction_items", "get_auction_items cursor",
+        "get_item_detail", "multi-get items", "multi-get auctions", "place_bid",
+        "search_auctions category", "search_auctions price", "search_auctions state", "search_auctions status",
+        "login_user", "get_current_user", "register_for_auction", "registration lookup", "get_user_auctions",
+        "get_user_auctions cursor", "proxy ceiling", "proxy top two", "proxy resolution", "lot status copy",
+        "lifecycle status write", "lifecycle schedule", "lifecycle sweep finalizada", "lifecycle sweep activa", "lifecycle sweep proxima",
+        "settlement pending", "settlement claim", "settlement lots", "settlement lot write", "image variant",
+        "image variant write",
+    ]
+
+
+def test_every_query_shape_is_named(server):
+    assert sorted(api_queries(server)) == sorted(query_names())
+
+
+@pytest.fixture
+def indexed_db(server, mongo_db):
+    """A scratch database with the INDEXES of server.py and a document in every collection."""
+
+    async def prepare():
+        db = mongo_db()
+        for collection_name, indexes in server.INDEXES.items():
+            await db[collection_name].create_indexes(indexes)
+        await db.auctions.insert_one({"auction_id": "a", "status": "activa", "state": "Jalisco",
+                                      "start_date": datetime(2025, 10, 1), "end_date": datetime(2025, 10, 2)})
+        await db.auction_items.insert_one({"item_id": "i", "auction_id": "a", "lot_order": 0, "category": "vehiculos",
+                                           "starting_price": 10.0, "current_bid": 10.0, "bid_count": 0,
+                                           "auction_status": "activa"})
+        await db.users.insert_one({"user_id": "u", "email": "u@correo.mx"})
+        await db.proxy_bids.insert_one({"item_id": "i", "user_id": "u", "max_amount": 20.0, "created_at": datetime(2025, 10, 1)})
+        await db.registrations.insert_one({"auction_id": "a", "user_id": "u", "created_at": datetime(2025, 10, 1)})
+        await db.image_variants.insert_one({"_id": variant_id("0" * 64, "card", "webp"), "size": "card"})
+
+    asyncio.run(prepare())
+    # Motor clients bind to the event loop they first run on, so each asyncio.run takes its own.
+    return mongo_db
+
+
+@pytest.mark.parametrize("name", query_names())
+def test_query_uses_an_index(server, indexed_db, name):
+    async def explain():
+        return await indexed_db().command({"explain": api_queries(server)[name], "verbosity": "queryPlanner"})
+
+    stages = plan_stages(winning_plan(asyncio.run(explain())))
+    assert "COLLSCAN" not in stages, f"{name}: {stages}"
@@ -0,0 +1,159 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from lifecycle import AuctionLifecycle
+
+START = datetime(2025, 10, 9, 9)
+END = datetime(2025, 10, 9, 18)
+
+
+def matches(document, query):
+    """The filters AuctionLifecycle sends: equality, $or, $in, $ne, $gt and $lte."""
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(document, branch) for branch in condition):
+                return False
+            continue
+        value = document.get(field)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for name, operand in condition.items():
+            if name == "$eq" and value != operand or name == "$ne" and value == operand:
+                return False
+            if name == "$in" and value not in operand:
+                return False
+            if name == "$gt" and not value > operand or name == "$lte" and not value <= operand:
+                return False
+    return True
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+        self.writes = []
+
+    async def distinct(self, key, query):
+        return sorted({document[key] for document in self.documents if matches(document, query)})
+
+    async def update_many(self, query, update):
+        matched = [document for document in self.documents if matches(document, query)]
+        for document in matched:
+            document.update(update["$set"])
+            self.writes.append(dict(update["$set"]))
+        return SimpleNamespace(modified_count=len(matched))
+
+    async def update_one(self, query, update):
+        for document in self.documents:
+            if matches(document, query):
+                document.update(update["$set"])
+                self.writes.append(dict(update["$set"]))
+                return SimpleNamespace(modified_count=1)
+        return SimpleNamespace(modified_count=0)
+
+    async def find(self, query, projection):
+        for document in self.documents:
+            if matches(document, query):
+                yield {key: document[key] for key in projection if key in document}
+
+
+class FakeDB:
+    """One auction from START to END with two lots, stored with the given status."""
+
+    def __init__(self, status="proxima"):
+        self.auctions = FakeCollection([{"auction_id": "subasta", "status": status, "start_date": START, "end_date": END}])
+        self.auction_items = FakeCollection([
+            {"item_id": f"lote-{n}", "auction_id": "subasta", "auction_status": status} for n in range(2)
+        ])
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def scheduler(db, clock, changes):
+    return AuctionLifecycle(db, lambda changed, written: changes.append((clock(), changed, written)), clock=clock)
+
+
+def statuses(db):
+    return db.auctions.documents[0]["status"], {item["auction_status"] for item in db.auction_items.documents}
+
+
+def test_auction_flips_at_its_dates():
+    db, clock, changes = FakeDB(), Clock(START - timedelta(hours=1)), []
+    lifecycle = scheduler(db, clock, changes)
+
+    async def sleep(seconds):
+        # Time passes instantly: the scheduler wakes exactly when it asked to.
+        clock.now += timedelta(seconds=seconds)
+        await asyncio.sleep(0)
+
+    async def run_until_ended():
+        lifecycle._sleep = sleep
+        await lifecycle.start()
+        while len(changes) < 2:
+            await asyncio.sleep(0)
+        await lifecycle.stop()
+
+    asyncio.run(run_until_ended())
+    assert changes == [
+        (START, {"subasta": "activa"}, {"subasta"}),
+        (END, {"subasta": "finalizada"}, {"subasta"}),
+    ]
+    assert statuses(db) == ("finalizada", {"finalizada"})
+
+
+def test_restart_catches_up_on_missed_transitions():
+    db, clock, changes = FakeDB(), Clock(END + timedelta(hours=1)), []
+    lifecycle = scheduler(db, clock, changes)
+
+    async def restart():
+        await lifecycle.start()
+        await lifecycle.stop()
+
+    asyncio.run(restart())
+    # Down through both dates: the auction goes straight to its final status, and nothing is left to schedule.
+    assert changes == [(clock.now, {"subasta": "finalizada"}, {"subasta"})]
+    assert statuses(db) == ("finalizada", {"finalizada"})
+    assert lifecycle.heap == []
+
+    # Down through the start only: the end is still scheduled.
+    db, clock.now = FakeDB(), START + timedelta(hours=1)
+    lifecycle = scheduler(db, clock, changes)
+    asyncio.run(lifecycle.apply())
+    asyncio.run(lifecycle.load())
+    assert statuses(db) == ("activa", {"activa"})
+    assert lifecycle.heap == [(END, "subasta")]
+
+
+def test_two_schedulers_write_a_transition_once(server, run, monkeypatch):
+    db, clock, changes = FakeDB("activa"), Clock(END), []
+    first, second = scheduler(db, clock, changes), scheduler(db, clock, changes)
+
+    async def both_due():
+        # Both were due on each worker's heap; one applies it before the other.
+        await first.apply({"subasta"})
+        await second.apply({"subasta"})
+
+    asyncio.run(both_due())
+    assert len(db.auctions.writes) == 1
+    assert len(db.auction_items.writes) == 2  # the lot status copy: one write per lot, not per scheduler
+    assert [(changed, written) for _, changed, written in changes] == [
+        ({"subasta": "finalizada"}, {"subasta"}),
+        ({"subasta": "finalizada"}, set()),
+    ]
+
+    # Both workers notify their listeners, but only the one that wrote schedules settlement.
+    scheduled = []
+    monkeypatch.setattr(server.settlement, "schedule", scheduled.extend)
+
+    async def notify_both():
+        for _, changed, written in changes:
+            server.auction_statuses_changed(changed, written)
+
+    run(notify_both)
+    assert scheduled == ["subasta"]
@@ -0,0 +1,86 @@
+import itertools
+from types import SimpleNamespace
+
+from metrics import MongoCommandListener, render
+
+request_ids = itertools.count(1)
+
+
+def sample(name, **labels):
+    """Value of one sample in a scrape, or 0.0 if it is not there yet."""
+    from prometheus_client.parser import text_string_to_metric_families
+
+    body, _ = render()
+    for family in text_string_to_metric_families(body.decode()):
+        for metric in family.samples:
+            if metric.name == name and metric.labels == labels:
+                return metric.value
+    return 0.0
+
+
+def command_events(command_name, command, duration_micros=1500):
+    """The started and succeeded events pymongo hands a CommandListener for one command."""
+    request_id = next(request_ids)
+    started = SimpleNamespace(command_name=command_name, command=command, connection_id=("127.0.0.1", 27017),
+                              request_id=request_id)
+    succeeded = SimpleNamespace(command_name=command_name, connection_id=("127.0.0.1", 27017), request_id=request_id,
+                                duration_micros=duration_micros)
+    return started, succeeded
+
+
+def test_requests_are_labelled_by_route_template(client):
+    item_id = client.get("/api/search/items", params={"q": "motor"}).json()["hits"][0]["item"]["item_id"]
+    labels = {"method": "GET", "route": "/api/items/{item_id}", "status": "200"}
+    before = sample("http_requests_total", **labels)
+    assert client.get(f"/api/items/{item_id}").status_code == 200
+    assert client.get("/api/items/no-existe").status_code == 404
+
+    assert sample("http_requests_total", **labels) == before + 1
+    assert sample("http_requests_total", **{**labels, "status": "404"}) >= 1
+    assert sample("http_request_duration_seconds_count", method="GET", route="/api/items/{item_id}") >= 2
+    body = client.get("/metrics").text
+    assert f"/api/items/{item_id}" not in body
+    assert "/api/items/no-existe" not in body
+
+
+def test_unmatched_paths_share_one_label(client):
+    before = sample("http_requests_total", method="GET", route="unmatched", status="404")
+    for n in range(3):
+        assert client.get(f"/escaneo-{n}").status_code == 404
+    assert sample("http_requests_total", method="GET", route="unmatched", status="404") == before + 3
+
+
+def test_mongo_commands_are_timed_by_name_and_collection():
+    listener = MongoCommandListener()
+    labels = {"command": "find", "collection": "auction_items"}
+    before = sample("mongodb_command_duration_seconds_count", **labels)
+    before_sum = sample("mongodb_command_duration_seconds_sum", **labels)
+    for _ in range(2):
+        started, succeeded = command_events("find", {"find": "auction_items", "filter": {"item_id": "x"}})
+        listener.started(started)
+        listener.succeeded(succeeded)
+
+    started, failed = command_events("insert", {"insert": "bids", "documents": []})
+    failures = sample("mongodb_command_failures_total", command="insert", collection="bids")
+    listener.started(started)
+    listener.failed(failed)
+
+    assert sample("mongodb_command_duration_seconds_count", **labels) == before + 2
+    assert abs(sample("mongodb_command_duration_seconds_sum", **labels) - before_sum - 0.003) < 1e-9
+    assert sample("mongodb_command_failures_total", command="insert", collection="bids") == failures + 1
+    assert not listener.pending
+
+
+def test_mongo_commands_are_timed_on_mongod(mongo_client, mongo_db):
+    from pymongo import MongoClient
+
+    listener = MongoCommandListener()
+    labels = {"command": "find", "collection": "metrics_probe"}
+    before = sample("mongodb_command_duration_seconds_count", **labels)
+    host, port = mongo_client.address
+    client = MongoClient(host, port, event_listeners=[listener])
+    try:
+        client[mongo_db().name].metrics_probe.find_one({"item_id": "x"})
+    finally:
+        client.close()
+    assert sample("mongodb_command_duration_seconds_count", **labels) == before + 1
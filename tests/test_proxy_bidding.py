@@ -0,0 +1,78 @@
+import asyncio
+import logging
+
+from proxy_bidding import ProxyBidEngine, resolve_proxies
+
+logger = logging.getLogger(__name__)
+
+
+def step(price):
+    return 1000.0
+
+
+def proxy(user_id, max_amount):
+    return {"user_id": user_id, "max_amount": max_amount}
+
+
+def test_single_proxy_beats_the_standing_bid_by_one_increment():
+    assert resolve_proxies(50000.0, "manual", [proxy("a", 80000.0)], step) == (51000.0, "a")
+
+
+def test_winner_pays_one_increment_over_the_runner_up():
+    proxies = [proxy("a", 80000.0), proxy("b", 60000.0)]
+    assert resolve_proxies(50000.0, "manual", proxies, step) == (61000.0, "a")
+
+
+def test_price_is_capped_at_the_winner_ceiling():
+    proxies = [proxy("a", 60500.0), proxy("b", 60000.0)]
+    assert resolve_proxies(50000.0, "manual", proxies, step) == (60500.0, "a")
+
+
+def test_tie_goes_to_the_ceiling_set_first():
+    # proxies come sorted by max_amount desc, created_at asc: "a" set its ceiling first.
+    proxies = [proxy("a", 60000.0), proxy("b", 60000.0)]
+    assert resolve_proxies(50000.0, "manual", proxies, step) == (60000.0, "a")
+
+
+def test_ceiling_below_the_next_bid_does_not_bid():
+    assert resolve_proxies(50000.0, "manual", [proxy("a", 50500.0)], step) is None
+    assert resolve_proxies(50000.0, "manual", [], step) is None
+
+
+def test_leading_bidder_holds_without_a_challenger():
+    assert resolve_proxies(61000.0, "a", [proxy("a", 80000.0)], step) is None
+    # A lower ceiling from someone else still leaves the leader where it is, if already above it.
+    assert resolve_proxies(61000.0, "a", [proxy("a", 80000.0), proxy("b", 55000.0)], step) is None
+
+
+def test_leading_bidder_is_raised_by_a_new_challenger():
+    proxies = [proxy("a", 80000.0), proxy("b", 70000.0)]
+    assert resolve_proxies(61000.0, "a", proxies, step) == (71000.0, "a")
+
+
+def test_proxy_war_on_mongod(server, mongo_db):
+    """Competing ceilings settle in at most one write each on mongod; the timing is logged, not asserted."""
+    import time
+
+    from pymongo import ASCENDING, DESCENDING
+
+    async def check():
+        db = mongo_db()
+        await db.proxy_bids.create_index([("item_id", ASCENDING), ("max_amount", DESCENDING), ("created_at", ASCENDING)])
+        await db.proxy_bids.create_index([("item_id", ASCENDING), ("user_id", ASCENDING)], unique=True)
+        await db.auction_items.insert_one({"item_id": "lote", "auction_status": "activa", "current_bid": 50000.0,
+                                           "high_bidder_id": "manual", "bid_count": 1})
+        engine = ProxyBidEngine(db, server.bid_increment)
+        ceilings = [50000.0 + 500.0 * n for n in range(1, 1001)]
+        started = time.perf_counter()
+        for n, ceiling in enumerate(ceilings):
+            await engine.set_ceiling("lote", f"postor-{n}", ceiling)
+            await engine.resolve("lote")
+        elapsed = time.perf_counter() - started
+        item = await db.auction_items.find_one({"item_id": "lote"})
+        assert item["high_bidder_id"] == "postor-999"
+        assert item["current_bid"] == min(ceilings[-1], ceilings[-2] + server.bid_increment(ceilings[-2]))
+        assert 0 < item["bid_count"] - 1 <= len(ceilings)
+        logger.info("%d proxy ceilings resolved in %.3f s, %d writes", len(ceilings), elapsed, item["bid_count"] - 1)
+
+    asyncio.run(check())
@@ -0,0 +1,160 @@
+import asyncio
+import itertools
+import logging
+from types import SimpleNamespace
+
+from query_profiler import QueryProfiler, QueryProfilerMiddleware, current_profile
+
+request_ids = itertools.count(1)
+
+COLLSCAN_EXPLAIN = {
+    "queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}, "rejectedPlans": []},
+    "executionStats": {"nReturned": 1, "executionTimeMillis": 12, "totalKeysExamined": 0, "totalDocsExamined": 5000,
+                       "executionStages": {"stage": "COLLSCAN"}},
+}
+
+
+class FakeClient:
+    """Answers every explain with COLLSCAN_EXPLAIN and remembers what it was asked."""
+
+    def __init__(self):
+        self.commands = []
+
+    def __getitem__(self, database):
+        async def command(document):
+            self.commands.append((database, document))
+            return COLLSCAN_EXPLAIN
+        return SimpleNamespace(command=command)
+
+
+def run_command(profiler, command_name, command, duration_micros=2000):
+    """Feed the profiler the events of one command, as the driver would."""
+    request_id = next(request_ids)
+    connection_id = ("127.0.0.1", 27017)
+    profiler.started(SimpleNamespace(
+        command_name=command_name, database_name="auction_db", connection_id=connection_id, request_id=request_id,
+        command={**command, "lsid": {"id": "sesion"}, "$db": "auction_db"},
+    ))
+    profiler.succeeded(SimpleNamespace(connection_id=connection_id, request_id=request_id, duration_micros=duration_micros))
+
+
+def lot_lookup(item_id):
+    return {"find": "auction_items", "filter": {"item_id": item_id}, "limit": 1}
+
+
+def test_repeated_query_shape_is_reported_as_n_plus_one(caplog):
+    profiler = QueryProfiler(slow_ms=1000, max_queries=2)
+    profile = profiler.begin("GET", "/api/auctions/subasta-1")
+    token = current_profile.set(profile)
+    for item_id in ("lote-1", "lote-2", "lote-3"):
+        run_command(profiler, "find", lot_lookup(item_id))
+    current_profile.reset(token)
+    profile.route = "/api/auctions/{auction_id}"
+
+    with caplog.at_level(logging.WARNING, logger="query_profiler"):
+        asyncio.run(profiler.finish(profile, FakeClient()))
+    assert profile.n_plus_one == {"command": "find", "collection": "auction_items", "filter": ["item_id"], "repeats": 3}
+    assert "GET /api/auctions/{auction_id} issued 3 queries (limit 2)" in caplog.text
+    assert profiler.recent()[0]["n_plus_one"]["repeats"] == 3
+
+
+def test_slow_commands_are_explained():
+    profiler = QueryProfiler(slow_ms=5, max_queries=20)
+    client = FakeClient()
+    profile = profiler.begin("GET", "/api/search/auctions")
+    token = current_profile.set(profile)
+    run_command(profiler, "find", lot_lookup("lote-1"), duration_micros=20000)
+    run_command(profiler, "find", lot_lookup("lote-2"), duration_micros=1000)
+    run_command(profiler, "insert", {"insert": "bids", "documents": []}, duration_micros=20000)
+    current_profile.reset(token)
+
+    asyncio.run(profiler.finish(profile, client))
+    slow, fast, write = profile.commands
+    assert slow.explain == {"docs_examined": 5000, "keys_examined": 0, "returned": 1, "execution_ms": 12, "indexes": [],
+                            "collection_scan": True}
+    assert fast.explain is None
+    assert write.explain is None  # insert cannot be explained
+    # The command is explained as the application sent it, without the driver's session fields.
+    assert client.commands == [
+        ("auction_db", {"explain": lot_lookup("lote-1"), "verbosity": "executionStats"}),
+    ]
+    assert profile.n_plus_one is None
+
+
+def test_commands_outside_a_request_are_not_recorded():
+    profiler = QueryProfiler()
+    run_command(profiler, "find", lot_lookup("lote-1"))
+    assert not profiler.pending
+    assert profiler.profiles == {}
+
+
+def test_middleware_tags_the_response_and_keeps_the_profile():
+    profiler = QueryProfiler(slow_ms=1000, max_queries=20)
+
+    async def app(scope, receive, send):
+        run_command(profiler, "find", lot_lookup("lote-1"), duration_micros=3000)
+        scope["route"] = SimpleNamespace(path="/api/items/{item_id}")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    middleware = QueryProfilerMiddleware(app, profiler, FakeClient())
+    sent = []
+
+    async def request():
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware({"type": "http", "method": "GET", "path": "/api/items/lote-1"}, receive, send)
+        await asyncio.gather(*middleware.tasks)
+
+    asyncio.run(request())
+    headers = dict(sent[0]["headers"])
+    assert headers[b"x-query-profile"] == b"1"
+    assert headers[b"server-timing"] == b'mongo;dur=3.000;desc="1 queries"'
+    profile = profiler.profiles["1"].as_dict()
+    assert (profile["route"], profile["status"], profile["queries"]) == ("/api/items/{item_id}", 200, 1)
+
+
+def test_n_plus_one_and_explain_on_mongod(mongo_client, mongo_db, caplog):
+    """The request's context reaches the listener through Motor's executor, and mongod explains the scan."""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    profiler = QueryProfiler(slow_ms=0, max_queries=2)
+    host, port = mongo_client.address
+    name = mongo_db().name
+
+    async def request():
+        client = AsyncIOMotorClient(host, port, event_listeners=[profiler])
+        lots = client[name].auction_items
+        await lots.insert_many([{"item_id": f"lote-{n}", "auction_id": "subasta"} for n in range(50)])
+
+        async def app(scope, receive, send):
+            for n in range(3):
+                await lots.find_one({"item_id": f"lote-{n}"})
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            pass
+
+        middleware = QueryProfilerMiddleware(app, profiler, client)
+        await middleware({"type": "http", "method": "GET", "path": "/api/auctions/subasta"}, receive, send)
+        await asyncio.gather(*middleware.tasks)
+        client.close()
+
+    with caplog.at_level(logging.WARNING, logger="query_profiler"):
+        asyncio.run(request())
+    profile = next(iter(profiler.profiles.values()))
+    assert [command.name for command in profile.commands] == ["find", "find", "find"]
+    assert profile.n_plus_one["repeats"] == 3
+    assert "issued 3 queries" in caplog.text
+    # No index on item_id in the scratch collection: find_one scans until it finds the lot.
+    explain = profile.commands[2].explain
+    assert explain["collection_scan"]
+    assert (explain["docs_examined"], explain["returned"]) == (3, 1)
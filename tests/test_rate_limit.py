@@ -0,0 +1,139 @@
+import asyncio
+
+from rate_limit import MAX_BODY_BYTES, AdmissionControl, AdmissionRule, ConcurrencyLimit, TokenBuckets, json_body_field
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills():
+    clock = Clock()
+    buckets = TokenBuckets(2, 60.0, 100, clock)
+    assert buckets.take("ip") == 0.0
+    assert buckets.take("ip") == 0.0
+    assert buckets.take("ip") == 30.0
+    clock.now += 30.0
+    assert buckets.take("ip") == 0.0
+    assert buckets.rejected == 1
+
+
+def test_token_buckets_are_bounded():
+    buckets = TokenBuckets(1, 60.0, 2, Clock())
+    for key in ("a", "b", "c"):
+        buckets.take(key)
+    assert len(buckets) == 2
+    assert buckets.take("a") == 0.0  # forgotten, so it comes back full
+
+
+def scope(headers=(), client=("10.0.0.9", 5000)):
+    return {
+        "type": "http", "method": "POST", "path": "/api/auth/login", "client": client,
+        "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+    }
+
+
+def client_ip(trusted_proxies, forwarded=None):
+    control = AdmissionControl(None, [], trusted_proxies=trusted_proxies)
+    request = scope([("x-forwarded-for", forwarded)] if forwarded is not None else [])
+    headers = {key.decode(): value.decode() for key, value in request["headers"]}
+    return control.client_ip(request, headers)
+
+
+def test_client_ip_ignores_forwarded_for_by_default():
+    assert client_ip(0, "1.1.1.1") == "10.0.0.9"
+
+
+def test_client_ip_takes_the_entry_added_by_the_trusted_proxy():
+    # The client sent "6.6.6.6" itself; the proxy appended the address it saw.
+    assert client_ip(1, "6.6.6.6, 203.0.113.7") == "203.0.113.7"
+    assert client_ip(2, "6.6.6.6, 203.0.113.7, 10.0.0.2") == "203.0.113.7"
+    assert client_ip(1, "203.0.113.7") == "203.0.113.7"
+
+
+def test_client_ip_with_fewer_entries_than_trusted_proxies():
+    assert client_ip(2, "203.0.113.7") == "10.0.0.9"
+    assert client_ip(1) == "10.0.0.9"
+
+
+def run_request(control, request, body=b""):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(control(request, receive, send))
+    return sent[0]["status"], dict(sent[0]["headers"])
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def test_rejects_with_retry_after():
+    per_ip = TokenBuckets(1, 60.0, 100, Clock())
+    control = AdmissionControl(ok_app, [AdmissionRule("POST", "/api/auth/login", per_ip=per_ip)])
+    assert run_request(control, scope())[0] == 200
+    status, headers = run_request(control, scope())
+    assert status == 429
+    assert headers[b"retry-after"] == b"60"
+
+
+def test_per_account_limit_reads_the_body():
+    per_account = TokenBuckets(1, 60.0, 100, Clock())
+    rule = AdmissionRule("POST", "/api/auth/login", per_account=per_account, account=json_body_field("email"), read_body=True)
+    control = AdmissionControl(ok_app, [rule])
+    assert run_request(control, scope(), b'{"email": "Ana@Correo.mx"}')[0] == 200
+    assert run_request(control, scope(), b'{"email": "ana@correo.mx"}')[0] == 429
+    assert run_request(control, scope(), b'{"email": "luis@correo.mx"}')[0] == 200
+
+
+def test_padded_body_cannot_skip_the_per_account_limit():
+    per_account = TokenBuckets(1, 60.0, 100, Clock())
+    rule = AdmissionRule("POST", "/api/auth/login", per_account=per_account, account=json_body_field("email"), read_body=True)
+    control = AdmissionControl(ok_app, [rule])
+    assert run_request(control, scope(), b'{"email": "ana@correo.mx"}')[0] == 200
+    padded = b'{"email": "ana@correo.mx", "padding": "' + b"x" * MAX_BODY_BYTES + b'"}'
+    assert run_request(control, scope(), padded)[0] == 413
+    # Padding that still fits is read and charged to the account.
+    assert run_request(control, scope(), b'{"email": "ana@correo.mx", "padding": "xxxx"}')[0] == 429
+
+
+def test_concurrency_rejection_takes_no_tokens():
+    per_ip = TokenBuckets(2, 60.0, 100, Clock())
+    concurrency = ConcurrencyLimit(1)
+    control = AdmissionControl(ok_app, [AdmissionRule("POST", "/api/auth/login", per_ip=per_ip, concurrency=concurrency)])
+
+    concurrency.try_acquire()  # a request already in flight
+    for _ in range(5):
+        assert run_request(control, scope())[0] == 429
+    concurrency.release()
+
+    assert run_request(control, scope())[0] == 200
+    assert run_request(control, scope())[0] == 200
+    assert per_ip.rejected == 0
+    assert concurrency.in_flight == 0
+
+
+def test_rate_limited_request_releases_its_slot():
+    per_ip = TokenBuckets(1, 60.0, 100, Clock())
+    concurrency = ConcurrencyLimit(1)
+    control = AdmissionControl(ok_app, [AdmissionRule("POST", "/api/auth/login", per_ip=per_ip, concurrency=concurrency)])
+    assert run_request(control, scope())[0] == 200
+    assert run_request(control, scope())[0] == 429
+    assert concurrency.in_flight == 0
+
+
+def test_other_routes_pass_through():
+    per_ip = TokenBuckets(1, 60.0, 100, Clock())
+    control = AdmissionControl(ok_app, [AdmissionRule("POST", "/api/items/{item_id}/bids", per_ip=per_ip)])
+    for _ in range(3):
+        assert run_request(control, scope())[0] == 200
@@ -0,0 +1,246 @@
+import pytest
+
+from repositories import project, slice_array
+
+IMAGES = ["a", "b", "c", "d"]
+
+
+def test_slice_array_find_forms():
+    assert slice_array(IMAGES, 1) == ["a"]
+    assert slice_array(IMAGES, 0) == []
+    assert slice_array(IMAGES, -2) == ["c", "d"]
+    assert slice_array(IMAGES, 10) == IMAGES
+    assert slice_array(IMAGES, [1, 2]) == ["b", "c"]
+    assert slice_array(IMAGES, [-3, 2]) == ["b", "c"]
+    assert slice_array(IMAGES, [-10, 2]) == ["a", "b"]
+    assert slice_array("portada", 1) == "portada"
+
+
+@pytest.mark.parametrize("spec", [["$images", 1], [1, 0], "1", True])
+def test_slice_array_rejects_what_mongod_rejects(spec):
+    with pytest.raises(ValueError):
+        slice_array(IMAGES, spec)
+
+
+def test_project_slices_only_the_projected_array():
+    document = {"_id": "x", "item_id": "1", "name": "Grúa", "images": IMAGES, "description": "larga"}
+    assert project(document, {"_id": 0, "item_id": 1, "images": {"$slice": 1}}) == {"item_id": "1", "images": ["a"]}
+    assert project({"item_id": "2"}, {"_id": 0, "item_id": 1, "images": {"$slice": 1}}) == {"item_id": "2"}
+
+
+def test_card_view_projection_on_mongod(server, mongo_db):
+    """mongod accepts the card view as a find projection and keeps only the cover image."""
+    import asyncio
+
+    async def check():
+        collection = mongo_db().card_view
+        await collection.insert_one({"item_id": "1", "auction_id": "a", "lot_order": 0, "name": "Grúa", "images": IMAGES})
+        projection = server.sparse_projection(server.ITEM_PROJECTION, server.ITEM_KEY_FIELDS, server.ITEM_VIEWS, None, "card")
+        document = await collection.find_one({"item_id": "1"}, projection)
+        assert document["images"] == ["a"]
+        assert "description" not in document
+
+    asyncio.run(check())
+
+
+# The memory engine must shape documents exactly like mongod for every projection the API uses.
+def stored_auctions():
+    from datetime import datetime
+
+    from bson import ObjectId
+
+    return [
+        {"_id": ObjectId(), "auction_id": f"subasta-{n}", "title": f"Subasta {n}", "description": "Liquidación",
+         "reason": "cierre_empresa", "company_name": "Pruebas S.A.", "start_date": datetime(2025, 10, n + 1, 9),
+         "end_date": datetime(2025, 10, n + 2, 18), "status": "activa", "location": "Monterrey", "state": "Nuevo León",
+         "total_items": 2, "created_at": datetime(2025, 9, 1)}
+        for n in range(3)
+    ] + [
+        # Written before registered_count and registration_fee existed.
+        {"_id": ObjectId(), "auction_id": "subasta-vieja", "title": "Subasta vieja", "description": "Antigua",
+         "reason": "renovacion_flotilla", "company_name": "Pruebas S.A.", "start_date": datetime(2025, 10, 1, 9),
+         "end_date": datetime(2025, 10, 2, 18), "status": "finalizada", "location": "Saltillo", "state": "Coahuila",
+         "created_at": datetime(2025, 9, 1)},
+    ]
+
+
+def stored_items():
+    from bson import ObjectId
+
+    items = [
+        {"_id": ObjectId(), "item_id": f"lote-{n}", "name": f"Lote {n}", "description": "Camión de carga",
+         "category": "camiones", "subcategory": "carga", "brand": "Kenworth", "model": "T680", "year": 2019,
+         "starting_price": 900000.0, "current_bid": 950000.0 + n, "estimated_value": {"min": 900000.0, "max": 1200000.0},
+         "images": [f"{n:064x}", f"{n + 1:064x}"], "condition": "bueno", "mileage": 120000, "specifications": {"motor": "X15"},
+         "location": "Monterrey", "auction_id": "subasta-0", "auction_status": "activa", "lot_order": 2 - n, "bid_count": n}
+        for n in range(3)
+    ]
+    # Written before model, year, auction_status and bid_count existed; startup backfills lot_order.
+    items.append({"_id": ObjectId(), "item_id": "lote-viejo", "name": "Lote viejo", "description": "Montacargas",
+                  "category": "maquinaria", "subcategory": "montacargas", "brand": "Toyota", "starting_price": 50000.0,
+                  "current_bid": 50000.0, "estimated_value": {"min": 40000.0, "max": 60000.0}, "images": [],
+                  "condition": "regular", "specifications": {}, "location": "Saltillo", "auction_id": "subasta-0",
+                  "lot_order": 0})
+    return items
+
+
+def item_projections(server):
+    views = [server.sparse_projection(server.ITEM_PROJECTION, server.ITEM_KEY_FIELDS, server.ITEM_VIEWS, fields, view)
+             for fields, view in [(None, None), (None, "card"), ("name,current_bid,bid_count", None), ("year,model", "card")]]
+    return views + [server.SEARCH_INDEX_PROJECTION, {"current_bid": 1, "bid_count": 1, "auction_status": 1}, None]
+
+
+def auction_projections(server):
+    views = [server.sparse_projection(server.AUCTION_PROJECTION, server.AUCTION_KEY_FIELDS, server.AUCTION_VIEWS, fields, view)
+             for fields, view in [(None, None), (None, "card"), ("registered_count,registration_fee", None)]]
+    return views + [server.AUCTION_PROJECTION, {"status": 1}, None]
+
+
+def test_memory_projections_fill_model_defaults(server, run):
+    from repositories import MemoryAuctionRepository, MemoryItemRepository
+
+    auctions, items = MemoryAuctionRepository(), MemoryItemRepository(server.min_next_bid)
+    for document in stored_auctions():
+        run(auctions.insert, document)
+    for document in stored_items():
+        run(items.insert, document)
+
+    old = run(items.get, "lote-viejo", server.ITEM_PROJECTION)
+    assert "_id" not in old
+    assert (old["model"], old["year"], old["auction_status"], old["bid_count"]) == (None, None, None, 0)
+    server.AuctionItem.model_validate(old)
+    page = run(items.page, "subasta-0", None, 10, server.ITEM_PROJECTION)
+    assert [item["item_id"] for item in page] == ["lote-2", "lote-viejo", "lote-1", "lote-0"]
+    card = run(items.get, "lote-1", server.ITEM_VIEWS["card"])
+    assert card["images"] == [f"{1:064x}"]
+
+    old = run(auctions.get, "subasta-vieja", server.AUCTION_PROJECTION)
+    assert (old["registered_count"], old["registration_fee"]) == (0, 500.0)
+    server.Auction.model_validate(old)
+
+
+def test_memory_engine_matches_motor(server, mongo_db):
+    """Same documents, same calls, same projections: both engines return the same documents."""
+    import asyncio
+
+    from repositories import MemoryAuctionRepository, MemoryItemRepository, MotorAuctionRepository, MotorItemRepository
+
+    def by_id(documents, key):
+        return sorted(documents, key=lambda document: document.get(key, ""))
+
+    async def check():
+        db = mongo_db()
+        memory_auctions, memory_items = MemoryAuctionRepository(), MemoryItemRepository(server.min_next_bid)
+        motor_auctions = MotorAuctionRepository(db.parity_auctions)
+        motor_items = MotorItemRepository(db.parity_items, server.min_next_bid_expr())
+        for document in stored_auctions():
+            await memory_auctions.insert(document)
+            await motor_auctions.insert(dict(document))
+        for document in stored_items():
+            await memory_items.insert(document)
+            await motor_items.insert(dict(document))
+
+        item_ids = ["lote-viejo", "lote-1", "no-existe"]
+        for projection in item_projections(server):
+            for engine in (memory_items, motor_items):
+                assert await engine.get("no-existe", projection) is None
+            assert await memory_items.get("lote-viejo", projection) == await motor_items.get("lote-viejo", projection)
+            assert await memory_items.page("subasta-0", None, 10, projection) == await motor_items.page("subasta-0", None, 10, projection)
+            assert await memory_items.page("subasta-0", (0, "lote-viejo"), 2, projection) == await motor_items.page("subasta-0", (0, "lote-viejo"), 2, projection)
+            assert by_id(await memory_items.find_many(item_ids, projection), "item_id") == by_id(await motor_items.find_many(item_ids, projection), "item_id")
+
+        auction_ids = ["subasta-vieja", "subasta-2"]
+        for projection in auction_projections(server):
+            assert await memory_auctions.get("subasta-vieja", projection) == await motor_auctions.get("subasta-vieja", projection)
+            assert await memory_auctions.page(None, 10, projection) == await motor_auctions.page(None, 10, projection)
+            after = (stored_auctions()[1]["start_date"], "subasta-1")
+            assert await memory_auctions.page(after, 10, projection) == await motor_auctions.page(after, 10, projection)
+            assert by_id(await memory_auctions.find_many(auction_ids, projection), "auction_id") == by_id(await motor_auctions.find_many(auction_ids, projection), "auction_id")
+
+    asyncio.run(check())
+
+
+def search_cases(server):
+    """(item_match, auction_match, after) of searches with lot filters, auction filters, both and a cursor."""
+    after = (stored_auctions()[0]["start_date"], "subasta-0")
+    return [
+        (server.search_item_match("camiones", None, None), {}, None),
+        (server.search_item_match(None, 60000.0, None), {"status": "activa"}, None),
+        (server.search_item_match(None, None, 60000.0), {}, None),
+        ({}, {}, None),
+        ({}, {"state": "Coahuila"}, None),
+        ({}, {}, after),
+        (server.search_item_match("camiones", None, None), {}, after),
+    ]
+
+
+def test_memory_search(server, run):
+    from repositories import MemoryAuctionRepository, MemoryItemRepository, MemorySearchRepository
+
+    auctions, items = MemoryAuctionRepository(), MemoryItemRepository(server.min_next_bid)
+    for document in stored_auctions():
+        run(auctions.insert, document)
+    for document in stored_items():
+        run(items.insert, document)
+    search = MemorySearchRepository(auctions, items)
+
+    def find(item_match, auction_match, after=None, limit=10):
+        results = run(search.auctions, item_match, auction_match, after, limit, server.SEARCH_RESULT_PROJECTION)
+        return [(result["auction_id"], result["match_count"], result["min_price"], result["max_price"]) for result in results]
+
+    assert find(server.search_item_match("camiones", None, None), {}) == [("subasta-0", 3, 900000.0, 900000.0)]
+    assert find({}, {}) == [
+        ("subasta-0", 4, 50000.0, 900000.0), ("subasta-vieja", 0, None, None), ("subasta-1", 0, None, None),
+        ("subasta-2", 0, None, None),
+    ]
+    assert find({}, {"status": "activa"}, limit=2) == [("subasta-0", 4, 50000.0, 900000.0), ("subasta-1", 0, None, None)]
+    assert find(server.search_item_match(None, None, 60000.0), {"state": "Coahuila"}) == []
+    server.AuctionSearchResult.model_validate(
+        run(search.auctions, {}, {}, None, 1, server.SEARCH_RESULT_PROJECTION)[0],
+    )
+
+
+def test_memory_search_matches_motor(server, mongo_db):
+    """The pipeline and the memory scan return the same results for the same documents."""
+    import asyncio
+
+    from repositories import MemoryAuctionRepository, MemoryItemRepository, MemorySearchRepository, MotorSearchRepository
+
+    async def check():
+        db = mongo_db()
+        auctions, items = MemoryAuctionRepository(), MemoryItemRepository(server.min_next_bid)
+        for document in stored_auctions():
+            await auctions.insert(document)
+        for document in stored_items():
+            await items.insert(document)
+        # The pipeline joins the collections by name, so the scratch database uses the real ones.
+        await db.auctions.insert_many(stored_auctions())
+        await db.auction_items.insert_many(stored_items())
+        memory, motor = MemorySearchRepository(auctions, items), MotorSearchRepository(db.auctions, db.auction_items)
+        for item_match, auction_match, after in search_cases(server):
+            for limit in (1, 10):
+                expected = await motor.auctions(item_match, auction_match, after, limit, server.SEARCH_RESULT_PROJECTION)
+                assert await memory.auctions(item_match, auction_match, after, limit, server.SEARCH_RESULT_PROJECTION) == expected
+
+    asyncio.run(check())
+
+
+def test_memory_registrations(run):
+    from datetime import datetime
+
+    from repositories import MemoryRegistrationRepository
+
+    registrations = MemoryRegistrationRepository()
+    assert run(registrations.add, "subasta-1", "u", datetime(2025, 10, 2))
+    assert not run(registrations.add, "subasta-1", "u", datetime(2025, 10, 3))
+    assert run(registrations.add, "subasta-0", "u", datetime(2025, 10, 2))
+    assert run(registrations.add, "subasta-0", "otro", datetime(2025, 10, 1))
+
+    assert run(registrations.get, "subasta-1", "u")["created_at"] == datetime(2025, 10, 2)
+    assert run(registrations.get, "subasta-1", "otro") is None
+    page = run(registrations.page_for_user, "u", None, 10)
+    assert [registration["auction_id"] for registration in page] == ["subasta-0", "subasta-1"]
+    assert run(registrations.page_for_user, "u", (datetime(2025, 10, 2), "subasta-0"), 10) == [
+        {"auction_id": "subasta-1", "created_at": datetime(2025, 10, 2)},
+    ]
+    assert run(registrations.page_for_user, "nadie", None, 10) == []
@@ -0,0 +1,54 @@
+from response_cache import ResponseCache
+
+
+def cache_response(cache, key, scopes):
+    versions = cache.snapshot(scopes)
+    return cache.put(key, versions, key.encode(), {})
+
+
+def test_bumped_scope_invalidates_its_entries():
+    cache = ResponseCache(max_size=10, ttl=60)
+    cache_response(cache, "/api/auctions/subasta-1", ["auction:subasta-1"])
+    cache_response(cache, "/api/auctions/subasta-2", ["auction:subasta-2"])
+    cache.bump("auction:subasta-1")
+
+    assert cache.get("/api/auctions/subasta-1", ["auction:subasta-1"]) is None
+    assert cache.get("/api/auctions/subasta-2", ["auction:subasta-2"]) is not None
+
+
+def test_scope_versions_are_bounded():
+    cache = ResponseCache(max_size=2, ttl=60, max_scopes=3)
+    for n in range(100):
+        cache.bump(f"item:lote-{n}")
+    assert len(cache.versions) == 3
+    assert cache.stats()["scopes"] == 3
+
+
+def test_dropped_scope_does_not_revive_stale_entries():
+    cache = ResponseCache(max_size=10, ttl=60, max_scopes=2)
+    # Built before its scope was ever bumped, then made stale by a bump.
+    cache_response(cache, "/api/items/lote-1", ["item:lote-1"])
+    cache.bump("item:lote-1")
+    # Built after the bump, while the scope still has its own version.
+    cache_response(cache, "/api/items/lote-1?view=card", ["item:lote-1"])
+    cache.bump("item:lote-2", "item:lote-3")
+
+    assert "item:lote-1" not in cache.versions
+    assert cache.get("/api/items/lote-1", ["item:lote-1"]) is None
+    # Still current: the scope was not bumped after it was built.
+    assert cache.get("/api/items/lote-1?view=card", ["item:lote-1"]) is not None
+    # Entries built after the drop are served again.
+    cache_response(cache, "/api/items/lote-1", ["item:lote-1"])
+    assert cache.get("/api/items/lote-1", ["item:lote-1"]) is not None
+
+
+def test_invalidate_all_does_not_take_a_scope_slot():
+    cache = ResponseCache(max_size=10, ttl=60, max_scopes=1)
+    cache.bump("auctions")
+    cache_response(cache, "/api/auctions", ["auctions"])
+    cache.invalidate_all()
+
+    assert list(cache.versions) == ["auctions"]
+    assert cache.get("/api/auctions", ["auctions"]) is None
+    cache_response(cache, "/api/auctions", ["auctions"])
+    assert cache.get("/api/auctions", ["auctions"]) is not None
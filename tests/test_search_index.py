@@ -0,0 +1,92 @@
+from search_index import ItemSearchIndex, tokenize, year_bucket
+
+
+def lot(item_id, name, category="vehiculos", condition="bueno", year=2020, **fields):
+    return {"item_id": item_id, "name": name, "category": category, "subcategory": "pickup",
+            "condition": condition, "year": year, **fields}
+
+
+def build():
+    index = ItemSearchIndex()
+    index.add(lot("1", "Camioneta Ford Lobo", condition="excelente"), "Nuevo León")
+    index.add(lot("2", "Camioneta Chevrolet Silverado", condition="bueno"), "Jalisco")
+    index.add(lot("3", "Camioneta Nissan NP300", condition="regular", year=2012), "Nuevo León")
+    index.add(lot("4", "Grúa Genie", category="maquinaria", condition="bueno"), "Nuevo León")
+    index.reweight()
+    return index
+
+
+def test_tokenize_folds_stems_and_drops_stopwords():
+    assert tokenize("Camiones de Carga ELÉCTRICOS") == ["camion", "carga", "electrico"]
+    assert year_bucket(2023) == "2020-2024"
+    assert year_bucket(None) == "desconocido"
+
+
+def test_search_ranks_and_counts():
+    total, hits, facets = build().search("camionetas")
+    assert total == 3
+    assert {item_id for item_id, _ in hits} == {"1", "2", "3"}
+    assert facets["state"] == {"Nuevo León": 2, "Jalisco": 1}
+    assert build().search("inexistente") == (0, [], {facet: {} for facet in facets})
+
+
+def test_facet_counts_leave_out_their_own_filter():
+    total, hits, facets = build().search("camioneta", {"condition": "bueno"})
+    assert total == 1
+    assert [item_id for item_id, _ in hits] == ["2"]
+    # The other conditions are still offered, with what choosing them would give.
+    assert facets["condition"] == {"excelente": 1, "bueno": 1, "regular": 1}
+    assert facets["state"] == {"Jalisco": 1}
+
+
+def test_facet_counts_apply_the_other_filters():
+    _, _, facets = build().search("camioneta", {"condition": "bueno", "state": "Nuevo León"})
+    assert facets["condition"] == {"excelente": 1, "regular": 1}
+    assert facets["state"] == {"Jalisco": 1}
+    assert facets["year"] == {}
+
+
+def test_readding_a_lot_reuses_its_id():
+    index = build()
+    for round in range(50):
+        index.add(lot("2", f"Camioneta Chevrolet Silverado {round}"), "Jalisco")
+        index.remove("3")
+        index.add(lot("3", "Camioneta Nissan NP300", condition="regular", year=2012), "Nuevo León")
+    assert len(index.item_ids) == len(index.doc_terms) == len(index.lengths) == 4
+    assert index.free == []
+    total, hits, facets = index.search("camioneta")
+    assert total == 3
+    assert facets["condition"] == {"excelente": 1, "bueno": 1, "regular": 1}
+
+
+def test_removed_lot_is_not_found():
+    index = build()
+    index.remove("4")
+    assert index.search("grua")[0] == 0
+    assert len(index) == 3
+    index.add(lot("5", "Grúa JLG"), "Coahuila")
+    assert [item_id for item_id, _ in index.search("grua")[1]] == ["5"]
+    assert index.search("grua")[2]["state"] == {"Coahuila": 1}
+
+
+def test_status_change_refreshes_facets_of_the_auction_lots(server, run):
+    """auction_statuses_changed re-reads the lots of the auctions, and their auction's state."""
+    import asyncio
+
+    auction = run(server.repos.auctions.page, None, 1, {"_id": 0, "auction_id": 1, "state": 1})[0]
+    item = run(server.repos.items.page, auction["auction_id"], None, 1, {"_id": 0, "item_id": 1})[0]
+    column = server.item_search_index.facets["state"]
+    doc = server.item_search_index.doc_ids[item["item_id"]]
+    try:
+        run(server.repos.auctions.set_fields, auction["auction_id"], {"state": "Zacatecas"})
+
+        async def change_and_wait():
+            server.auction_statuses_changed({auction["auction_id"]: "activa"}, set())
+            await asyncio.gather(*server.search_reindex_tasks)
+
+        run(change_and_wait)
+        assert column.labels[column.codes[server.item_search_index.doc_ids[item["item_id"]]]] == "Zacatecas"
+    finally:
+        run(server.repos.auctions.set_fields, auction["auction_id"], {"state": auction["state"]})
+        run(server.reindex_auctions, [auction["auction_id"]])
+    assert server.item_search_index.doc_ids[item["item_id"]] == doc
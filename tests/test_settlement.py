@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from settlement import SettlementEngine
+
+
+class FakeAuctions:
+    def __init__(self, failures):
+        self.failures = failures
+        self.lookups = 0
+
+    async def distinct(self, key, query):
+        self.lookups += 1
+        if self.lookups <= self.failures:
+            raise ConnectionError("mongod unreachable")
+        return []
+
+
+class FakeDB:
+    def __init__(self, failures=0):
+        self.auctions = FakeAuctions(failures)
+
+
+def test_pending_settlements_are_looked_for_periodically():
+    db = FakeDB(failures=1)
+    engine = SettlementEngine(db, retry_interval=0.01)
+
+    async def run_for_a_while():
+        engine.start()
+        await asyncio.sleep(0.1)
+        await engine.stop()
+        await asyncio.sleep(0)
+
+    asyncio.run(run_for_a_while())
+    # The first pass failed; the loop kept going instead of waiting for a restart.
+    assert db.auctions.lookups >= 3
+    assert not engine.tasks
+
+
+def test_failed_settlement_is_retried_by_the_next_pass(monkeypatch):
+    engine = SettlementEngine(FakeDB())
+    attempts = []
+
+    async def settle(auction_id):
+        attempts.append(auction_id)
+        if len(attempts) == 1:
+            raise RuntimeError("bulk_write failed")
+        return {"state": "liquidada"}
+
+    monkeypatch.setattr(engine, "settle", settle)
+    asyncio.run(engine.settle_many(["subasta-1", "subasta-2"]))
+    asyncio.run(engine.settle_many(["subasta-1"]))
+    assert attempts == ["subasta-1", "subasta-2", "subasta-1"]
+
+
+def test_settles_5000_lots_on_mongod(mongo_db):
+    """One aggregation pass and bulk writes settle a large auction; the time is recorded on it."""
+
+    async def check():
+        db = mongo_db()
+        ended = datetime.utcnow() - timedelta(hours=1)
+        await db.auctions.insert_one({"auction_id": "grande", "status": "finalizada", "end_date": ended})
+        await db.auction_items.insert_many([
+            {"item_id": f"lote-{n}", "auction_id": "grande", "current_bid": 1000.0 + n, "bid_count": n % 3,
+             "high_bidder_id": f"postor-{n % 7}" if n % 3 else None, "specifications": {}}
+            for n in range(5000)
+        ])
+        await db.auction_items.create_index("auction_id")
+        await db.auction_items.create_index("item_id", unique=True)
+        summary = await SettlementEngine(db).settle("grande")
+        assert summary["lots"] == 5000
+        assert summary["sin_pujas"] == 1667
+        assert summary["vendido"] == 3333
+        assert summary["winning_bidders"] == 7
+        assert summary["seconds"] >= 0
+        assert await db.auction_items.count_documents({"settlement.result": {"$exists": True}}) == 5000
+
+    asyncio.run(check())